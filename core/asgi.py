@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Aquece o worker antes da primeira requisição (ver: myapp/warmup.py)
+from myapp.warmup import warm_up  # noqa: E402
+
+warm_up()
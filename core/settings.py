@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,13 +50,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myapp.metrics.MetricsMiddleware',
+    'myapp.throttling.ConcurrencyLimitMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'myapp.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'myapp.routers.PinPrimaryMiddleware',
+    'myapp.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls' 
@@ -90,6 +97,170 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura (opcional): ORDERUP_READ_REPLICA aponta para o banco da réplica.
+# Em desenvolvimento pode ser uma cópia do SQLite (ver: manage.py sync_replica).
+# Só as views marcadas com @replica_reads leem dela; escritas e select_for_update
+# ficam sempre no banco principal.
+if os.environ.get('ORDERUP_READ_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['ORDERUP_READ_REPLICA'],
+        # Nos testes a réplica é o próprio banco principal
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Shards de pedidos e reservas (opcional): ORDERUP_SHARDS lista os arquivos dos
+# shards extras separados por vírgula. 'default' é sempre o shard 0.
+# Cada shard é migrado à parte: manage.py migrate --database shard1
+# Atenção: mudar a quantidade de shards muda o mapa restaurante -> shard
+# (os dados existentes precisam ser movidos).
+ORDER_SHARDS = ['default']
+for index, name in enumerate(filter(None, os.environ.get('ORDERUP_SHARDS', '').split(',')), 1):
+    DATABASES[f'shard{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name.strip(),
+    }
+    ORDER_SHARDS.append(f'shard{index}')
+
+# Conexões persistentes: o worker reaproveita a conexão aberta na primeira
+# requisição em vez de abrir uma por requisição (o aquecimento fecha as suas;
+# ver: myapp/warmup.py)
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.environ.get('ORDERUP_CONN_MAX_AGE', 60))
+    database['CONN_HEALTH_CHECKS'] = True
+
+# Restaurante -> shard fixo (ex.: {42: 'shard3'} para um restaurante muito movimentado)
+SHARD_OVERRIDES = {}
+
+DATABASE_ROUTERS = ['myapp.sharding.ShardRouter', 'myapp.routers.PrimaryReplicaRouter']
+
+# Depois de um POST o usuário lê do principal por alguns segundos
+# (vê o que acabou de gravar mesmo com atraso na réplica)
+REPLICA_PIN_SECONDS = 5
+
+# Cache
+# Camada compartilhada entre os processos. Em produção, trocar por Redis/Memcached
+# (ex.: 'django.core.cache.backends.redis.RedisCache'); o cache em arquivo serve
+# para desenvolvimento (os testes usam um LocMemCache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Cache local (por processo) na frente do compartilhado (ver: myapp/caching.py)
+TWO_TIER_CACHE = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_ENTRIES': 1000,  # LRU
+    'LOCAL_TTL': 30,  # segundos
+    'SHARED_TTL': 300,
+    'VERSION_CHECK_INTERVAL': 1,  # atraso máximo para ver uma invalidação de outro processo
+    'LOCK_TIMEOUT': 10,  # proteção contra stampede
+}
+
+# Tempo (horas) que as chaves de idempotência dos pedidos ficam guardadas
+# (removidas pela tarefa periódica cleanup_idempotency_keys)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# E-mail (notificações enviadas pela fila de tarefas: manage.py run_workers)
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'OrderUP <nao-responda@orderup.local>'
+
+# Sessões
+# Escolha do backend pela variável ORDERUP_SESSION_BACKEND:
+# - cached_db (padrão): lê do cache, grava também no banco (fallback se o cache cair)
+# - cache: só cache (sem escrita no banco a cada login/alteração)
+# - signed_cookies: sessão inteira num cookie assinado (nenhum acesso ao banco)
+# - db: padrão do Django (uma leitura e uma escrita em django_session)
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('ORDERUP_SESSION_BACKEND', 'cached_db')]
+SESSION_CACHE_ALIAS = 'default'
+
+# Mensagens ficam num cookie; só vão para a sessão se não couberem nele
+MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+# Tarefas periódicas agendadas pelo run_workers (nome -> intervalo em segundos)
+PERIODIC_TASKS = {
+    'clear_expired_sessions': 60 * 60,
+    'cleanup_idempotency_keys': 60 * 60,
+    'clear_stale_carts': 60 * 60,
+}
+
+# Carrinhos de pedido sem mudança por mais que isso são apagados (ver: myapp/cart.py)
+CART_TTL_HOURS = 48
+
+# Limite de requisições por view (ver: myapp/throttling.py)
+# 'N/período' (s, m, h, d); ':B' opcional define a rajada máxima (padrão N).
+# Um dict dá uma taxa por tipo de chave (user, ip, restaurant).
+RATE_LIMITS = {
+    'login': '10/m',
+    'register': '5/h:10',
+    'reservation_create': {'user': '10/m', 'ip': '30/m', 'restaurant': '300/m'},
+    'create_order': {'user': '30/m', 'ip': '60/m', 'restaurant': '600/m'},
+}
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_CACHE = 'default'
+# Só ative atrás de um proxy que sobrescreve X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED = False
+
+# Descarte de carga: requisições simultâneas por processo
+LOAD_SHEDDING = {
+    'MAX_CONCURRENT': 32,
+    'QUEUE_TIMEOUT': 0.5,  # espera máxima (segundos) por uma vaga antes do 503
+    'RETRY_AFTER': 1,
+    'EXEMPT_PATHS': ['/static/', '/media/', '/metrics/'],
+}
+
+# Aquecimento do worker ao subir (core/wsgi.py, core/asgi.py)
+WARMUP = {
+    'ENABLED': os.environ.get('ORDERUP_WARMUP', '1') != '0',
+    'MENUS': 20,  # cardápios dos restaurantes mais movimentados postos no cache
+}
+
+# Perfil de requisições reais (ver: myapp/profiling.py e o admin "Perfis de Views")
+PROFILING = {
+    'ENABLED': os.environ.get('ORDERUP_PROFILING') == '1',
+    'SAMPLE_RATE': 0.01,  # fração das requisições medida com cProfile
+    'VIEWS': [],  # views sempre medidas com cProfile (ex.: ['create_order', 'order_manage'])
+    'SLOW_MS': 500,  # amostragem de pilha: guarda o perfil acima disso (0 desliga)
+    'SAMPLER_INTERVAL_MS': 5,
+    'TOP': 30,  # funções por relatório (somando as requisições medidas da view)
+}
+
+# Métricas dos workers, somadas em /metrics (formato Prometheus; ver: myapp/metrics.py)
+# Cada processo grava num arquivo do diretório. Desligadas no `manage.py test`
+# (os testes das métricas usam um diretório temporário).
+TESTING = sys.argv[1:2] == ['test']
+METRICS = {
+    'ENABLED': os.environ.get('ORDERUP_METRICS', '0' if TESTING else '1') != '0',
+    'DIR': os.environ.get('ORDERUP_METRICS_DIR', BASE_DIR / 'metrics'),
+    'ALLOWED_IPS': ['127.0.0.1'],  # quem pode ler /metrics (além de superusuários)
+}
+
+# Compressão gzip das respostas (ver: myapp/compression.py)
+COMPRESSION = {
+    'MIN_SIZE': 1024,  # bytes; respostas menores vão sem compressão
+    'LEVEL': 6,  # 1 (rápido) a 9 (menor)
+    'CONTENT_TYPES': ['text/html', 'application/json', 'text/csv', 'text/plain'],
+}
+
+# Tabelas longas (gestão de pedidos/reservas) enviadas em streaming (ver: myapp/streaming.py)
+STREAMING = {
+    'ENABLED': True,
+    'MIN_ROWS': 200,  # abaixo disso a página é renderizada de uma vez
+    'CHUNK_SIZE': 100,  # linhas por lote
+}
+
 # Configurações de Login
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home' 
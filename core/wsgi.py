@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Aquece o worker antes da primeira requisição (ver: myapp/warmup.py)
+from myapp.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -3,11 +3,22 @@ from django.utils.html import format_html
 from .models import (
     UserProfile,
 	Restaurant, 
+    OpeningHours,
     Table, 
     MenuItem, 
     Reservation, 
+    ReservationTable,
+    WaitlistEntry,
+    DraftCart,
+    DraftCartLine,
     Order, 
-    OrderItem)
+    OrderItem,
+    ArchivedOrder,
+    ArchivedOrderItem,
+    OrderHistory,
+    Job,
+    ViewProfile)
+from .order_summary import refresh_items, refresh_table
 
 # admin.site.register(Restaurant)
 # admin.site.register(Table)
@@ -23,12 +34,17 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username']
 
 
+class OpeningHoursInline(admin.TabularInline):
+    model = OpeningHours
+    extra = 0
+
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
     list_display = ['name', 'owner', 'phone', 'opening_time', 'closing_time', 'created_at']
     list_filter = ['created_at', 'owner']
     search_fields = ['name', 'address', 'phone', 'owner__username']
     date_hierarchy = 'created_at' #  filtrar registros por data em um modelo que possui um campo de data/hora
+    inlines = [OpeningHoursInline]
 
 @admin.register(Table)
 class TableAdmin(admin.ModelAdmin):
@@ -51,6 +67,10 @@ class MenuItemAdmin(admin.ModelAdmin):
         return "-"
     display_image.short_description = 'Imagem'
 
+class ReservationTableInline(admin.TabularInline):
+    model = ReservationTable
+    extra = 0
+
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ['user', 'restaurant', 'date', 'time', 'guests', 'status', 'created_at']
@@ -58,6 +78,12 @@ class ReservationAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'restaurant__name', 'notes']
     date_hierarchy = 'date'
     readonly_fields = ['created_at'] # campos que não podem ser editados
+    inlines = [ReservationTableInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Mesas alteradas: atualiza o resumo dos pedidos da reserva
+        refresh_table(form.instance)
 		
 	# Não necessariamente precisa, por que geralmente somente superuser tem acesso admin.
 	# coloquei essa função para mostrar como podemos customizar ate lista de obejtos de acordo com usuário autenticado.
@@ -80,7 +106,12 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'restaurant__name']
     date_hierarchy = 'created_at'
     inlines = [OrderItemInline]
-    readonly_fields = ['total', 'created_at']
+    readonly_fields = ['total', 'created_at', 'customer_name', 'table_label', 'items_summary']
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Itens alterados: refaz o resumo do pedido
+        refresh_items([form.instance.pk], form.instance._state.db)
 		
  	# Temporario
     def get_queryset(self, request):
@@ -88,4 +119,115 @@ class OrderAdmin(admin.ModelAdmin):
         if not request.user.is_superuser:
             # Se não for superusuário, só vê pedidos dos seus restaurantes
             return qs.filter(restaurant__owner=request.user)
-        return qs
\ No newline at end of file
+        return qs
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    readonly_fields = ['item', 'item_name', 'quantity', 'price']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'restaurant', 'total', 'status', 'created_at', 'archived_at']
+    list_filter = ['status', 'restaurant']
+    search_fields = ['user__username', 'restaurant__name']
+    date_hierarchy = 'created_at'
+    inlines = [ArchivedOrderItemInline]
+    list_select_related = ['user', 'restaurant']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if not request.user.is_superuser:
+            return qs.filter(restaurant__owner=request.user)
+        return qs
+
+# Leitura unificada: pedidos ativos e arquivados na mesma listagem
+@admin.register(OrderHistory)
+class OrderHistoryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'restaurant', 'total', 'status', 'created_at', 'archived']
+    list_filter = ['archived', 'status', 'restaurant']
+    search_fields = ['user__username', 'restaurant__name']
+    date_hierarchy = 'created_at'
+    list_select_related = ['user', 'restaurant']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if not request.user.is_superuser:
+            return qs.filter(restaurant__owner=request.user)
+        return qs
+
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'restaurant', 'date', 'time', 'guests', 'status', 'created_at']
+    list_filter = ['status', 'date', 'restaurant']
+    search_fields = ['user__username', 'restaurant__name', 'notes']
+    date_hierarchy = 'date'
+    readonly_fields = ['reservation', 'created_at']
+
+
+class DraftCartLineInline(admin.TabularInline):
+    model = DraftCartLine
+    extra = 0
+    readonly_fields = ['unit_price']
+
+
+@admin.register(DraftCart)
+class DraftCartAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'restaurant', 'reservation_id', 'total', 'updated_at']
+    list_filter = ['restaurant']
+    search_fields = ['user__username', 'restaurant__name']
+    # A reserva fica em outro shard: mostra só o id
+    readonly_fields = ['reservation_id', 'total', 'updated_at']
+    exclude = ['reservation']
+    inlines = [DraftCartLineInline]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'run_at', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    readonly_fields = ['locked_by', 'created_at', 'started_at', 'finished_at', 'last_error']
+
+
+@admin.register(ViewProfile)
+class ViewProfileAdmin(admin.ModelAdmin):
+    list_display = ['view_name', 'kind', 'requests', 'average', 'max_ms', 'hot_spot', 'updated_at']
+    list_filter = ['kind']
+    search_fields = ['view_name', 'slowest_path', 'hot_spot']
+    fields = ['view_name', 'kind', 'requests', 'average', 'max_ms', 'slowest_path', 'hot_spot',
+              'updated_at', 'formatted_report']
+    readonly_fields = fields
+
+    @admin.display(description='Média (ms)')
+    def average(self, obj):
+        return f'{obj.average_ms:.1f}'
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Relatório')
+    def formatted_report(self, obj):
+        return format_html('<pre style="font-size: 12px">{}</pre>', obj.report)
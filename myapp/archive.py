@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import (
+    Order, OrderItem, ArchivedOrder, ArchivedOrderItem, IdempotencyKey, MenuItem, Table,
+)
+from . import sharding
+
+# Somente pedidos finalizados podem ser arquivados
+ARCHIVABLE_STATUSES = ['entregue', 'cancelado']
+
+ARCHIVED_FIELDS = ['user', 'restaurant', 'table_number', 'reservation_date', 'status',
+                   'created_at', 'total', 'notes', 'table_label', 'item_count', 'items_summary']
+
+
+def archivable_orders(days, alias=DEFAULT_DB_ALIAS):
+    """Pedidos finalizados criados há mais de `days` dias (no shard `alias`)"""
+    cutoff = timezone.now() - timedelta(days=days)
+    # Entregues ainda não contabilizados nas vendas diárias ficam para depois
+    return Order.objects.using(alias).filter(
+        status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff
+    ).exclude(status='entregue', rolled_up=False)
+
+
+def archive_batch(order_ids, alias=DEFAULT_DB_ALIAS):
+    """
+    Move um lote de pedidos (e seus itens) do shard `alias` para as tabelas de
+    arquivo (no banco principal).
+
+    Com um banco só, tudo é uma transação. Com shards, a cópia no banco
+    principal é confirmada antes da remoção no shard: se a remoção falhar, os
+    pedidos continuam ativos e o próximo lote regrava a cópia (upsert), sem
+    conflito de chave.
+    """
+    with transaction.atomic(using=alias):
+        orders = list(
+            Order.objects.using(alias).select_for_update()
+            .filter(id__in=order_ids, status__in=ARCHIVABLE_STATUSES)
+            .exclude(status='entregue', rolled_up=False)
+            .select_related('reservation')
+        )
+        if not orders:
+            return 0
+
+        ids = [order.id for order in orders]
+        items = list(OrderItem.objects.using(alias).filter(order_id__in=ids).values_list(
+            'order_id', 'item_id', 'quantity', 'price'))
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            copy_to_archive(orders, items)
+
+        # Remove das tabelas quentes (os OrderItems vão junto via CASCADE).
+        # As chaves de idempotência ficam no banco principal, sem FK para o
+        # shard: o CASCADE não as alcança e elas são apagadas aqui
+        with sharding.atomic(alias):
+            IdempotencyKey.objects.filter(order_id__in=ids).delete()
+            Order.objects.using(alias).filter(id__in=ids).delete()
+    return len(orders)
+
+
+def copy_to_archive(orders, items):
+    """Grava (ou regrava) os pedidos e itens nas tabelas de arquivo"""
+    # Mesas e cardápio ficam no banco principal (sem JOIN com o shard)
+    table_numbers = dict(Table.objects.filter(
+        pk__in={o.reservation.table_id for o in orders if o.reservation}
+    ).values_list('id', 'number'))
+
+    ArchivedOrder.objects.bulk_create(
+        [
+            ArchivedOrder(
+                id=order.id,
+                user_id=order.user_id,
+                restaurant_id=order.restaurant_id,
+                table_number=table_numbers.get(order.reservation.table_id) if order.reservation else None,
+                reservation_date=order.reservation.date if order.reservation else None,
+                status=order.status,
+                created_at=order.created_at,
+                total=order.total,
+                notes=order.notes,
+                table_label=order.table_label,
+                item_count=order.item_count,
+                items_summary=order.items_summary,
+            )
+            for order in orders
+        ],
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=ARCHIVED_FIELDS,
+    )
+
+    # Uma tentativa anterior pode ter gravado os itens: regrava do zero
+    ArchivedOrderItem.objects.filter(order_id__in=[order.id for order in orders]).delete()
+    names = dict(MenuItem.objects.filter(
+        pk__in={item[1] for item in items}).values_list('id', 'name'))
+    ArchivedOrderItem.objects.bulk_create([
+        ArchivedOrderItem(order_id=order_id, item_id=item_id, item_name=names.get(item_id, ''),
+                          quantity=quantity, price=price)
+        for order_id, item_id, quantity, price in items
+    ])
+
+
+def archive_orders(days, batch_size=500, limit=None):
+    """Arquiva em lotes e retorna o total de pedidos movidos"""
+    archived = 0
+    for alias in sharding.shards():
+        while limit is None or archived < limit:
+            size = batch_size if limit is None else min(batch_size, limit - archived)
+            ids = list(
+                archivable_orders(days, alias).order_by('id').values_list('id', flat=True)[:size])
+            if not ids:
+                break
+            archived += archive_batch(ids, alias)
+    return archived
@@ -0,0 +1,248 @@
+"""
+Cache em duas camadas:
+
+1. Local (em memória, por processo): LRU limitado com TTL, sem custo de rede.
+2. Compartilhada (settings.CACHES['default']): vista por todos os processos.
+
+As chaves são agrupadas em "namespaces" versionados. `invalidate(namespace)`
+incrementa a versão na camada compartilhada; os outros processos percebem a
+nova versão em até VERSION_CHECK_INTERVAL segundos e passam a ignorar as
+entradas antigas (que saem da memória pelo LRU/TTL).
+
+`get_or_set` evita o efeito manada (stampede): só um thread/processo recalcula
+um valor ausente; os demais esperam o resultado.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .routers import on_primary
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_ENTRIES': 1000,
+    'LOCAL_TTL': 30,
+    'SHARED_TTL': 300,
+    'VERSION_CHECK_INTERVAL': 1,
+    'LOCK_TIMEOUT': 10,
+}
+
+_MISSING = object()
+
+
+class TwoTierCache:
+    def __init__(self, alias='default', local_max_entries=1000, local_ttl=30,
+                 shared_ttl=300, version_check_interval=1, lock_timeout=10):
+        self.alias = alias
+        self.local_max_entries = local_max_entries
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self.version_check_interval = version_check_interval
+        self.lock_timeout = lock_timeout
+
+        self._local = OrderedDict()  # chave -> (expira_em, valor)
+        self._versions = {}          # namespace -> (verificado_em, versão)
+        self._lock = threading.RLock()
+        self._key_locks = {}         # (namespace, chave) -> [trava, threads usando]
+        self._stats = Counter()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    # Versões dos namespaces
+
+    def _version_key(self, namespace):
+        return f'tt:version:{namespace}'
+
+    def version(self, namespace):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._versions.get(namespace)
+            if checked and now - checked[0] < self.version_check_interval:
+                return checked[1]
+
+        version = self.shared.get(self._version_key(namespace))
+        if version is None:
+            self.shared.add(self._version_key(namespace), 1, timeout=None)
+            version = self.shared.get(self._version_key(namespace), 1)
+
+        with self._lock:
+            self._versions[namespace] = (now, version)
+        return version
+
+    def invalidate(self, namespace):
+        """Invalida todas as chaves do namespace (em todos os processos); devolve a nova versão"""
+        key = self._version_key(namespace)
+        try:
+            version = self.shared.incr(key)
+        except ValueError:
+            self.shared.add(key, 2, timeout=None)
+            version = self.shared.get(key, 2)
+        with self._lock:
+            self._versions[namespace] = (time.monotonic(), version)
+        self._stats['invalidations'] += 1
+        return version
+
+    def _key(self, namespace, key):
+        return f'tt:{namespace}:{self.version(namespace)}:{key}'
+
+    # Camada local (LRU + TTL)
+
+    def _local_get(self, full_key):
+        with self._lock:
+            entry = self._local.get(full_key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._local[full_key]
+                return _MISSING
+            self._local.move_to_end(full_key)
+            return value
+
+    def _local_set(self, full_key, value, ttl=None):
+        ttl = self.local_ttl if ttl is None else min(ttl, self.local_ttl)
+        with self._lock:
+            self._local[full_key] = (time.monotonic() + ttl, value)
+            self._local.move_to_end(full_key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    # API pública
+
+    def get(self, namespace, key, default=None):
+        full_key = self._key(namespace, key)
+
+        value = self._local_get(full_key)
+        if value is not _MISSING:
+            self._stats['local_hits'] += 1
+            metrics.cache_requests.inc(result='local_hit')
+            return value
+
+        # Valores ficam embrulhados numa tupla para diferenciar None de "ausente"
+        wrapped = self.shared.get(full_key)
+        if wrapped is not None:
+            self._stats['shared_hits'] += 1
+            metrics.cache_requests.inc(result='shared_hit')
+            self._local_set(full_key, wrapped[0])
+            return wrapped[0]
+
+        self._stats['misses'] += 1
+        metrics.cache_requests.inc(result='miss')
+        return default
+
+    def set(self, namespace, key, value, ttl=None):
+        full_key = self._key(namespace, key)
+        self.shared.set(full_key, (value,), timeout=ttl or self.shared_ttl)
+        self._local_set(full_key, value, ttl)
+
+    def get_or_set(self, namespace, key, compute, ttl=None):
+        """Devolve o valor em cache ou calcula (uma única vez) com `compute()`"""
+        value = self.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Um cálculo por chave neste processo. A trava conta quem a está
+        # usando e só sai do dicionário quando o último thread termina;
+        # antes disso, quem chega ainda encontra a mesma trava
+        with self._lock:
+            entry = self._key_locks.setdefault((namespace, key), [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return self._compute_once(namespace, key, compute, ttl)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[(namespace, key)]
+
+    def _compute_once(self, namespace, key, compute, ttl):
+        value = self.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Um cálculo por chave entre processos (trava na camada compartilhada)
+        lock_key = f'tt:lock:{self._key(namespace, key)}'
+        if not self.shared.add(lock_key, 1, timeout=self.lock_timeout):
+            value = self._wait_for(namespace, key)
+            if value is not _MISSING:
+                return value
+
+        try:
+            self._stats['computations'] += 1
+            value = compute()
+            self.set(namespace, key, value, ttl)
+        finally:
+            self.shared.delete(lock_key)
+        return value
+
+    def _wait_for(self, namespace, key):
+        self._stats['waits'] += 1
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            wrapped = self.shared.get(self._key(namespace, key))
+            if wrapped is not None:
+                self._stats['shared_hits'] += 1
+                return wrapped[0]
+        return _MISSING
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+            self._versions.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_entries'] = len(self._local)
+        hits = stats.get('local_hits', 0) + stats.get('shared_hits', 0)
+        total = hits + stats.get('misses', 0)
+        stats['hit_ratio'] = round(hits / total, 4) if total else 0.0
+        return stats
+
+
+def _build():
+    options = {**DEFAULTS, **getattr(settings, 'TWO_TIER_CACHE', {})}
+    return TwoTierCache(
+        alias=options['ALIAS'],
+        local_max_entries=options['LOCAL_MAX_ENTRIES'],
+        local_ttl=options['LOCAL_TTL'],
+        shared_ttl=options['SHARED_TTL'],
+        version_check_interval=options['VERSION_CHECK_INTERVAL'],
+        lock_timeout=options['LOCK_TIMEOUT'],
+    )
+
+
+cache = _build()
+
+
+def get_or_set(namespace, key, compute, ttl=None):
+    # Valores em cache sempre vêm do banco principal: uma réplica atrasada
+    # poderia recolocar no cache dados que acabaram de ser invalidados
+    return cache.get_or_set(namespace, key, lambda: on_primary(compute), ttl)
+
+
+def invalidate(namespace):
+    return cache.invalidate(namespace)
+
+
+def stats():
+    return cache.stats()
+
+
+# Namespaces usados pelas views
+
+def menu_namespace(restaurant_id):
+    return f'menu:{restaurant_id}'
+
+
+def kitchen_namespace(restaurant_id):
+    return f'kitchen:{restaurant_id}'
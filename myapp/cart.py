@@ -0,0 +1,133 @@
+"""
+Carrinho do pedido (rascunho por cliente e reserva).
+
+Cada toque em +/− na tela do pedido é uma requisição pequena que muda uma
+linha do carrinho e devolve só essa linha e o total, sem renderizar o
+cardápio de novo. O envio converte o carrinho em Order numa única transação,
+com os itens inseridos de uma vez (bulk_create).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import sharding
+from .kitchen import order_changed
+from .models import DraftCart, DraftCartLine, IdempotencyKey, MenuItem, Order, OrderItem
+from .order_summary import items_summary
+from .tasks import enqueue
+
+MAX_QUANTITY = 20
+CENTS = Decimal('0.01')
+
+
+def get_cart(user, reservation):
+    cart, _ = DraftCart.objects.get_or_create(
+        user=user, reservation_id=reservation.pk,
+        defaults={'restaurant_id': reservation.restaurant_id})
+    return cart
+
+
+def find_cart(user, reservation):
+    return DraftCart.objects.filter(user=user, reservation_id=reservation.pk).first()
+
+
+def cart_quantities(cart):
+    """{item_id: quantidade} para preencher a tela do pedido"""
+    if cart is None:
+        return {}
+    return dict(cart.lines.values_list('item_id', 'quantity'))
+
+
+def _update_total(cart):
+    total = cart.lines.aggregate(total=Sum(F('quantity') * F('unit_price')))['total'] or 0
+    # A soma vem com casas decimais a mais no SQLite (ex.: 77.7000000000000)
+    cart.total = Decimal(total).quantize(CENTS)
+    cart.save(update_fields=['total', 'updated_at'])
+
+
+def set_quantity(cart, item, quantity):
+    """Define a quantidade do item (0 remove a linha); devolve a linha ou None"""
+    quantity = max(0, min(int(quantity), MAX_QUANTITY))
+    if quantity == 0:
+        cart.lines.filter(item=item).delete()
+        line = None
+    else:
+        line, _ = DraftCartLine.objects.update_or_create(
+            cart=cart, item=item, defaults={'quantity': quantity, 'unit_price': item.price})
+    _update_total(cart)
+    return line
+
+
+def add_quantity(cart, item, quantity=1):
+    current = cart.lines.filter(item=item).values_list('quantity', flat=True).first() or 0
+    return set_quantity(cart, item, current + int(quantity))
+
+
+def parse_quantities(menu_items, quantities):
+    """Listas paralelas do formulário -> {item_id: quantidade} (só as positivas)"""
+    result = {}
+    for item_id, quantity in zip(menu_items, quantities):  # esse zip junta as listas
+        try:
+            item_id, quantity = int(item_id), int(quantity or 0)
+        except ValueError:
+            continue
+        if quantity > 0:
+            result[item_id] = min(quantity, MAX_QUANTITY)
+    return result
+
+
+def line_payload(item, line, cart):
+    """Resposta dos endpoints do carrinho: só a linha alterada e o total"""
+    return {
+        'item': item.pk,
+        'name': item.name,
+        'quantity': line.quantity if line else 0,
+        'unit_price': str(item.price),
+        'subtotal': str(line.subtotal if line else 0),
+        'total': str(cart.total),
+    }
+
+
+def place_order(user, reservation, quantities, idempotency_key=None):
+    """
+    Cria o pedido com {item_id: quantidade} numa transação: uma consulta aos
+    itens, um INSERT do pedido e um INSERT de todas as linhas. Chamar dentro de
+    sharding.atomic(reservation._state.db) (ver checkout).
+    """
+    items = MenuItem.objects.filter(
+        pk__in=[item_id for item_id, quantity in quantities.items() if quantity > 0],
+        restaurant_id=reservation.restaurant_id)
+    alias = reservation._state.db
+    # O pedido fica no mesmo shard da reserva (o do restaurante)
+    order = Order.objects.using(alias).create(
+        user=user, restaurant_id=reservation.restaurant_id, reservation=reservation)
+    lines = [OrderItem(order=order, item=item, quantity=quantities[item.pk],
+                       price=item.price * quantities[item.pk]) for item in items]
+    OrderItem.objects.using(alias).bulk_create(lines)
+    order.total = sum(line.price for line in lines)
+    order.item_count, order.items_summary = items_summary(
+        [(line.quantity, line.item.name) for line in lines])
+    order.save(update_fields=['total', 'item_count', 'items_summary'])
+
+    if idempotency_key:
+        IdempotencyKey.objects.create(user=user, key=idempotency_key, order=order)
+
+    enqueue('notify_new_order', {'order_id': order.pk})
+    order_changed(order, None, order.status)
+    return order
+
+
+def checkout(user, reservation, quantities, idempotency_key=None):
+    """Cria o pedido e apaga o carrinho da reserva na mesma transação"""
+    with sharding.atomic(reservation._state.db):
+        order = place_order(user, reservation, quantities, idempotency_key)
+        DraftCart.objects.filter(user=user, reservation_id=reservation.pk).delete()
+    return order
+
+
+def clear_stale_carts(hours):
+    """Apaga carrinhos abandonados (sem mudança há `hours` horas)"""
+    cutoff = timezone.now() - timedelta(hours=hours)
+    return DraftCart.objects.filter(updated_at__lt=cutoff).delete()[0]
@@ -0,0 +1,90 @@
+"""
+Compressão gzip das respostas (settings.COMPRESSION).
+
+Igual ao GZipMiddleware do Django (inclusive os bytes aleatórios no cabeçalho
+contra BREACH), mas com tamanho mínimo, nível e tipos de conteúdo
+configuráveis. Nas respostas em streaming o primeiro pedaço (o começo da
+página) sai assim que comprimido e depois o compressor esvazia a cada
+FLUSH_BYTES, para não segurar a página nem perder a taxa de compressão.
+"""
+import gzip
+import secrets
+import zlib
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware, re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+
+MAX_RANDOM_BYTES = 100
+FLUSH_BYTES = 16 * 1024
+
+
+def _random_filename():
+    return b'a' * secrets.randbelow(MAX_RANDOM_BYTES)
+
+
+def compress_bytes(data, level):
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    header = bytearray(compressed[:10])
+    header[3] = gzip.FNAME
+    return bytes(header) + _random_filename() + b'\x00' + compressed[10:]
+
+
+def compress_chunks(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # Cabeçalho gzip (RFC 1952) com nome de arquivo aleatório
+    yield b'\x1f\x8b\x08' + bytes([gzip.FNAME]) + b'\x00\x00\x00\x00\x00\xff' \
+        + _random_filename() + b'\x00'
+    crc, size, pending = 0, 0, 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        first = not size
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        pending += len(chunk)
+        data = compressor.compress(chunk)
+        # O primeiro pedaço sai na hora; depois, a cada FLUSH_BYTES (ex.: CSV linha a linha)
+        if first or pending >= FLUSH_BYTES:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield (compressor.flush()
+           + crc.to_bytes(4, 'little') + (size & 0xFFFFFFFF).to_bytes(4, 'little'))
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        options = settings.COMPRESSION
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in options['CONTENT_TYPES']:
+            return response
+        # Respostas curtas não compensam
+        if not response.streaming and len(response.content) < options['MIN_SIZE']:
+            return response
+        if response.streaming and response.is_async:
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_chunks(
+                response.streaming_content, options['LEVEL'])
+            del response.headers['Content-Length']
+        else:
+            compressed = compress_bytes(response.content, options['LEVEL'])
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
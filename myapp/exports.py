@@ -0,0 +1,125 @@
+import csv
+import json
+from itertools import chain, islice
+
+from django.contrib.auth.models import User
+
+from .models import OrderItem, ArchivedOrderItem, MenuItem, Reservation, Table
+from .sharding import shard_for, using
+
+CHUNK_SIZE = 2000
+
+ORDER_COLUMNS = [
+    'order_id', 'created_at', 'status', 'customer', 'table',
+    'item', 'quantity', 'price', 'order_total', 'archived',
+]
+
+RESERVATION_COLUMNS = [
+    'reservation_id', 'date', 'time', 'status', 'customer',
+    'table', 'guests', 'created_at', 'notes',
+]
+
+
+def _with_names(rows, restaurant_id, user_index, table_index, item_index=None):
+    """
+    Troca ids por nomes (usuário, mesa, item). Pedidos e reservas podem estar
+    em outro shard, sem JOIN com as tabelas do banco principal.
+    """
+    tables = dict(Table.objects.filter(restaurant_id=restaurant_id).values_list('id', 'number'))
+    items = (dict(MenuItem.objects.filter(restaurant_id=restaurant_id).values_list('id', 'name'))
+             if item_index is not None else {})
+    rows = iter(rows)
+    while True:
+        chunk = [list(row) for row in islice(rows, CHUNK_SIZE)]
+        if not chunk:
+            return
+        users = dict(User.objects.filter(
+            pk__in={row[user_index] for row in chunk}).values_list('id', 'username'))
+        for row in chunk:
+            row[user_index] = users.get(row[user_index], '')
+            row[table_index] = tables.get(row[table_index])
+            if item_index is not None:
+                row[item_index] = items.get(row[item_index], '')
+            yield tuple(row)
+
+
+def order_rows(restaurant_id):
+    """Uma linha por item de pedido (ativos + arquivados), sem carregar tudo na memória"""
+    active = _with_names(
+        using(OrderItem.objects, shard_for(restaurant_id))
+        .filter(order__restaurant_id=restaurant_id).order_by('order_id', 'id')
+        .values_list(
+            'order_id', 'order__created_at', 'order__status', 'order__user_id',
+            'order__reservation__table_id', 'item_id', 'quantity', 'price',
+            'order__total',
+        ).iterator(chunk_size=CHUNK_SIZE),
+        restaurant_id, user_index=3, table_index=4, item_index=5)
+
+    archived = ArchivedOrderItem.objects.filter(order__restaurant_id=restaurant_id).order_by(
+        'order_id', 'id'
+    ).values_list(
+        'order_id', 'order__created_at', 'order__status', 'order__user__username',
+        'order__table_number', 'item_name', 'quantity', 'price', 'order__total',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    return chain(
+        (row + (False,) for row in active),
+        (row + (True,) for row in archived),
+    )
+
+
+def reservation_rows(restaurant_id):
+    return _with_names(
+        using(Reservation.objects, shard_for(restaurant_id))
+        .filter(restaurant_id=restaurant_id).order_by('date', 'time', 'id')
+        .values_list(
+            'id', 'date', 'time', 'status', 'user_id',
+            'table_id', 'guests', 'created_at', 'notes',
+        ).iterator(chunk_size=CHUNK_SIZE),
+        restaurant_id, user_index=4, table_index=5)
+
+
+EXPORTS = {
+    'orders': (ORDER_COLUMNS, order_rows),
+    'reservations': (RESERVATION_COLUMNS, reservation_rows),
+}
+
+
+class Echo:
+    """Buffer que só devolve o que recebe (o csv.writer escreve direto na resposta)"""
+    def write(self, value):
+        return value
+
+
+def _to_json(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(columns, rows):
+    for row in rows:
+        record = {column: _to_json(value) for column, value in zip(columns, row)}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', stream_csv),
+    'jsonl': ('application/x-ndjson; charset=utf-8', stream_jsonl),
+}
+
+
+def export_lines(kind, restaurant_id, fmt):
+    """Gera as linhas (texto) da exportação pedida"""
+    columns, rows = EXPORTS[kind]
+    _, writer = FORMATS[fmt]
+    return writer(columns, rows(restaurant_id))
@@ -1,11 +1,15 @@
+from datetime import datetime
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.utils import timezone
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import (
     Layout, Row, Column, Field, Submit, Button, HTML
 )
 from .models import Restaurant, MenuItem, Reservation
+from .schedule import is_open_at
 
 class UserRegistrationForm(UserCreationForm):   
     email = forms.EmailField(required=True, label="Endereço de Email")
@@ -62,7 +66,8 @@ class RestaurantForm(forms.ModelForm):
     class Meta:
         model = Restaurant
         fields = ['name', 'description', 'address', 
-                  'phone', 'opening_time', 'closing_time', 'image']
+                  'phone', 'opening_time', 'closing_time', 'image',
+                  'reservation_duration', 'large_party_size', 'large_party_duration']
         widgets = {
             'opening_time': forms.TimeInput(attrs={'type': 'time'}),
             'closing_time': forms.TimeInput(attrs={'type': 'time'}),
@@ -102,6 +107,11 @@ class RestaurantForm(forms.ModelForm):
                         Column('opening_time', css_class='col-md-6'),
                         Column('closing_time', css_class='col-md-6'),
                     ),
+                    Row(
+                        Column('reservation_duration', css_class='col-md-4'),
+                        Column('large_party_size', css_class='col-md-4'),
+                        Column('large_party_duration', css_class='col-md-4'),
+                    ),
                     css_class='col-md-8 mb-3'
                 ),
             ), 
@@ -127,6 +137,16 @@ class MenuItemForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'rows': 3}),
         }
 
+    def clean_name(self):
+        # O restaurante não é campo do formulário, então a restrição
+        # (restaurante, nome) não é validada pelo ModelForm
+        name = self.cleaned_data['name']
+        restaurant_id = self.instance.restaurant_id
+        if restaurant_id and MenuItem.objects.filter(
+                restaurant_id=restaurant_id, name=name).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError('Já existe um item com este nome no cardápio.')
+        return name
+
     def __init__(self, *args, **kwargs):
         super(MenuItemForm, self).__init__(*args, **kwargs)
 
@@ -181,8 +201,9 @@ class ReservationForm(forms.ModelForm):
             'time': forms.TimeInput(attrs={'type': 'time'}),
         } 
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, restaurant=None, **kwargs):
         super(ReservationForm, self).__init__(*args, **kwargs)
+        self.restaurant = restaurant
 
         self.helper = FormHelper()
         self.helper.form_method = 'post'
@@ -205,4 +226,44 @@ class ReservationForm(forms.ModelForm):
                     css_class='col-auto ms-auto'
                 ),
             ),
-        )
\ No newline at end of file
+        )
+
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date, time = cleaned_data.get('date'), cleaned_data.get('time')
+
+        # Recusa horários fora do funcionamento antes de procurar mesa
+        if self.restaurant and date and time:
+            start = timezone.make_aware(datetime.combine(date, time))
+            if not is_open_at(self.restaurant.pk, start):
+                raise forms.ValidationError(
+                    'O restaurante está fechado no dia e horário escolhidos.')
+        return cleaned_data
+
+
+class MenuImportForm(forms.Form):
+    file = forms.FileField(
+        label='Arquivo (CSV ou JSON)',
+        help_text='Colunas: name, description, price, category, available'
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(MenuImportForm, self).__init__(*args, **kwargs)
+
+        self.helper = FormHelper()
+        self.helper.form_method = 'post'
+        self.helper.attrs = {'enctype': 'multipart/form-data'}
+        self.helper.layout = Layout(
+            'file',
+            Row(
+                Column(
+                    HTML('<a href="{% url \'restaurant_detail\' pk=restaurant.pk %}" class="btn btn-secondary"><i class="fas fa-arrow-left"></i> Voltar</a>'),
+                    css_class='col-auto'
+                ),
+                Column(
+                    Submit('submit', 'Importar Cardápio', css_class='btn btn-primary'),
+                    css_class='col-auto ms-auto'
+                ),
+            ),
+        )
@@ -0,0 +1,135 @@
+"""
+Carga da cozinha: quantas unidades de cada prato estão em pedidos
+pendentes/em preparo de um restaurante.
+
+O total vem de uma única consulta agrupada por item e fica num contador em
+memória (por processo). Criar um pedido ou mudar seu status aplica só a
+diferença no contador e incrementa a versão do namespace do restaurante no
+cache compartilhado. Um processo que vê a versão pular mais de uma vez (outro
+processo mudou pedidos) refaz a consulta; senão a tela da cozinha é servida
+direto da memória.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from . import caching
+from .models import MenuItem, OrderItem
+from .sharding import shard_for, shard_for_pk, using
+
+ACTIVE_STATUSES = ('pendente', 'preparando')
+
+# Recarrega do banco mesmo sem mudanças (ex.: edições feitas pelo admin)
+REFRESH_SECONDS = 60
+
+
+def _item_names(item_ids):
+    # Os itens do cardápio ficam no banco principal (sem JOIN com o shard dos pedidos)
+    return dict(MenuItem.objects.filter(pk__in=item_ids).values_list('id', 'name'))
+
+
+def load_from_db(restaurant_id):
+    """{item_id: {'name', 'quantity', 'orders'}} numa consulta agrupada"""
+    rows = list(
+        using(OrderItem.objects, shard_for(restaurant_id))
+        .filter(order__restaurant_id=restaurant_id, order__status__in=ACTIVE_STATUSES)
+        .values('item_id')
+        .annotate(quantity=Sum('quantity'), orders=Count('order', distinct=True))
+    )
+    names = _item_names([row['item_id'] for row in rows])
+    return {
+        row['item_id']: {'name': names.get(row['item_id'], ''), 'quantity': row['quantity'],
+                         'orders': row['orders']}
+        for row in rows
+    }
+
+
+def order_delta(order_id, sign):
+    """Contribuição de um pedido para o contador (sign = +1 entra, -1 sai)"""
+    rows = list(
+        using(OrderItem.objects, shard_for_pk(order_id)).filter(order_id=order_id)
+        .values('item_id').annotate(quantity=Sum('quantity')))
+    names = _item_names([row['item_id'] for row in rows])
+    return {
+        row['item_id']: {'name': names.get(row['item_id'], ''),
+                         'quantity': sign * row['quantity'], 'orders': sign}
+        for row in rows
+    }
+
+
+class KitchenBoard:
+    def __init__(self, refresh=REFRESH_SECONDS):
+        self.refresh = refresh
+        self._boards = {}  # restaurant_id -> (versão, carregado_em, contador)
+        self._lock = threading.Lock()
+
+    def load(self, restaurant_id):
+        version = caching.cache.version(caching.kitchen_namespace(restaurant_id))
+        with self._lock:
+            entry = self._boards.get(restaurant_id)
+            if (entry and entry[0] == version
+                    and time.monotonic() - entry[1] < self.refresh):
+                return self._rows(entry[2])
+
+        counts = load_from_db(restaurant_id)
+        with self._lock:
+            self._boards[restaurant_id] = (version, time.monotonic(), counts)
+        return self._rows(counts)
+
+    def apply(self, restaurant_id, delta):
+        """Aplica a diferença (já commitada) e publica a nova versão"""
+        version = caching.invalidate(caching.kitchen_namespace(restaurant_id))
+        with self._lock:
+            entry = self._boards.get(restaurant_id)
+            if entry is None:
+                return
+            if entry[0] != version - 1:
+                # Perdemos mudanças de outro processo: recarrega na próxima leitura
+                del self._boards[restaurant_id]
+                return
+
+            counts = defaultdict(lambda: {'quantity': 0, 'orders': 0}, entry[2])
+            for item_id, change in delta.items():
+                current = dict(counts[item_id], name=change['name'])
+                current['quantity'] += change['quantity']
+                current['orders'] += change['orders']
+                if current['quantity'] > 0:
+                    counts[item_id] = current
+                else:
+                    counts.pop(item_id)
+            self._boards[restaurant_id] = (version, entry[1], dict(counts))
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+
+    def _rows(self, counts):
+        return sorted(
+            ({'item_id': item_id, **values} for item_id, values in counts.items()),
+            key=lambda row: (-row['quantity'], row['name']))
+
+
+board = KitchenBoard()
+
+
+def kitchen_load(restaurant_id):
+    """Linhas da tela da cozinha, do prato mais pedido para o menos pedido"""
+    return board.load(restaurant_id)
+
+
+def order_changed(order, old_status, new_status):
+    """
+    Chamada nas views (dentro da transação) quando um pedido é criado
+    (old_status=None) ou muda de status.
+    """
+    was_active = old_status in ACTIVE_STATUSES
+    is_active = new_status in ACTIVE_STATUSES
+    if was_active == is_active:
+        return
+
+    delta = order_delta(order.pk, 1 if is_active else -1)
+    restaurant_id = order.restaurant_id
+    transaction.on_commit(lambda: board.apply(restaurant_id, delta))
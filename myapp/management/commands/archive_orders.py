@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from myapp.archive import archivable_orders, archive_orders
+from myapp.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Move pedidos entregues/cancelados antigos para as tabelas de arquivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Arquiva pedidos criados há mais de N dias (padrão: 90)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Pedidos por transação (padrão: 500)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Número máximo de pedidos a arquivar nesta execução')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas mostra quantos pedidos seriam arquivados')
+
+    def handle(self, *args, **options):
+        days = options['days']
+
+        if options['dry_run']:
+            count = sum(archivable_orders(days, alias).count() for alias in shards())
+            self.stdout.write(f'{count} pedido(s) seriam arquivados.')
+            return
+
+        archived = archive_orders(days, batch_size=options['batch_size'],
+                                  limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'{archived} pedido(s) arquivado(s).'))
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.tasks import delete_expired_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = 'Remove chaves de idempotência de pedidos mais antigas que o TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int,
+                            default=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24),
+                            help='Idade máxima das chaves em horas')
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_idempotency_keys(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} chave(s) removida(s).'))
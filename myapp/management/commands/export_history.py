@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.exports import EXPORTS, FORMATS, export_lines
+from myapp.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Exporta o histórico de pedidos ou reservas de um restaurante (CSV/JSONL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_id', type=int)
+        parser.add_argument('--kind', choices=sorted(EXPORTS), default='orders')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', default='-',
+                            help='Arquivo de saída (padrão: stdout)')
+
+    def handle(self, *args, **options):
+        if not Restaurant.objects.filter(pk=options['restaurant_id']).exists():
+            raise CommandError('Restaurante não encontrado.')
+
+        lines = export_lines(options['kind'], options['restaurant_id'], options['format'])
+
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for line in lines:
+                output.write(line)
+        self.stderr.write(self.style.SUCCESS(f'Exportado para {options["output"]}'))
@@ -0,0 +1,222 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from myapp.models import (
+    UserProfile, Restaurant, MenuItem, Order, OrderItem, Reservation, ReservationTable, Table,
+)
+from myapp.order_summary import rebuild as rebuild_order_summaries
+from myapp.schedule import rebuild_intervals
+from myapp.search import index_restaurant
+
+
+def iter_json_array(stream, chunk_size=64 * 1024):
+    """
+    Lê um array JSON ([{...}, {...}]) aos poucos, devolvendo um objeto por vez,
+    sem carregar o arquivo inteiro na memória.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer and not eof:
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if not buffer.startswith('['):
+                raise ValueError('A fixture deve ser um array JSON.')
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        buffer = buffer.lstrip(', \n\r\t')
+        if buffer.startswith(']'):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError('JSON incompleto ou inválido.')
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield obj
+
+
+@contextmanager
+def fixture_dates(model, instances):
+    """
+    Mantém as datas da fixture nos campos auto_now/auto_now_add (ex.:
+    Order.created_at): o bulk_create chama pre_save(), que as trocaria
+    pela hora da carga. Só o que veio vazio recebe a hora atual.
+    """
+    fields = [f for f in model._meta.concrete_fields
+              if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    now = timezone.now()
+    for obj in instances:
+        for field in fields:
+            if getattr(obj, field.attname) is None:
+                setattr(obj, field.attname, now)
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    try:
+        for field in fields:
+            field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Carrega uma fixture JSON grande rapidamente: leitura incremental, '
+        'bulk_create por modelo (sem signals) e recálculo dos campos derivados no final'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='Arquivo JSON (formato do dumpdata)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        self.batch_size = options['batch_size']
+        self.buffers = defaultdict(list)
+        self.counts = defaultdict(int)
+        connection = connections[self.using]
+
+        start = time.perf_counter()
+        try:
+            with open(options['fixture'], encoding='utf-8') as stream, \
+                    transaction.atomic(using=self.using), \
+                    connection.constraint_checks_disabled():
+                for obj in iter_json_array(stream):
+                    model = self.get_model(obj)
+                    self.buffers[model].append(obj)
+                    if len(self.buffers[model]) >= self.batch_size:
+                        self.flush(model)
+
+                # O que sobrou é gravado na ordem de dependência entre os modelos
+                for model in self.dependency_order(list(self.buffers)):
+                    self.flush(model)
+
+                # As FKs foram checadas só agora, com tudo carregado
+                connection.check_constraints(
+                    table_names=[model._meta.db_table for model in self.counts])
+                self.recompute_derived()
+                self.reset_sequences(connection)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Erro ao carregar a fixture: {e}')
+
+        elapsed = time.perf_counter() - start
+        for model, count in self.counts.items():
+            self.stdout.write(f'  {model._meta.label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(self.counts.values())} objeto(s) carregado(s) em {elapsed:.2f}s.'))
+
+    def get_model(self, obj):
+        try:
+            return apps.get_model(obj['model'])
+        except (KeyError, LookupError, ValueError):
+            raise ValueError(f'Modelo inválido: {obj.get("model")!r}')
+
+    def dependency_order(self, models):
+        app_list = defaultdict(list)
+        for model in models:
+            app_list[model._meta.app_config].append(model)
+        return serializers.sort_dependencies(app_list.items(), allow_cycles=True)
+
+    def flush(self, model):
+        objects = self.buffers.pop(model, [])
+        if not objects:
+            return
+
+        deserialized = list(serializers.deserialize(
+            'python', objects, using=self.using, ignorenonexistent=True))
+        instances = [d.object for d in deserialized]
+
+        opts = model._meta
+        update_fields = [
+            f.name for f in opts.concrete_fields if not f.primary_key
+        ]
+        # bulk_create não dispara signals nem chama save() (ex.: OrderItem.save)
+        with fixture_dates(model, instances):
+            if update_fields and all(obj.pk is not None for obj in instances):
+                model.objects.using(self.using).bulk_create(
+                    instances,
+                    update_conflicts=True,
+                    unique_fields=[opts.pk.name],
+                    update_fields=update_fields,
+                )
+            else:
+                model.objects.using(self.using).bulk_create(instances)
+
+        # Relações many-to-many (ex.: grupos e permissões de usuários)
+        for d in deserialized:
+            for field_name, values in (d.m2m_data or {}).items():
+                getattr(d.object, field_name).set(values)
+
+        self.counts[model] += len(instances)
+
+    def recompute_derived(self):
+        """Recalcula o que os signals/save() fariam, uma única vez"""
+        if User in self.counts:
+            missing = User.objects.using(self.using).filter(profile__isnull=True)
+            UserProfile.objects.using(self.using).bulk_create(
+                [UserProfile(user_id=pk) for pk in missing.values_list('pk', flat=True)],
+                batch_size=self.batch_size,
+            )
+
+        # Horários pré-calculados e índice de busca (mantidos por signals)
+        if Restaurant in self.counts or MenuItem in self.counts:
+            for restaurant in Restaurant.objects.using(self.using).all():
+                rebuild_intervals(restaurant)
+                index_restaurant(restaurant)
+
+        # Início/fim das reservas (calculados em Reservation.save)
+        if Reservation in self.counts or Restaurant in self.counts:
+            reservations = Reservation.objects.using(self.using).select_related('restaurant')
+            batch = []
+            for reservation in reservations.iterator(chunk_size=self.batch_size):
+                reservation.compute_slot()
+                batch.append(reservation)
+                if len(batch) >= self.batch_size:
+                    Reservation.objects.using(self.using).bulk_update(batch, ['starts_at', 'ends_at'])
+                    batch = []
+            Reservation.objects.using(self.using).bulk_update(batch, ['starts_at', 'ends_at'])
+
+        if Order in self.counts or OrderItem in self.counts:
+            items_total = OrderItem.objects.filter(order=OuterRef('pk')).values(
+                'order').annotate(total=Sum('price')).values('total')
+            Order.objects.using(self.using).update(total=Coalesce(
+                Subquery(items_total), Value(0), output_field=DecimalField()))
+
+        # Resumo dos quadros de pedidos (ver: myapp/order_summary.py)
+        if self.counts.keys() & {Order, OrderItem, User, Reservation, ReservationTable,
+                                 Table, MenuItem}:
+            rebuild_order_summaries(self.using, self.batch_size)
+
+    def reset_sequences(self, connection):
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.counts))
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
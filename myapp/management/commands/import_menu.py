@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from myapp.menu_import import parse_rows, import_menu
+from myapp.models import Restaurant
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Importa itens do cardápio de um restaurante a partir de um CSV/JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_id', type=int)
+        parser.add_argument('file', nargs='?',
+                            help='Arquivo CSV ou JSON com os itens')
+        parser.add_argument('--benchmark', type=int, metavar='N',
+                            help='Importa N itens sintéticos, mede a vazão e desfaz tudo')
+
+    def handle(self, *args, **options):
+        try:
+            restaurant = Restaurant.objects.get(pk=options['restaurant_id'])
+        except Restaurant.DoesNotExist:
+            raise CommandError('Restaurante não encontrado.')
+
+        if options['benchmark']:
+            return self.benchmark(restaurant, options['benchmark'])
+
+        if not options['file']:
+            raise CommandError('Informe o arquivo a importar.')
+
+        with open(options['file'], 'rb') as f:
+            try:
+                rows = parse_rows(f.read(), options['file'])
+            except ValueError as e:
+                raise CommandError(f'Não foi possível ler o arquivo: {e}')
+
+        result = import_menu(restaurant, rows)
+        for line, errors in result.errors:
+            self.stderr.write(f'Linha {line}: {"; ".join(errors)}')
+        if not result.ok:
+            raise CommandError('O arquivo tem erros. Nenhum item foi importado.')
+        self.stdout.write(self.style.SUCCESS(f'{result.imported} item(ns) importado(s).'))
+
+    def benchmark(self, restaurant, count):
+        categories = ['entrada', 'prato_principal', 'sobremesa', 'bebida']
+        rows = [
+            {
+                'name': f'Item de teste {i}',
+                'description': f'Descrição do item {i}',
+                'price': f'{10 + i % 90}.90',
+                'category': categories[i % len(categories)],
+                'available': 'true',
+            }
+            for i in range(count)
+        ]
+
+        # Roda dentro de uma transação que é sempre desfeita
+        try:
+            with transaction.atomic():
+                for label in ('inserção', 'atualização'):
+                    start = time.perf_counter()
+                    result = import_menu(restaurant, rows)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'{label}: {result.imported} itens em {elapsed:.3f}s '
+                        f'({result.imported / elapsed:,.0f} itens/s)')
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,367 @@
+import http.client
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dtime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+from django.utils import timezone
+
+from myapp.models import MenuItem, Order, Reservation, Restaurant, Table, WaitlistEntry
+from myapp.sharding import shard_for, shards, using
+
+PREFIX = 'loadtest'
+PASSWORD = 'loadtest-senha'
+DEFAULT_MIX = 'browse=60,book=15,order=15,owner=10'
+
+RESERVATION_URL = re.compile(r'/reservation/(\d+)/$')
+# Botões da tela de pedidos: (id do pedido, próximo status)
+STATUS_FORMS = re.compile(
+    r'action="/order/(\d+)/update-status/".*?name="status" value="(\w+)"', re.DOTALL)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lock_errors = 0
+        self.flows = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, step, seconds, status):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            self.statuses[step][status] += 1
+
+    def lock_error(self):
+        with self._lock:
+            self.lock_errors += 1
+
+    def flow(self, name, outcome):
+        with self._lock:
+            self.flows[(name, outcome)] += 1
+
+
+class Session:
+    """Um navegador: guarda cookies, envia o token CSRF e não segue redirects"""
+
+    def __init__(self, base_url, stats, timeout):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.stats = stats
+        self.timeout = timeout
+        self.cookies = SimpleCookie()
+
+    def request(self, step, method, path, data=None):
+        headers = {'Host': f'{self.host}:{self.port}'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={m.value}' for k, m in self.cookies.items())
+        body = None
+        if method == 'POST':
+            data = dict(data or {}, csrfmiddlewaretoken=self.cookies['csrftoken'].value
+                        if 'csrftoken' in self.cookies else '')
+            body = urlencode(data, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read().decode('utf-8', 'replace')
+            status = response.status
+            for header in response.headers.get_all('Set-Cookie') or []:
+                self.cookies.load(header)
+            location = response.headers.get('Location', '')
+        except OSError:
+            status, content, location = 'erro', '', ''
+        finally:
+            connection.close()
+        self.stats.record(step, time.perf_counter() - start, status)
+        return status, content, location
+
+    def login(self, username):
+        self.request('login', 'GET', '/login/')
+        status, _, _ = self.request(
+            'login', 'POST', '/login/', {'username': username, 'password': PASSWORD})
+        return status == 302
+
+
+class Flows:
+    """Roteiros dos usuários virtuais; devolvem True se chegaram ao fim"""
+
+    def __init__(self, context, rng):
+        self.context = context
+        self.rng = rng
+
+    def browse(self, session):
+        session.request('home', 'GET', '/')
+        restaurant = self.rng.choice(self.context['restaurants'])
+        status, _, _ = session.request('restaurant_detail', 'GET', f'/restaurant/{restaurant}/')
+        return status == 200
+
+    def book(self, session):
+        restaurant = self.rng.choice(self.context['restaurants'])
+        if not session.login(self.rng.choice(self.context['customers'])):
+            return None
+        session.request('restaurant_detail', 'GET', f'/restaurant/{restaurant}/')
+        session.request('reservation_create', 'GET', f'/restaurant/{restaurant}/reserve/')
+        date = timezone.localdate() + timedelta(days=self.rng.randint(1, 30))
+        slot = dtime(self.rng.randint(12, 20), self.rng.choice([0, 30]))
+        status, _, location = session.request(
+            'reservation_create', 'POST', f'/restaurant/{restaurant}/reserve/', {
+                'date': date.isoformat(), 'time': slot.strftime('%H:%M'),
+                'guests': self.rng.randint(1, 6), 'notes': ''})
+        match = RESERVATION_URL.search(location) if status == 302 else None
+        return int(match.group(1)) if match else None
+
+    def order(self, session):
+        reservation = self.book(session)
+        if reservation is None:
+            return False
+        path = f'/reservation/{reservation}/order/'
+        status, page, _ = session.request('create_order', 'GET', path)
+        items = [int(pk) for pk in re.findall(r'name="menu_items" value="(\d+)"', page)]
+        if status != 200 or not items:
+            return False
+        chosen = self.rng.sample(items, min(len(items), self.rng.randint(1, 4)))
+        status, _, _ = session.request('create_order', 'POST', path, {
+            'menu_items': chosen, 'quantities': [self.rng.randint(1, 3) for _ in chosen],
+            'idempotency_key': uuid.uuid4().hex})
+        return status == 302
+
+    def owner(self, session):
+        restaurant, username = self.rng.choice(list(self.context['owners'].items()))
+        if not session.login(username):
+            return False
+        path = f'/restaurant/{restaurant}/orders/'
+        clicks = 0
+        for _ in range(self.rng.randint(2, 5)):
+            status, page, _ = session.request('order_manage', 'GET', path)
+            buttons = [b for b in STATUS_FORMS.findall(page) if b[1] != 'cancelado']
+            if buttons:
+                order_id, new_status = self.rng.choice(buttons)
+                session.request('order_update_status', 'POST',
+                                f'/order/{order_id}/update-status/', {'status': new_status})
+                clicks += 1
+        return clicks > 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga com usuários virtuais (clientes navegando, reservando e '
+        'pedindo; donos acompanhando os pedidos). Mostra vazão, percentis de '
+        'latência, erros e travas do banco'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Servidor já rodando (ex.: http://127.0.0.1:8000)')
+        parser.add_argument('--serve', action='store_true',
+                            help='Sobe um servidor local com threads só para o teste')
+        parser.add_argument('--rate', type=float, default=5,
+                            help='Chegada de usuários por segundo (processo de Poisson)')
+        parser.add_argument('--duration', type=float, default=30, help='Segundos de chegada')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Máximo de usuários virtuais simultâneos')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f'Pesos dos roteiros (padrão: {DEFAULT_MIX})')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--setup', action='store_true',
+                            help='Cria (se faltar) restaurantes, mesas, cardápio e usuários de teste')
+        parser.add_argument('--restaurants', type=int, default=5)
+        parser.add_argument('--customers', type=int, default=50)
+        parser.add_argument('--keep-rate-limits', action='store_true',
+                            help='Com --serve, mantém os limites de requisição (todos vêm do mesmo IP)')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Apaga os dados de teste (e o que foi criado com eles) e sai')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            return self.cleanup()
+        if options['setup']:
+            self.setup(options['restaurants'], options['customers'])
+        if bool(options['url']) == options['serve']:
+            raise CommandError('Use --url ou --serve.')
+
+        mix = self.parse_mix(options['mix'])
+        context = self.load_context()
+        stats = Stats()
+
+        server = None
+        if options['serve']:
+            server, base_url = self.serve(stats, options['keep_rate_limits'])
+        else:
+            base_url = options['url']
+
+        try:
+            elapsed = self.run(base_url, mix, context, stats, options)
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+        self.report(stats, elapsed, bool(server))
+
+    def parse_mix(self, value):
+        try:
+            mix = {name: float(weight) for name, weight in
+                   (part.split('=') for part in value.split(','))}
+        except ValueError:
+            raise CommandError(f'--mix inválido: {value}')
+        unknown = set(mix) - {'browse', 'book', 'order', 'owner'}
+        if unknown:
+            raise CommandError(f'Roteiros desconhecidos: {", ".join(sorted(unknown))}')
+        return mix
+
+    def load_context(self):
+        restaurants = Restaurant.objects.filter(name__startswith='Carga ').select_related('owner')
+        customers = list(User.objects.filter(username__startswith=f'{PREFIX}_cliente_')
+                         .values_list('username', flat=True))
+        if not restaurants or not customers:
+            raise CommandError('Sem dados de teste: rode com --setup.')
+        return {
+            'restaurants': [r.pk for r in restaurants],
+            'owners': {r.pk: r.owner.username for r in restaurants},
+            'customers': customers,
+        }
+
+    def serve(self, stats, keep_rate_limits):
+        from django.conf import settings
+        from django.core.servers.basehttp import (
+            ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application)
+        from django.core.signals import got_request_exception
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        def count_lock_errors(sender, **kwargs):
+            error = sys.exc_info()[1]
+            if isinstance(error, OperationalError) and 'lock' in str(error).lower():
+                stats.lock_error()
+
+        if not keep_rate_limits:
+            settings.RATE_LIMIT_ENABLED = False
+        # Os erros entram no relatório; sem o traceback de cada um no terminal
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        got_request_exception.connect(count_lock_errors, weak=False)
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        server.set_app(get_internal_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f'http://127.0.0.1:{server.server_port}'
+
+    def run(self, base_url, mix, context, stats, options):
+        rng = random.Random(options['seed'])
+        names, weights = list(mix), list(mix.values())
+
+        def visit(name, seed):
+            flows = Flows(context, random.Random(seed))
+            session = Session(base_url, stats, options['timeout'])
+            try:
+                ok = getattr(flows, name)(session)
+            except Exception:
+                ok = False
+            stats.flow(name, 'ok' if ok else 'falhou')
+
+        self.stdout.write(f'Carga em {base_url}: {options["rate"]:g} usuários/s por '
+                          f'{options["duration"]:g}s (até {options["users"]} simultâneos)')
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['users']) as pool:
+            arrival = 0.0
+            while True:
+                arrival += rng.expovariate(options['rate'])
+                if arrival > options['duration']:
+                    break
+                time.sleep(max(0.0, arrival - (time.perf_counter() - start)))
+                pool.submit(visit, rng.choices(names, weights)[0], rng.random())
+        return time.perf_counter() - start
+
+    def report(self, stats, elapsed, serving):
+        total = sum(len(values) for values in stats.latencies.values())
+        self.stdout.write(f'\n{total} requisições em {elapsed:.1f}s: {total / elapsed:.1f} req/s\n')
+        self.stdout.write(f'{"etapa":<22}{"reqs":>6}{"ok":>6}{"429":>5}{"503":>5}{"erros":>7}'
+                          f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"máx ms":>9}')
+        for step in sorted(stats.latencies):
+            values = stats.latencies[step]
+            statuses = stats.statuses[step]
+            ok = sum(n for s, n in statuses.items() if isinstance(s, int) and s < 400)
+            errors = sum(n for s, n in statuses.items()
+                         if s == 'erro' or (isinstance(s, int) and s >= 400 and s not in (429, 503)))
+            self.stdout.write(
+                f'{step:<22}{len(values):>6}{ok:>6}{statuses[429]:>5}{statuses[503]:>5}{errors:>7}'
+                + ''.join(f'{percentile(values, f) * 1000:>9.0f}' for f in (0.5, 0.95, 0.99, 1)))
+
+        self.stdout.write('\nRoteiros')
+        for name in sorted({name for name, _ in stats.flows}):
+            done, failed = stats.flows[(name, 'ok')], stats.flows[(name, 'falhou')]
+            self.stdout.write(f'  {name:<10} {done} ok, {failed} sem concluir')
+
+        if serving:
+            rate = stats.lock_errors / total if total else 0
+            self.stdout.write(f'\nErros de trava do banco: {stats.lock_errors} ({rate:.1%})')
+        else:
+            self.stdout.write('\nErros de trava do banco: só medidos com --serve')
+
+    def setup(self, restaurant_count, customer_count):
+        for i in range(customer_count):
+            self.ensure_user(f'{PREFIX}_cliente_{i}')
+        for i in range(restaurant_count):
+            owner = self.ensure_user(f'{PREFIX}_dono_{i}', is_business=True)
+            restaurant, created = Restaurant.objects.get_or_create(
+                name=f'Carga {i}', owner=owner, defaults={
+                    'description': 'Restaurante do teste de carga', 'address': '-',
+                    'phone': '-', 'opening_time': dtime(11), 'closing_time': dtime(23)})
+            if created:
+                Table.objects.bulk_create(
+                    Table(restaurant=restaurant, number=n, capacity=capacity)
+                    for n, capacity in enumerate([2, 2, 4, 4, 4, 4, 6, 6, 8, 8] * 2, 1))
+                for n in range(12):
+                    MenuItem.objects.create(
+                        restaurant=restaurant, name=f'Prato {n}', description='-',
+                        price=20 + n, category='prato_principal')
+        self.stdout.write(f'Dados de teste: {restaurant_count} restaurantes, '
+                          f'{customer_count} clientes (senha {PASSWORD})')
+
+    def ensure_user(self, username, is_business=False):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            user = User.objects.create_user(username, password=PASSWORD)
+            if is_business:
+                user.profile.is_business = True
+                user.profile.save()
+        return user
+
+    def cleanup(self):
+        restaurants = list(Restaurant.objects.filter(
+            name__startswith='Carga ', owner__username__startswith=f'{PREFIX}_'))
+        for restaurant in restaurants:
+            alias = shard_for(restaurant.pk)
+            using(Order.objects, alias).filter(restaurant_id=restaurant.pk).delete()
+            using(Reservation.objects, alias).filter(restaurant_id=restaurant.pk).delete()
+            WaitlistEntry.objects.filter(restaurant=restaurant).delete()
+            restaurant.delete()
+        users = User.objects.filter(username__startswith=f'{PREFIX}_')
+        user_ids = list(users.values_list('pk', flat=True))
+        for alias in shards():
+            # Pedidos/reservas dos clientes de teste em outros restaurantes
+            using(Order.objects, alias).filter(user_id__in=user_ids).delete()
+            using(Reservation.objects, alias).filter(user_id__in=user_ids).delete()
+        count = users.delete()[1].get('auth.User', 0)
+        self.stdout.write(f'Removidos {len(restaurants)} restaurantes e {count} usuários de teste.')
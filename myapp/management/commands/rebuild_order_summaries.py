@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from myapp.order_summary import rebuild
+from myapp.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o resumo dos pedidos (cliente, mesa, itens) em todos os shards'
+
+    def handle(self, *args, **options):
+        total = sum(rebuild(alias) for alias in shards())
+        self.stdout.write(self.style.SUCCESS(f'{total} pedido(s) atualizado(s).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from myapp.models import Reservation, Restaurant
+from myapp.sharding import shards
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Preenche início/fim das reservas gravadas sem save() (ex.: após loaddata)'
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.in_bulk()
+        total = 0
+        for alias in shards():
+            while True:
+                # Cada lote preenchido sai do filtro
+                batch = list(Reservation.objects.using(alias).filter(
+                    starts_at__isnull=True, restaurant_id__in=restaurants
+                ).order_by('pk')[:BATCH_SIZE])
+                if not batch:
+                    break
+                for reservation in batch:
+                    reservation.restaurant = restaurants[reservation.restaurant_id]
+                    reservation.compute_slot()
+                Reservation.objects.using(alias).bulk_update(batch, ['starts_at', 'ends_at'])
+                total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'{total} reserva(s) atualizada(s).'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from myapp.models import Restaurant, ScheduleInterval
+from myapp.schedule import rebuild_intervals
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os intervalos de funcionamento dos restaurantes (ex.: após loaddata)'
+
+    def handle(self, *args, **options):
+        for restaurant in Restaurant.objects.all():
+            rebuild_intervals(restaurant)
+        self.stdout.write(self.style.SUCCESS(
+            f'{ScheduleInterval.objects.count()} intervalo(s) gerado(s).'))
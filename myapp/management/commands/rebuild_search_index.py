@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from myapp.models import Restaurant, SearchTerm
+from myapp.search import index_restaurant
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca do cardápio (ex.: após loaddata; o fastloaddata já reconstrói)'
+
+    def handle(self, *args, **options):
+        for restaurant in Restaurant.objects.all():
+            index_restaurant(restaurant)
+        self.stdout.write(self.style.SUCCESS(
+            f'{SearchTerm.objects.count()} termo(s) indexado(s).'))
@@ -0,0 +1,91 @@
+import os
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from myapp.tasks import (
+    claim_jobs, enqueue_periodic, queue_depth, requeue_stale, run_job_ids, run_jobs
+)
+
+
+def init_worker():
+    # Cada processo do pool abre suas próprias conexões com o banco
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Consome a fila de tarefas em segundo plano (modelo Job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 2,
+                            help='Processos no pool (0 executa no próprio processo)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Jobs reservados por vez')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Espera (s) quando a fila está vazia')
+        parser.add_argument('--once', action='store_true',
+                            help='Processa o que estiver na fila e termina')
+        parser.add_argument('--stats', action='store_true',
+                            help='Mostra a profundidade da fila e termina')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+
+        self.worker = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'{requeued} job(s) presos devolvidos para a fila.')
+
+        processes = options['processes']
+        if processes <= 0:
+            return self.loop(options, pool=None)
+
+        # Não herdar conexões abertas nos processos filhos
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker) as pool:
+            self.loop(options, pool)
+
+    def loop(self, options, pool):
+        processed = 0
+        last_run = {}
+        try:
+            while True:
+                if not options['once']:
+                    enqueue_periodic(last_run)
+
+                jobs = claim_jobs(options['batch_size'], worker=self.worker)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if pool is None:
+                    run_jobs(jobs)
+                else:
+                    # Jobs da mesma tarefa vão juntos (tarefas em lote rodam uma vez)
+                    groups = defaultdict(list)
+                    for job in jobs:
+                        groups[job.name].append(job.pk)
+                    for future in [pool.submit(run_job_ids, ids) for ids in groups.values()]:
+                        future.result()
+                processed += len(jobs)
+                self.stdout.write(f'{processed} job(s) processado(s).')
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Fim: {processed} job(s) processado(s).'))
+
+    def print_stats(self):
+        depth = queue_depth()
+        if not depth:
+            self.stdout.write('Fila vazia.')
+        for name, statuses in sorted(depth.items()):
+            counts = ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))
+            self.stdout.write(f'{name}: {counts}')
@@ -0,0 +1,45 @@
+import random
+import statistics
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from myapp.seating import find_seating
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo da escolha de mesas (juntando mesas) em restaurantes grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', type=int, nargs='+', default=[20, 100, 250],
+                            help='Quantidades de mesas livres a testar')
+        parser.add_argument('--runs', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f'{"mesas":>6}{"média (ms)":>12}{"p99 (ms)":>10}'
+                          f'{"sem lugar":>11}{"desperdício":>13}')
+
+        for count in options['tables']:
+            timings, waste, failures = [], [], 0
+            for _ in range(options['runs']):
+                tables = [(i, rng.choice([2, 2, 4, 4, 4, 6, 8])) for i in range(count)]
+                capacity = dict(tables)
+                # Grupos grandes, acima da maior mesa, forçam a combinação
+                guests = rng.randint(9, 24)
+
+                start = perf_counter()
+                chosen = find_seating(tables, guests)
+                timings.append((perf_counter() - start) * 1000)
+
+                if chosen is None:
+                    failures += 1
+                else:
+                    waste.append(sum(capacity[t] for t in chosen) - guests)
+
+            timings.sort()
+            p99 = timings[int(len(timings) * 0.99) - 1]
+            self.stdout.write(
+                f'{count:>6}{statistics.mean(timings):>12.3f}{p99:>10.3f}'
+                f'{failures:>11}{statistics.mean(waste) if waste else 0:>13.2f}')
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from myapp.models import Restaurant
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara os backends de sessão: leituras e escritas em django_session '
+        'por requisição numa navegação típica (login, páginas, mensagens)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', nargs='+', default=list(settings.SESSION_ENGINES),
+                            choices=list(settings.SESSION_ENGINES))
+        parser.add_argument('--rounds', type=int, default=20,
+                            help='Repetições da navegação por backend')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"backend":<16}{"reqs":>6}{"leituras/req":>14}{"escritas/req":>14}')
+        for name in options['engines']:
+            requests, reads, writes = self.measure(settings.SESSION_ENGINES[name], options['rounds'])
+            self.stdout.write(
+                f'{name:<16}{requests:>6}{reads / requests:>14.2f}{writes / requests:>14.2f}')
+
+    def measure(self, engine, rounds):
+        requests = reads = writes = 0
+        try:
+            # Tudo roda numa transação desfeita no final (não suja o banco)
+            with transaction.atomic(), override_settings(
+                    SESSION_ENGINE=engine, ALLOWED_HOSTS=['*'], RATE_LIMIT_ENABLED=False):
+                User.objects.create_user('session_benchmark', password='benchmark')
+                other = User.objects.create_user('session_benchmark_owner')
+                restaurant = Restaurant.objects.create(
+                    name='Benchmark', description='-', address='-', phone='-',
+                    opening_time=timezone.now().time(), closing_time=timezone.now().time(),
+                    owner=other)
+                for _ in range(rounds):
+                    client = Client()
+                    steps = [
+                        lambda: client.post('/login/', {'username': 'session_benchmark',
+                                                        'password': 'benchmark'}),
+                        lambda: client.get('/'),
+                        lambda: client.get('/orders/'),
+                        lambda: client.get('/reservations/'),
+                        # Gera uma mensagem de erro (sem permissão) e a exibe
+                        lambda: client.get(f'/restaurant/{restaurant.pk}/orders/'),
+                        lambda: client.get(f'/restaurant/{restaurant.pk}/'),
+                    ]
+                    for step in steps:
+                        with CaptureQueriesContext(connection) as queries:
+                            step()
+                        requests += 1
+                        for query in queries:
+                            sql = query['sql'].lower()
+                            if 'django_session' not in sql:
+                                continue
+                            if sql.lstrip().startswith('select'):
+                                reads += 1
+                            else:
+                                writes += 1
+                raise Rollback
+        except Rollback:
+            pass
+        return requests, reads, writes
@@ -0,0 +1,133 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Roda num processo novo (com -X importtime) para medir uma subida a frio
+PROFILE_SCRIPT = '''
+import json, sys
+from time import perf_counter
+
+import django
+from django.apps import AppConfig
+
+options = json.loads(sys.argv[1])
+ready = {}
+create = AppConfig.create.__func__
+
+
+def timed_create(cls, entry):
+    config = create(cls, entry)
+    original = config.ready
+
+    def timed_ready():
+        start = perf_counter()
+        original()
+        ready[config.label] = perf_counter() - start
+
+    config.ready = timed_ready
+    return config
+
+
+AppConfig.create = classmethod(timed_create)
+
+start = perf_counter()
+from django.conf import settings
+settings.INSTALLED_APPS
+phases = [('settings', perf_counter() - start)]
+
+start = perf_counter()
+django.setup()
+phases.append(('django.setup', perf_counter() - start))
+
+steps = []
+if options['warmup']:
+    from myapp.warmup import warm_up
+    steps = [(name, seconds, isinstance(result, Exception))
+             for name, seconds, result in warm_up(force=True)]
+
+first_request = None
+if options['path']:
+    from django.test import Client
+    start = perf_counter()
+    status = Client().get(options['path'], HTTP_HOST='localhost').status_code
+    first_request = (perf_counter() - start, status)
+
+print(json.dumps({'phases': phases, 'ready': ready, 'steps': steps,
+                  'first_request': first_request}))
+'''
+
+
+def parse_importtime(lines):
+    """Linhas de -X importtime -> [(módulo, próprio_us, acumulado_us)]"""
+    modules = []
+    for line in lines:
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a subida a frio de um worker: tempo de import por módulo, '
+        'ready() de cada app, etapas do aquecimento e a primeira requisição'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20,
+                            help='Quantos módulos/pacotes mais lentos listar')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Não executa o aquecimento (compara a primeira requisição)')
+        parser.add_argument('--path', default='/',
+                            help='URL da primeira requisição ("" para não fazer)')
+
+    def handle(self, *args, **options):
+        payload = json.dumps({'warmup': not options['no_warmup'], 'path': options['path']})
+        env = dict(os.environ, ORDERUP_WARMUP='0')  # o script decide se aquece
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT, payload],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env)
+        if result.returncode != 0:
+            raise CommandError(f'Falha ao subir o worker de teste:\n{result.stderr[-2000:]}')
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr.splitlines())
+        top = options['top']
+
+        self.stdout.write('Fases (ms)')
+        for name, seconds in report['phases']:
+            self.stdout.write(f'  {name:<30}{seconds * 1000:>10.1f}')
+        total_imports = sum(own for _, own, _ in modules) / 1000
+        self.stdout.write(f'  {"imports (total)":<30}{total_imports:>10.1f}')
+
+        self.stdout.write('\nready() por app (ms)')
+        for label, seconds in sorted(report['ready'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {label:<30}{seconds * 1000:>10.1f}')
+
+        if report['steps']:
+            self.stdout.write('\nAquecimento (ms)')
+            for name, seconds, failed in report['steps']:
+                note = '  (falhou)' if failed else ''
+                self.stdout.write(f'  {name:<30}{seconds * 1000:>10.1f}{note}')
+
+        if report['first_request']:
+            seconds, status = report['first_request']
+            self.stdout.write(
+                f'\nPrimeira requisição {options["path"]} ({status}): {seconds * 1000:.1f} ms')
+
+        self.stdout.write(f'\nMódulos mais lentos (ms){"próprio":>18}{"acumulado":>12}')
+        for name, own, cumulative in sorted(modules, key=lambda m: -m[2])[:top]:
+            self.stdout.write(f'  {name[:40]:<40}{own / 1000:>10.1f}{cumulative / 1000:>12.1f}')
+
+        packages = defaultdict(int)
+        for name, own, _ in modules:
+            packages[name.split('.')[0]] += own
+        self.stdout.write('\nPacotes (tempo próprio somado, ms)')
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {name:<40}{own / 1000:>10.1f}')
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from myapp.routers import REPLICA_ALIAS, replica_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco principal para a réplica de leitura (SQLite). '
+        'Substitui a replicação de verdade em desenvolvimento e testes de carga'
+    )
+
+    def handle(self, *args, **options):
+        if not replica_enabled():
+            raise CommandError('Réplica não configurada (defina ORDERUP_READ_REPLICA).')
+
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('sync_replica só funciona com SQLite; use a replicação do banco.')
+
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            # API de backup do SQLite: cópia consistente mesmo com o principal em uso
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Réplica atualizada: {replica.settings_dict["NAME"]}'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from myapp.models import Order
+from myapp.rollups import update_rollups, rollups_high_water
+from myapp.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Atualiza incrementalmente as tabelas de vendas diárias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Pedidos por lote (padrão: 500)')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Usa a data de criação como data de entrega para '
+                                 'pedidos entregues antigos sem essa informação')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            filled = sum(
+                Order.objects.using(alias).filter(
+                    status='entregue', delivered_at__isnull=True
+                ).update(delivered_at=F('created_at'))
+                for alias in shards())
+            self.stdout.write(f'{filled} pedido(s) com data de entrega preenchida.')
+
+        processed = update_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} pedido(s) contabilizado(s). '
+            f'Processado até: {rollups_high_water() or "-"}'))
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import caching
+from .forms import MenuItemForm
+from .models import MenuItem
+from .search import index_restaurant
+
+# Campos importáveis (a imagem continua sendo enviada pelo formulário normal)
+IMPORT_FIELDS = ['name', 'description', 'price', 'category', 'available']
+UPDATE_FIELDS = ['description', 'price', 'category', 'available']
+BATCH_SIZE = 1000
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []  # [(linha, [mensagens])]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def parse_rows(data, filename=''):
+    """Lê um arquivo CSV ou JSON (lista de objetos) e devolve uma lista de dicts"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+
+    if filename.lower().endswith('.json') or data.lstrip().startswith('['):
+        rows = json.loads(data)
+        if not isinstance(rows, list):
+            raise ValueError('O JSON deve ser uma lista de itens.')
+        return rows
+    return list(csv.DictReader(io.StringIO(data)))
+
+
+def validate_rows(rows):
+    """
+    Valida todas as linhas com as mesmas regras do MenuItemForm.
+    Os campos do formulário são instanciados uma única vez e reaproveitados
+    em todas as linhas (bem mais rápido que um form por linha).
+    Retorna (dados_limpos, erros).
+    """
+    fields = {name: MenuItemForm.base_fields[name] for name in IMPORT_FIELDS}
+    cleaned, errors, seen = [], [], {}
+
+    for number, row in enumerate(rows, start=1):
+        row_errors, data = [], {}
+        if not isinstance(row, dict):
+            errors.append((number, ['Linha inválida.']))
+            continue
+
+        for name, field in fields.items():
+            value = row.get(name)
+            if name == 'available' and value in (None, ''):
+                value = True
+            elif name == 'available' and isinstance(value, str):
+                value = value.strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+            try:
+                data[name] = field.clean(value)
+            except ValidationError as e:
+                row_errors.extend(f'{field.label or name}: {message}' for message in e.messages)
+
+        name = data.get('name')
+        if name in seen:
+            row_errors.append(f'Nome repetido no arquivo (linha {seen[name]}).')
+        elif name:
+            seen[name] = number
+
+        if row_errors:
+            errors.append((number, row_errors))
+        else:
+            cleaned.append(data)
+    return cleaned, errors
+
+
+def import_menu(restaurant, rows):
+    """
+    Importa (insere ou atualiza pelo nome) os itens do cardápio em lotes.
+    Com erros de validação nada é gravado. O cache do cardápio é
+    invalidado uma única vez no final.
+    """
+    result = ImportResult()
+    cleaned, result.errors = validate_rows(rows)
+    if result.errors or not cleaned:
+        return result
+
+    with transaction.atomic():
+        for start in range(0, len(cleaned), BATCH_SIZE):
+            MenuItem.objects.bulk_create(
+                [MenuItem(restaurant=restaurant, **data)
+                 for data in cleaned[start:start + BATCH_SIZE]],
+                update_conflicts=True,
+                unique_fields=['restaurant', 'name'],
+                update_fields=UPDATE_FIELDS,
+            )
+        # bulk_create não dispara signals: reindexa a busca e invalida o cardápio uma vez
+        index_restaurant(restaurant)
+        namespace = caching.menu_namespace(restaurant.pk)
+        transaction.on_commit(lambda: caching.invalidate(namespace))
+
+    result.imported = len(cleaned)
+    return result
@@ -0,0 +1,349 @@
+"""
+Métricas (contadores, medidores e histogramas) somadas entre os processos.
+
+Cada processo grava seus valores num arquivo próprio, mapeado em memória
+(settings.METRICS['DIR']/<pid>.db): incrementar é escrever 8 bytes, sem
+trava entre processos nem consulta ao banco. A view /metrics lê os arquivos
+de todos os processos, soma e devolve no formato texto do Prometheus.
+
+Medidores (Gauge) de processos que já morreram são ignorados; contadores e
+histogramas continuam somando. Quando um processo abre o seu arquivo, os
+arquivos dos processos mortos (inclusive um antigo com o mesmo pid) são
+somados ao dele, sem os medidores, e apagados: o diretório não cresce a cada
+reinício e os totais não voltam atrás.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+REGISTRY = {}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Cabeçalho de 8 bytes: as entradas começam (e os valores ficam) alinhados em 8
+_HEADER = struct.Struct('q')  # bytes usados do arquivo
+_LENGTH = struct.Struct('i')  # tamanho da chave de cada entrada
+_VALUE = struct.Struct('d')
+_INITIAL_SIZE = 64 * 1024
+
+
+def _entries(data, used):
+    """(chave, valor, posição do valor) de cada entrada do arquivo"""
+    position = _HEADER.size
+    while position < used:
+        (length,) = _LENGTH.unpack_from(data, position)
+        key = bytes(data[position + 4:position + 4 + length]).decode()
+        value_at = position + 4 + length + (-(4 + length) % 8)
+        (value,) = _VALUE.unpack_from(data, value_at)
+        yield key, value, value_at
+        position = value_at + _VALUE.size
+
+
+class ProcessValues:
+    """Os valores de um processo: chave -> float num arquivo mapeado em memória"""
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._positions = {key: at for key, _, at in _entries(self._map, self._used)}
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode()
+        # Chave alinhada em 8 bytes para o valor ficar alinhado
+        padded = encoded + b' ' * (-(4 + len(encoded)) % 8)
+        size = 4 + len(padded) + _VALUE.size
+        while self._used + size > len(self._map):
+            new_size = len(self._map) * 2
+            self._file.truncate(new_size)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), new_size)
+        start = self._used
+        _LENGTH.pack_into(self._map, start, len(encoded))
+        self._map[start + 4:start + 4 + len(padded)] = padded
+        position = start + 4 + len(padded)
+        _VALUE.pack_into(self._map, position, 0.0)
+        self._used += size
+        # O cabeçalho muda por último: quem lê nunca vê uma entrada pela metade
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        position = self._position(key)
+        _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._map, self._position(key), value)
+
+
+_lock = threading.Lock()
+_values = None
+_values_path = None
+
+
+def metrics_dir():
+    return Path(settings.METRICS['DIR'])
+
+
+def _claim_stale_files(directory):
+    """Renomeia para este processo os arquivos de processos mortos; devolve os novos caminhos"""
+    claimed = []
+    for path in directory.glob('*.db'):
+        pid = int(path.stem)
+        # Um arquivo com o pid deste processo é de um processo antigo
+        if pid != os.getpid() and _alive(pid):
+            continue
+        target = path.with_name(f'{path.stem}.{os.getpid()}.stale')
+        try:
+            # O rename é atômico: dois processos iniciando juntos não somam o mesmo arquivo
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue
+        claimed.append(target)
+    return claimed
+
+
+def _merge_stale_file(values, path):
+    data = path.read_bytes()
+    if len(data) >= _HEADER.size:
+        for key, value, _ in _entries(data, _HEADER.unpack_from(data, 0)[0]):
+            metric = REGISTRY.get(json.loads(key)[0])
+            if metric is not None and metric.kind != 'gauge' and value:
+                values.add(key, value)
+    path.unlink()
+
+
+def _process_values():
+    global _values, _values_path
+    # Depois de um fork (workers pré-carregados) cada processo abre o seu arquivo
+    path = metrics_dir() / f'{os.getpid()}.db'
+    if path != _values_path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stale = _claim_stale_files(path.parent)
+        _values = ProcessValues(path)
+        _values_path = path
+        for stale_path in stale:
+            _merge_stale_file(_values, stale_path)
+    return _values
+
+
+def _key(metric, sample, labels):
+    return json.dumps([metric, sample, sorted(labels.items())], ensure_ascii=False)
+
+
+def _update(metric, sample, labels, amount=None, value=None):
+    if not settings.METRICS['ENABLED']:
+        return
+    names = metric.labelnames + (('le',) if sample == '_bucket' else ())
+    labels = {name: str(labels[name]) for name in names}
+    key = _key(metric.name, sample, labels)
+    with _lock:
+        values = _process_values()
+        if value is None:
+            values.add(key, amount)
+        else:
+            values.set(key, value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _update(self, '', labels, amount=amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        _update(self, '', labels, amount=amount)
+
+    def dec(self, amount=1, **labels):
+        _update(self, '', labels, amount=-amount)
+
+    def set(self, value, **labels):
+        _update(self, '', labels, value=value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        # Guarda a contagem de cada faixa; a soma acumulada é feita na exposição
+        bucket = next((b for b in self.buckets if value <= b), '+Inf')
+        _update(self, '_bucket', dict(labels, le=bucket), amount=1)
+        _update(self, '_sum', labels, amount=value)
+        _update(self, '_count', labels, amount=1)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """{(métrica, amostra, labels): valor} somado entre os arquivos dos processos"""
+    totals = defaultdict(float)
+    for path in metrics_dir().glob('*.db'):
+        alive = _alive(int(path.stem))
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            # Arquivo de processo morto que outro processo acabou de somar ao seu
+            continue
+        if len(data) < _HEADER.size:
+            continue
+        for key, value, _ in _entries(data, _HEADER.unpack_from(data, 0)[0]):
+            name, sample, labels = json.loads(key)
+            metric = REGISTRY.get(name)
+            if metric is None or (metric.kind == 'gauge' and not alive):
+                continue
+            totals[(name, sample, tuple(map(tuple, labels)))] += value
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def exposition():
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+    samples = defaultdict(dict)
+    for (name, sample, labels), value in collect().items():
+        samples[name][(sample, labels)] = value
+
+    lines = []
+    for name in sorted(samples):
+        metric = REGISTRY[name]
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        values = samples[name]
+        if metric.kind != 'histogram':
+            for (_, labels), value in sorted(values.items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            continue
+
+        label_sets = sorted({labels for sample, labels in values if sample != '_bucket'})
+        for labels in label_sets:
+            cumulative = 0
+            for bucket in metric.buckets + ('+Inf',):
+                bucket_labels = tuple(sorted(labels + (('le', str(bucket)),)))
+                cumulative += values.get(('_bucket', bucket_labels), 0)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bucket)),))} '
+                             f'{_format_value(cumulative)}')
+            lines.append(f'{name}_sum{_format_labels(labels)} '
+                         f'{_format_value(values.get(("_sum", labels), 0))}')
+            lines.append(f'{name}_count{_format_labels(labels)} '
+                         f'{_format_value(values.get(("_count", labels), 0))}')
+    return '\n'.join(lines) + '\n'
+
+
+# Métricas da aplicação
+
+http_requests = Counter(
+    'orderup_http_requests_total', 'Requisições atendidas', ['view', 'method', 'status'])
+http_duration = Histogram(
+    'orderup_http_request_duration_seconds', 'Duração das requisições', ['view'])
+http_in_progress = Gauge(
+    'orderup_http_requests_in_progress', 'Requisições em andamento')
+db_queries = Counter(
+    'orderup_db_queries_total', 'Consultas ao banco', ['view'])
+db_duration = Histogram(
+    'orderup_db_duration_seconds', 'Tempo no banco por requisição', ['view'])
+cache_requests = Counter(
+    'orderup_cache_requests_total', 'Leituras do cache em duas camadas', ['result'])
+orders_created = Counter(
+    'orderup_orders_created_total', 'Pedidos criados')
+reservations_created = Counter(
+    'orderup_reservations_created_total', 'Reservas criadas')
+order_transitions = Counter(
+    'orderup_order_status_transitions_total', 'Mudanças de status de pedidos',
+    ['from_status', 'to_status'])
+reservation_transitions = Counter(
+    'orderup_reservation_status_transitions_total', 'Mudanças de status de reservas',
+    ['from_status', 'to_status'])
+
+
+class MetricsMiddleware:
+    """Conta as requisições, a duração e o tempo gasto no banco por view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS['ENABLED']:
+            return self.get_response(request)
+
+        queries = [0, 0.0]  # quantidade, segundos
+
+        def timed(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        http_in_progress.inc()
+        start = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timed))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            http_in_progress.dec()
+            match = getattr(request, 'resolver_match', None)
+            view = match.view_name if match else 'desconhecida'
+            http_requests.inc(view=view, method=request.method, status=status)
+            http_duration.observe(time.perf_counter() - start, view=view)
+            db_queries.inc(queries[0], view=view)
+            db_duration.observe(queries[1], view=view)
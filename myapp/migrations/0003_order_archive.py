@@ -0,0 +1,111 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+ORDER_HISTORY_VIEW = '''
+CREATE VIEW myapp_orderhistory AS
+    SELECT id, user_id, restaurant_id, status, created_at, total, 0 AS archived
+      FROM myapp_order
+    UNION ALL
+    SELECT id, user_id, restaurant_id, status, created_at, total, 1 AS archived
+      FROM myapp_archivedorder
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_userprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('preparando', 'Preparando'), ('pronto', 'Pronto'), ('entregue', 'Entregue'), ('cancelado', 'Cancelado')], max_length=20, verbose_name='Status')),
+                ('created_at', models.DateTimeField(verbose_name='Criado em')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total')),
+                ('archived', models.BooleanField(verbose_name='Arquivado')),
+            ],
+            options={
+                'verbose_name': '9 - Histórico de Pedidos',
+                'verbose_name_plural': '9 - Histórico de Pedidos',
+                'db_table': 'myapp_orderhistory',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_number', models.IntegerField(blank=True, null=True, verbose_name='Número da Mesa')),
+                ('reservation_date', models.DateField(blank=True, null=True, verbose_name='Data da Reserva')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('preparando', 'Preparando'), ('pronto', 'Pronto'), ('entregue', 'Entregue'), ('cancelado', 'Cancelado')], max_length=20, verbose_name='Status')),
+                ('created_at', models.DateTimeField(verbose_name='Criado em')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Arquivado em')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+            ],
+            options={
+                'verbose_name': '7 - Pedido Arquivado',
+                'verbose_name_plural': '7 - Pedidos Arquivados',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=100, verbose_name='Nome do Item')),
+                ('quantity', models.IntegerField(verbose_name='Quantidade')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço')),
+            ],
+            options={
+                'verbose_name': '8 - Item Arquivado',
+                'verbose_name_plural': '8 - Itens Arquivados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Cliente'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.menuitem', verbose_name='Item'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='myapp.archivedorder', verbose_name='Pedido'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-created_at'], name='archorder_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['restaurant', '-created_at'], name='archorder_rest_created_idx'),
+        ),
+        migrations.RunSQL(
+            ORDER_HISTORY_VIEW,
+            reverse_sql='DROP VIEW IF EXISTS myapp_orderhistory',
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# View da 0003, recriada se esta migration for desfeita
+ORDER_HISTORY_VIEW_0003 = '''
+CREATE VIEW myapp_orderhistory AS
+    SELECT id, user_id, restaurant_id, status, created_at, total, 0 AS archived
+      FROM myapp_order
+    UNION ALL
+    SELECT id, user_id, restaurant_id, status, created_at, total, 1 AS archived
+      FROM myapp_archivedorder
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_order_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # No SQLite, refazer myapp_order (AddField abaixo) com uma view que a
+        # referencia quebra a migration; a 0019 recria a view
+        migrations.RunSQL(
+            'DROP VIEW IF EXISTS myapp_orderhistory',
+            reverse_sql=ORDER_HISTORY_VIEW_0003,
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('high_water', models.DateTimeField(blank=True, null=True, verbose_name='Processado até')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('orders', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária',
+                'verbose_name_plural': 'Vendas Diárias',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesDailyItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('item_name', models.CharField(max_length=100, verbose_name='Nome do Item')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Quantidade')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento')),
+                ('orders', models.IntegerField(default=0, verbose_name='Pedidos')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária por Item',
+                'verbose_name_plural': 'Vendas Diárias por Item',
+                'ordering': ['-date', 'item_name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Entregue em'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='rolled_up',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Contabilizado'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('rolled_up', False), ('status', 'entregue')), fields=['delivered_at'], name='order_pending_rollup_idx'),
+        ),
+        migrations.AddField(
+            model_name='salesdaily',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante'),
+        ),
+        migrations.AddField(
+            model_name='salesdailyitem',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myapp.menuitem', verbose_name='Item'),
+        ),
+        migrations.AddField(
+            model_name='salesdailyitem',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdaily',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'date'), name='unique_sales_daily'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdailyitem',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'date', 'item'), name='unique_sales_daily_item'),
+        ),
+    ]
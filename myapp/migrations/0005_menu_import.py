@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='menu_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão do Cardápio'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuitem',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='unique_menu_item_name'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:40
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Cópia do myapp.search da época: migrações não importam código da app,
+# que pode mudar depois
+WEIGHTS = {'name': 5, 'category': 3, 'restaurant': 2, 'description': 1}
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na',
+    'nos', 'nas', 'com', 'sem', 'para', 'por', 'um', 'uma', 'ao', 'ou',
+}
+TERM_LENGTH = 50
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def build_terms(name, description, category_label, restaurant_name):
+    terms = {}
+    fields = {
+        'name': name,
+        'description': description,
+        'category': category_label,
+        'restaurant': restaurant_name,
+    }
+    for field, text in fields.items():
+        for token in re.findall(r'\w+', normalize(text)):
+            if token not in STOPWORDS and len(token) > 1:
+                token = token[:TERM_LENGTH]
+                terms[token] = max(terms.get(token, 0), WEIGHTS[field])
+    return terms
+
+
+def build_search_index(apps, schema_editor):
+    # Cada banco (principal ou shard) indexa só os próprios itens
+    alias = schema_editor.connection.alias
+    MenuItem = apps.get_model('myapp', 'MenuItem')
+    SearchTerm = apps.get_model('myapp', 'SearchTerm')
+    categories = dict(MenuItem._meta.get_field('category').choices)
+
+    terms = []
+    for item in MenuItem.objects.using(alias).select_related('restaurant').iterator():
+        item_terms = build_terms(item.name, item.description,
+                                 categories.get(item.category, item.category),
+                                 item.restaurant.name)
+        terms.extend(SearchTerm(term=term, item_id=item.pk, weight=weight)
+                     for term, weight in item_terms.items())
+    SearchTerm.objects.using(alias).bulk_create(terms, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50, verbose_name='Termo')),
+                ('weight', models.SmallIntegerField(default=1, verbose_name='Peso')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.menuitem', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Termo de Busca',
+                'verbose_name_plural': 'Termos de Busca',
+                'constraints': [models.UniqueConstraint(fields=('term', 'item'), name='unique_search_term_item')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+# Cópia do myapp.schedule.build_intervals da época: migrações não importam
+# código da app, que pode mudar depois
+def build_intervals(spans):
+    raw = []
+    for weekday, opens, closes in spans:
+        start = weekday * MINUTES_PER_DAY + opens.hour * 60 + opens.minute
+        end = weekday * MINUTES_PER_DAY + closes.hour * 60 + closes.minute
+        if end <= start:
+            end += MINUTES_PER_DAY  # atravessa a meia-noite
+        if end > MINUTES_PER_WEEK:
+            raw.append((start, MINUTES_PER_WEEK))
+            raw.append((0, end - MINUTES_PER_WEEK))
+        else:
+            raw.append((start, end))
+
+    merged = []
+    for start, end in sorted(raw):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def build_schedule_intervals(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Restaurant = apps.get_model('myapp', 'Restaurant')
+    ScheduleInterval = apps.get_model('myapp', 'ScheduleInterval')
+    ScheduleInterval.objects.using(alias).bulk_create([
+        ScheduleInterval(restaurant_id=restaurant.pk, start_minute=start, end_minute=end)
+        for restaurant in Restaurant.objects.using(alias)
+        for start, end in build_intervals(
+            [(weekday, restaurant.opening_time, restaurant.closing_time) for weekday in range(7)])
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.SmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da Semana')),
+                ('opens', models.TimeField(verbose_name='Abre')),
+                ('closes', models.TimeField(verbose_name='Fecha')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='myapp.restaurant', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Horário de Funcionamento',
+                'verbose_name_plural': 'Horários de Funcionamento',
+                'ordering': ['weekday', 'opens'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduleInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_minute', models.IntegerField(verbose_name='Início (minuto da semana)')),
+                ('end_minute', models.IntegerField(verbose_name='Fim (minuto da semana)')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Intervalo de Funcionamento',
+                'verbose_name_plural': 'Intervalos de Funcionamento',
+                'indexes': [models.Index(fields=['start_minute', 'end_minute'], name='schedule_range_idx')],
+            },
+        ),
+        migrations.RunPython(build_schedule_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_opening_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='table_assignments', to='myapp.reservation', verbose_name='Reserva')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.table', verbose_name='Mesa')),
+            ],
+            options={
+                'verbose_name': 'Mesa da Reserva',
+                'verbose_name_plural': 'Mesas da Reserva',
+                'constraints': [models.UniqueConstraint(fields=('reservation', 'table'), name='unique_reservation_table')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:46
+
+from datetime import datetime, timedelta
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def backfill_reservation_slots(apps, schema_editor):
+    # Em lotes por pk, para não carregar todas as reservas de uma vez
+    # Reservas e restaurantes do banco sendo migrado
+    alias = schema_editor.connection.alias
+    Reservation = apps.get_model('myapp', 'Reservation')
+    last_pk = 0
+    while True:
+        batch = list(
+            Reservation.objects.using(alias).filter(pk__gt=last_pk).select_related('restaurant')
+            .order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        for reservation in batch:
+            restaurant = reservation.restaurant
+            minutes = (restaurant.large_party_duration
+                       if reservation.guests >= restaurant.large_party_size
+                       else restaurant.reservation_duration)
+            reservation.starts_at = timezone.make_aware(
+                datetime.combine(reservation.date, reservation.time))
+            reservation.ends_at = reservation.starts_at + timedelta(minutes=minutes)
+        Reservation.objects.using(alias).bulk_update(batch, ['starts_at', 'ends_at'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_reservation_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fim'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Início'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='large_party_duration',
+            field=models.PositiveIntegerField(default=150, validators=[django.core.validators.MinValueValidator(15)], verbose_name='Duração para Grupo Grande (min)'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='large_party_size',
+            field=models.PositiveIntegerField(default=7, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Grupo Grande a partir de (pessoas)'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='reservation_duration',
+            field=models.PositiveIntegerField(default=120, validators=[django.core.validators.MinValueValidator(15)], verbose_name='Duração da Reserva (min)'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['restaurant', 'starts_at', 'ends_at'], name='reservation_slot_idx'),
+        ),
+        migrations.RunPython(backfill_reservation_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:48
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_reservation_slots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('time', models.TimeField(verbose_name='Horário')),
+                ('guests', models.IntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Número de Pessoas')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('status', models.CharField(choices=[('aguardando', 'Aguardando'), ('promovida', 'Promovida'), ('cancelada', 'Cancelada')], default='aguardando', max_length=20, verbose_name='Status')),
+                ('starts_at', models.DateTimeField(editable=False, verbose_name='Início')),
+                ('ends_at', models.DateTimeField(editable=False, verbose_name='Fim')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Entrou na Fila em')),
+                ('reservation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='myapp.reservation', verbose_name='Reserva')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='myapp.restaurant', verbose_name='Restaurante')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Lista de Espera',
+                'verbose_name_plural': 'Lista de Espera',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['restaurant', 'status', 'starts_at'], name='waitlist_queue_idx')],
+            },
+        ),
+    ]
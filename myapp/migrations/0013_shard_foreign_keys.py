@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_waitlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='order',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.order', verbose_name='Pedido'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='restaurant',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Cliente'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='item',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.menuitem', verbose_name='Item'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='restaurant',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='table',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.table', verbose_name='Mesa'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Cliente'),
+        ),
+        migrations.AlterField(
+            model_name='reservationtable',
+            name='table',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.table', verbose_name='Mesa'),
+        ),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='reservation',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='myapp.reservation', verbose_name='Reserva'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_shard_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=100, verbose_name='View')),
+                ('method', models.CharField(max_length=10, verbose_name='Método')),
+                ('path', models.CharField(max_length=255, verbose_name='Caminho')),
+                ('kind', models.CharField(choices=[('cprofile', 'cProfile'), ('amostragem', 'Amostragem de pilha')], max_length=20, verbose_name='Tipo')),
+                ('duration_ms', models.FloatField(verbose_name='Duração (ms)')),
+                ('hot_spot', models.CharField(blank=True, max_length=255, verbose_name='Função mais cara')),
+                ('report', models.TextField(verbose_name='Relatório')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Perfil de View',
+                'verbose_name_plural': 'Perfis de Views',
+                'ordering': ['view_name', '-duration_ms'],
+                'indexes': [models.Index(fields=['view_name', 'duration_ms'], name='profile_view_duration_idx')],
+            },
+        ),
+    ]
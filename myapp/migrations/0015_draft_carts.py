@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:20
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_view_profiles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DraftCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')),
+                ('reservation', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='draft_carts', to='myapp.reservation', verbose_name='Reserva')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.restaurant', verbose_name='Restaurante')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Carrinho',
+                'verbose_name_plural': 'Carrinhos',
+            },
+        ),
+        migrations.CreateModel(
+            name='DraftCartLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Quantidade')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço Unitário')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='myapp.draftcart', verbose_name='Carrinho')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.menuitem', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Item do Carrinho',
+                'verbose_name_plural': 'Itens do Carrinho',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='draftcart',
+            constraint=models.UniqueConstraint(fields=('user', 'reservation'), name='unique_cart_per_reservation'),
+        ),
+        migrations.AddConstraint(
+            model_name='draftcartline',
+            constraint=models.UniqueConstraint(fields=('cart', 'item'), name='unique_cart_item'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:25
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+SUMMARY_LENGTH = 255
+
+
+def backfill_order_summary(apps, schema_editor):
+    # Pedidos ficam no banco sendo migrado (shard); usuários, mesas e
+    # cardápio no banco principal
+    alias = schema_editor.connection.alias
+    Order = apps.get_model('myapp', 'Order')
+    OrderItem = apps.get_model('myapp', 'OrderItem')
+    ReservationTable = apps.get_model('myapp', 'ReservationTable')
+    User = apps.get_model('auth', 'User')
+    Table = apps.get_model('myapp', 'Table')
+    MenuItem = apps.get_model('myapp', 'MenuItem')
+
+    last_pk = 0
+    while True:
+        batch = list(Order.objects.using(alias).filter(pk__gt=last_pk)
+                     .select_related('reservation').order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        ids = [order.pk for order in batch]
+        reservation_ids = [order.reservation_id for order in batch if order.reservation_id]
+
+        users = User.objects.using('default').in_bulk({order.user_id for order in batch})
+        assignments = {}
+        for reservation_id, table_id in ReservationTable.objects.using(alias).filter(
+                reservation_id__in=reservation_ids).values_list('reservation_id', 'table_id'):
+            assignments.setdefault(reservation_id, []).append(table_id)
+        items = list(OrderItem.objects.using(alias).filter(order_id__in=ids)
+                     .order_by('pk').values_list('order_id', 'item_id', 'quantity'))
+        numbers = dict(Table.objects.using('default').filter(
+            pk__in={t for tables in assignments.values() for t in tables}
+            | {order.reservation.table_id for order in batch if order.reservation_id}
+        ).values_list('id', 'number'))
+        names = dict(MenuItem.objects.using('default').filter(
+            pk__in={item_id for _, item_id, _ in items}).values_list('id', 'name'))
+        lines = {}
+        for order_id, item_id, quantity in items:
+            lines.setdefault(order_id, []).append((quantity, names.get(item_id, '?')))
+
+        for order in batch:
+            user = users.get(order.user_id)
+            order.customer_name = (
+                f'{user.first_name} {user.last_name}'.strip() or user.username) if user else ''
+            if order.reservation_id:
+                tables = assignments.get(order.reservation_id) or [order.reservation.table_id]
+                order.table_label = ' + '.join(
+                    str(n) for n in sorted(numbers[t] for t in tables if t in numbers))
+            order_lines = lines.get(order.pk, [])
+            order.item_count = sum(quantity for quantity, _ in order_lines)
+            summary = ', '.join(f'{quantity}x {name}' for quantity, name in order_lines)
+            if len(summary) > SUMMARY_LENGTH:
+                summary = summary[:SUMMARY_LENGTH - 1] + '…'
+            order.items_summary = summary
+        Order.objects.using(alias).bulk_update(
+            batch, ['customer_name', 'table_label', 'item_count', 'items_summary'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0015_draft_carts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='customer_name',
+            field=models.CharField(blank=True, editable=False, max_length=150, verbose_name='Nome do Cliente'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Quantidade de Itens'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_summary',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Itens'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='table_label',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='Mesa'),
+        ),
+        migrations.RunPython(backfill_order_summary, migrations.RunPython.noop),
+    ]
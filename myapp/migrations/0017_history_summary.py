@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+SUMMARY_LENGTH = 255
+
+
+def backfill_archived_summary(apps, schema_editor):
+    # Mesmo resumo de Order (0016), a partir dos itens arquivados
+    alias = schema_editor.connection.alias
+    ArchivedOrder = apps.get_model('myapp', 'ArchivedOrder')
+    ArchivedOrderItem = apps.get_model('myapp', 'ArchivedOrderItem')
+
+    last_pk = 0
+    while True:
+        batch = list(ArchivedOrder.objects.using(alias).filter(pk__gt=last_pk)
+                     .order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        lines = {}
+        for order_id, quantity, name in ArchivedOrderItem.objects.using(alias).filter(
+                order_id__in=[order.pk for order in batch]
+        ).order_by('pk').values_list('order_id', 'quantity', 'item_name'):
+            lines.setdefault(order_id, []).append((quantity, name))
+        for order in batch:
+            order_lines = lines.get(order.pk, [])
+            order.table_label = '' if order.table_number is None else str(order.table_number)
+            order.item_count = sum(quantity for quantity, _ in order_lines)
+            summary = ', '.join(f'{quantity}x {name}' for quantity, name in order_lines)
+            if len(summary) > SUMMARY_LENGTH:
+                summary = summary[:SUMMARY_LENGTH - 1] + '…'
+            order.items_summary = summary
+        ArchivedOrder.objects.using(alias).bulk_update(
+            batch, ['table_label', 'item_count', 'items_summary'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_order_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Quantidade de Itens'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='items_summary',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Itens'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='table_label',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='Mesa'),
+        ),
+        migrations.RunPython(backfill_archived_summary, migrations.RunPython.noop),
+    ]
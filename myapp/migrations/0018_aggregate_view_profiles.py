@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:44
+
+from django.db import migrations, models
+
+
+def delete_request_profiles(apps, schema_editor):
+    # Os perfis por requisição não se convertem em agregados: recomeça do zero
+    ViewProfile = apps.get_model('myapp', 'ViewProfile')
+    ViewProfile.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0017_history_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_request_profiles, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='viewprofile',
+            options={'ordering': ['-total_ms'], 'verbose_name': 'Perfil de View', 'verbose_name_plural': 'Perfis de Views'},
+        ),
+        migrations.RemoveIndex(
+            model_name='viewprofile',
+            name='profile_view_duration_idx',
+        ),
+        migrations.RemoveField(
+            model_name='viewprofile',
+            name='created_at',
+        ),
+        migrations.RemoveField(
+            model_name='viewprofile',
+            name='duration_ms',
+        ),
+        migrations.RemoveField(
+            model_name='viewprofile',
+            name='method',
+        ),
+        migrations.RemoveField(
+            model_name='viewprofile',
+            name='path',
+        ),
+        migrations.AddField(
+            model_name='viewprofile',
+            name='data',
+            field=models.BinaryField(default=b'', verbose_name='Dados'),
+        ),
+        migrations.AddField(
+            model_name='viewprofile',
+            name='max_ms',
+            field=models.FloatField(default=0, verbose_name='Mais lenta (ms)'),
+        ),
+        migrations.AddField(
+            model_name='viewprofile',
+            name='requests',
+            field=models.PositiveIntegerField(default=0, verbose_name='Requisições'),
+        ),
+        migrations.AddField(
+            model_name='viewprofile',
+            name='slowest_path',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Caminho da mais lenta'),
+        ),
+        migrations.AddField(
+            model_name='viewprofile',
+            name='total_ms',
+            field=models.FloatField(default=0, verbose_name='Tempo total (ms)'),
+        ),
+        migrations.AddField(
+            model_name='viewprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AlterField(
+            model_name='viewprofile',
+            name='report',
+            field=models.TextField(blank=True, verbose_name='Relatório'),
+        ),
+        migrations.AddConstraint(
+            model_name='viewprofile',
+            constraint=models.UniqueConstraint(fields=('view_name', 'kind'), name='unique_view_profile'),
+        ),
+    ]
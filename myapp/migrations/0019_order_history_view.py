@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Pedidos ativos + arquivados, lidos pelo modelo OrderHistory. Com shards a
+# view existe em todos os bancos (cada um une os pedidos que tem).
+# Migrations que refazem myapp_order, myapp_reservation ou myapp_archivedorder
+# no SQLite precisam remover a view antes e recriá-la depois (ver: 0004).
+ORDER_HISTORY_VIEW = '''
+CREATE VIEW myapp_orderhistory AS
+    SELECT o.id, o.user_id, o.restaurant_id, o.status, o.created_at, o.total,
+           o.table_label, o.item_count, o.items_summary,
+           r.date AS reservation_date, r.time AS reservation_time, 0 AS archived
+      FROM myapp_order o
+      LEFT JOIN myapp_reservation r ON r.id = o.reservation_id
+    UNION ALL
+    SELECT id, user_id, restaurant_id, status, created_at, total,
+           table_label, item_count, items_summary,
+           reservation_date, NULL, 1 AS archived
+      FROM myapp_archivedorder
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0018_aggregate_view_profiles'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            ['DROP VIEW IF EXISTS myapp_orderhistory', ORDER_HISTORY_VIEW],
+            reverse_sql='DROP VIEW IF EXISTS myapp_orderhistory',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0019_order_history_view'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='restaurant',
+            name='menu_version',
+        ),
+    ]
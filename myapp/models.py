@@ -1,9 +1,14 @@
+from datetime import datetime, timedelta
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
+from . import caching
+from .sharding import ShardedQuerySet
 
 # Perfil do Usuário (Empresa ou Cliente)
 class UserProfile(models.Model): # 1:1 com User
@@ -52,16 +57,75 @@ class Restaurant(models.Model):
     image = models.ImageField('Imagem', upload_to='restaurants/', null=True, blank=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Proprietário')
     created_at = models.DateTimeField('Criado em', default=timezone.now)
+    # Duração das reservas (em minutos); grupos grandes costumam ficar mais tempo
+    reservation_duration = models.PositiveIntegerField('Duração da Reserva (min)', default=120,
+                                                       validators=[MinValueValidator(15)])
+    large_party_size = models.PositiveIntegerField('Grupo Grande a partir de (pessoas)', default=7,
+                                                   validators=[MinValueValidator(1)])
+    large_party_duration = models.PositiveIntegerField('Duração para Grupo Grande (min)', default=150,
+                                                       validators=[MinValueValidator(15)])
 
     def __str__(self):
         return self.name
 
+    def reservation_minutes(self, guests):
+        """Duração (min) de uma reserva para o tamanho do grupo"""
+        if guests >= self.large_party_size:
+            return self.large_party_duration
+        return self.reservation_duration
+
     class Meta:
         verbose_name = '1 - Restaurante'
         verbose_name_plural = '1 - Restaurantes'
         ordering = ['name']
 
 
+# Horários de funcionamento por dia da semana (vários turnos por dia são permitidos)
+# Se "fecha" for menor ou igual a "abre", o turno atravessa a meia-noite
+class OpeningHours(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, 'Segunda-feira'),
+        (1, 'Terça-feira'),
+        (2, 'Quarta-feira'),
+        (3, 'Quinta-feira'),
+        (4, 'Sexta-feira'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+
+    restaurant = models.ForeignKey(Restaurant, 
+                                   on_delete=models.CASCADE, 
+                                   related_name='opening_hours', verbose_name='Restaurante')
+    weekday = models.SmallIntegerField('Dia da Semana', choices=WEEKDAY_CHOICES)
+    opens = models.TimeField('Abre')
+    closes = models.TimeField('Fecha')
+
+    def __str__(self):
+        return f'{self.get_weekday_display()} {self.opens:%H:%M}-{self.closes:%H:%M}'
+
+    class Meta:
+        verbose_name = 'Horário de Funcionamento'
+        verbose_name_plural = 'Horários de Funcionamento'
+        ordering = ['weekday', 'opens']
+
+
+# Horários pré-calculados em "minuto da semana" (0 = segunda 00:00, 10080 = fim de domingo)
+# Gerados a partir de OpeningHours (ver: myapp/schedule.py); "aberto às T" vira uma
+# consulta de faixa indexada: start_minute <= T < end_minute
+class ScheduleInterval(models.Model):
+    restaurant = models.ForeignKey(Restaurant, 
+                                   on_delete=models.CASCADE, verbose_name='Restaurante')
+    start_minute = models.IntegerField('Início (minuto da semana)')
+    end_minute = models.IntegerField('Fim (minuto da semana)')
+
+    class Meta:
+        verbose_name = 'Intervalo de Funcionamento'
+        verbose_name_plural = 'Intervalos de Funcionamento'
+        indexes = [
+            models.Index(fields=['start_minute', 'end_minute'], name='schedule_range_idx'),
+        ]
+
+
 # Tabela de mesas (vinculada a restaurantes)
 class Table(models.Model):
     restaurant = models.ForeignKey(Restaurant, 
@@ -104,8 +168,20 @@ class MenuItem(models.Model):
         verbose_name = '3 - Item do Cardápio'
         verbose_name_plural = '3 - Itens do Cardápio'
         ordering = ['category', 'name']
+        constraints = [
+            # Chave da importação em massa (upsert por restaurante + nome)
+            models.UniqueConstraint(fields=['restaurant', 'name'], name='unique_menu_item_name'),
+        ]
+
+def reservation_slot(restaurant, date, time, guests):
+    """Início e fim (com fuso) de uma reserva no restaurante"""
+    starts_at = timezone.make_aware(datetime.combine(date, time))
+    return starts_at, starts_at + timedelta(minutes=restaurant.reservation_minutes(guests))
+
 
 # Tabela de reservas (vinculada a usuários, restaurantes e mesas)
+# Reservas, pedidos e seus itens podem ficar em outro banco (ver: sharding.py),
+# por isso as FKs para tabelas do banco principal não têm constraint no banco
 class Reservation(models.Model):
     STATUS_CHOICES = [
         ('pendente', 'Pendente'),
@@ -114,10 +190,13 @@ class Reservation(models.Model):
         ('concluida', 'Concluída'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Cliente')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Cliente',
+                             db_constraint=False)
     restaurant = models.ForeignKey(Restaurant, 
-                                   on_delete=models.CASCADE, verbose_name='Restaurante')
-    table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name='Mesa')
+                                   on_delete=models.CASCADE, verbose_name='Restaurante',
+                                   db_constraint=False)
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name='Mesa',
+                              db_constraint=False)
     date = models.DateField('Data')
     time = models.TimeField('Horário')
     guests = models.IntegerField('Número de Pessoas', validators=[MinValueValidator(1)])
@@ -125,14 +204,106 @@ class Reservation(models.Model):
                               choices=STATUS_CHOICES, default='pendente')
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     notes = models.TextField('Observações', blank=True, null=True)
+    # Início e fim da reserva, calculados no save() a partir de date/time
+    # e da duração configurada no restaurante
+    starts_at = models.DateTimeField('Início', null=True, blank=True, editable=False)
+    ends_at = models.DateTimeField('Fim', null=True, blank=True, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
         return f'Reserva de {self.user.get_full_name()} - {self.restaurant.name}'
 
+    def compute_slot(self):
+        """Preenche starts_at/ends_at (precisa de date, time, guests e restaurant)"""
+        self.starts_at, self.ends_at = reservation_slot(
+            self.restaurant, self.date, self.time, self.guests)
+
+    def save(self, *args, **kwargs):
+        self.compute_slot()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'starts_at', 'ends_at'}
+        super().save(*args, **kwargs)
+
+    @property
+    def table_label(self):
+        """Mesas da reserva, ex.: "3 + 4" quando mesas foram juntadas"""
+        numbers = sorted(a.table.number for a in self.table_assignments.all())
+        return ' + '.join(str(n) for n in numbers) if numbers else str(self.table.number)
+
     class Meta:
         verbose_name = '4 - Reserva'
         verbose_name_plural = '4 - Reservas'
         ordering = ['-date', '-time']
+        indexes = [
+            # Sobreposição de horários: starts_at < fim AND ends_at > início
+            models.Index(fields=['restaurant', 'starts_at', 'ends_at'], name='reservation_slot_idx'),
+        ]
+
+# Mesas ocupadas por uma reserva (grupos grandes podem juntar várias mesas)
+# Reservation.table continua apontando para a mesa principal
+class ReservationTable(models.Model):
+    reservation = models.ForeignKey(Reservation, 
+                                    on_delete=models.CASCADE, 
+                                    related_name='table_assignments', verbose_name='Reserva')
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name='Mesa',
+                              db_constraint=False)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.reservation} - Mesa {self.table.number}'
+
+    class Meta:
+        verbose_name = 'Mesa da Reserva'
+        verbose_name_plural = 'Mesas da Reserva'
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'table'], name='unique_reservation_table'),
+        ]
+
+# Lista de espera: grupos aguardando mesa num horário lotado
+# Quando uma reserva é cancelada, o primeiro da fila que couber vira reserva
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = [
+        ('aguardando', 'Aguardando'),
+        ('promovida', 'Promovida'),
+        ('cancelada', 'Cancelada'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Cliente')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE,
+                                   related_name='waitlist', verbose_name='Restaurante')
+    date = models.DateField('Data')
+    time = models.TimeField('Horário')
+    guests = models.IntegerField('Número de Pessoas', validators=[MinValueValidator(1)])
+    notes = models.TextField('Observações', blank=True, null=True)
+    status = models.CharField('Status', max_length=20,
+                              choices=STATUS_CHOICES, default='aguardando')
+    starts_at = models.DateTimeField('Início', editable=False)
+    ends_at = models.DateTimeField('Fim', editable=False)
+    # Reserva criada quando a entrada foi promovida
+    reservation = models.OneToOneField(Reservation, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='waitlist_entry', verbose_name='Reserva',
+                                       db_constraint=False)
+    created_at = models.DateTimeField('Entrou na Fila em', default=timezone.now)
+
+    def __str__(self):
+        return f'Espera de {self.user.get_full_name()} - {self.restaurant.name}'
+
+    def save(self, *args, **kwargs):
+        self.starts_at, self.ends_at = reservation_slot(
+            self.restaurant, self.date, self.time, self.guests)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        verbose_name = 'Lista de Espera'
+        verbose_name_plural = 'Lista de Espera'
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Fila por restaurante: busca por faixa de horário entre os que aguardam
+            models.Index(fields=['restaurant', 'status', 'starts_at'], name='waitlist_queue_idx'),
+        ]
 
 # Tabela de pedidos (vinculada a usuários, restaurantes, reservas e itens do cardápio)
 class Order(models.Model):
@@ -145,9 +316,11 @@ class Order(models.Model):
     ]
 
     user = models.ForeignKey(User, 
-                             on_delete=models.CASCADE, verbose_name='Cliente')
+                             on_delete=models.CASCADE, verbose_name='Cliente',
+                             db_constraint=False)
     restaurant = models.ForeignKey(Restaurant, 
-                                   on_delete=models.CASCADE, verbose_name='Restaurante')
+                                   on_delete=models.CASCADE, verbose_name='Restaurante',
+                                   db_constraint=False)
     reservation = models.ForeignKey(Reservation, 
                                     on_delete=models.SET_NULL, 
                                     null=True, blank=True, verbose_name='Reserva')
@@ -158,24 +331,45 @@ class Order(models.Model):
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     total = models.DecimalField('Total', max_digits=10, decimal_places=2, default=0)
     notes = models.TextField('Observações', blank=True, null=True)
+    delivered_at = models.DateTimeField('Entregue em', null=True, blank=True)
+    # Já contabilizado nas tabelas de vendas diárias (ver: myapp/rollups.py)
+    rolled_up = models.BooleanField('Contabilizado', default=False, editable=False)
+    # Resumo para os quadros, sem buscar usuário, reserva, mesas e itens
+    # (ver: myapp/order_summary.py)
+    customer_name = models.CharField('Nome do Cliente', max_length=150, blank=True, editable=False)
+    table_label = models.CharField('Mesa', max_length=50, blank=True, editable=False)
+    item_count = models.PositiveIntegerField('Quantidade de Itens', default=0, editable=False)
+    items_summary = models.CharField('Itens', max_length=255, blank=True, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
-        return f'Pedido #{self.id} - {self.user.get_full_name()}'
+        return f'Pedido #{self.id} - {self.customer_name}'
 
     class Meta:
         verbose_name = '5 - Pedido'
         verbose_name_plural = '5 - Pedidos' 
         ordering = ['-created_at']
+        indexes = [
+            # Usado pelo arquivamento para achar pedidos finalizados antigos
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Índice parcial: só os pedidos entregues que ainda faltam contabilizar
+            models.Index(fields=['delivered_at'], name='order_pending_rollup_idx',
+                         condition=models.Q(status='entregue', rolled_up=False)),
+        ]
 
 
 # Tabela intermediária para itens do pedido
 # Permite armazenar quantidade e preço no momento do pedido (para histórico e pagamento)
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, verbose_name='Pedido')
-    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, verbose_name='Item')
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, verbose_name='Item',
+                             db_constraint=False)
     quantity = models.IntegerField('Quantidade', validators=[MinValueValidator(1)])
     price = models.DecimalField('Preço', max_digits=10, decimal_places=2)
 
+    objects = ShardedQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         # Sempre atualiza o preço baseado no item e quantidade
         if self.item:
@@ -196,4 +390,401 @@ class OrderItem(models.Model):
     class Meta:
         verbose_name = '6 - Item do Pedido'
         verbose_name_plural = '6 - Itens do Pedido'
-        ordering = ['order']
\ No newline at end of file
+        ordering = ['order']
+
+
+# Carrinho (rascunho do pedido) montado item a item antes de enviar
+class DraftCart(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Cliente')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name='Restaurante')
+    # A reserva fica no shard do restaurante
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, verbose_name='Reserva',
+                                    related_name='draft_carts', db_constraint=False)
+    total = models.DecimalField('Total', max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f'Carrinho de {self.user.username} - Reserva #{self.reservation_id}'
+
+    class Meta:
+        verbose_name = 'Carrinho'
+        verbose_name_plural = 'Carrinhos'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'reservation'], name='unique_cart_per_reservation'),
+        ]
+
+
+class DraftCartLine(models.Model):
+    cart = models.ForeignKey(DraftCart, on_delete=models.CASCADE, related_name='lines',
+                             verbose_name='Carrinho')
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, verbose_name='Item')
+    quantity = models.PositiveIntegerField('Quantidade', validators=[MinValueValidator(1)])
+    unit_price = models.DecimalField('Preço Unitário', max_digits=10, decimal_places=2)
+
+    @property
+    def subtotal(self):
+        return self.unit_price * self.quantity
+
+    def __str__(self):
+        return f'{self.quantity}x {self.item.name}'
+
+    class Meta:
+        verbose_name = 'Item do Carrinho'
+        verbose_name_plural = 'Itens do Carrinho'
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'item'], name='unique_cart_item'),
+        ]
+
+
+# Chaves de idempotência do envio de pedidos
+# Um reenvio (duplo clique, retry do celular) com a mesma chave devolve o pedido original
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Cliente')
+    key = models.CharField('Chave', max_length=64)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, verbose_name='Pedido',
+                              db_constraint=False)
+    created_at = models.DateTimeField('Criado em', auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        verbose_name = 'Chave de Idempotência'
+        verbose_name_plural = 'Chaves de Idempotência'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+
+# Histórico de pedidos arquivados
+# Pedidos entregues/cancelados antigos saem das tabelas "quentes" (Order/OrderItem)
+# e vêm para cá em formato compacto (ver: manage.py archive_orders)
+class ArchivedOrder(models.Model):
+    # Mantém o mesmo id do pedido original
+    id = models.BigIntegerField('ID', primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Cliente')
+    restaurant = models.ForeignKey(Restaurant, 
+                                   on_delete=models.CASCADE, verbose_name='Restaurante')
+    table_number = models.IntegerField('Número da Mesa', null=True, blank=True)
+    reservation_date = models.DateField('Data da Reserva', null=True, blank=True)
+    status = models.CharField('Status', max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField('Criado em')
+    archived_at = models.DateTimeField('Arquivado em', default=timezone.now)
+    total = models.DecimalField('Total', max_digits=10, decimal_places=2, default=0)
+    notes = models.TextField('Observações', blank=True, null=True)
+    # Resumo copiado do pedido (o mesmo de Order, lido pelo OrderHistory)
+    table_label = models.CharField('Mesa', max_length=50, blank=True, editable=False)
+    item_count = models.PositiveIntegerField('Quantidade de Itens', default=0, editable=False)
+    items_summary = models.CharField('Itens', max_length=255, blank=True, editable=False)
+
+    def __str__(self):
+        return f'Pedido arquivado #{self.id}'
+
+    class Meta:
+        verbose_name = '7 - Pedido Arquivado'
+        verbose_name_plural = '7 - Pedidos Arquivados'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archorder_user_created_idx'),
+            models.Index(fields=['restaurant', '-created_at'], name='archorder_rest_created_idx'),
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, 
+                              on_delete=models.CASCADE, 
+                              related_name='items', verbose_name='Pedido')
+    # Guarda o nome do item para o histórico não depender do cardápio atual
+    item = models.ForeignKey(MenuItem, 
+                             on_delete=models.SET_NULL, 
+                             null=True, blank=True, verbose_name='Item')
+    item_name = models.CharField('Nome do Item', max_length=100)
+    quantity = models.IntegerField('Quantidade')
+    price = models.DecimalField('Preço', max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f'{self.quantity}x {self.item_name}'
+
+    class Meta:
+        verbose_name = '8 - Item Arquivado'
+        verbose_name_plural = '8 - Itens Arquivados'
+
+
+# Modelo de leitura unificado (view SQL) com pedidos ativos + arquivados
+# Não é gerenciado pelo Django: a view é criada na migration 0003 e
+# redefinida na 0019
+class OrderHistory(models.Model):
+    id = models.BigIntegerField('ID', primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, verbose_name='Cliente')
+    restaurant = models.ForeignKey(Restaurant, 
+                                   on_delete=models.DO_NOTHING, verbose_name='Restaurante')
+    status = models.CharField('Status', max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField('Criado em')
+    total = models.DecimalField('Total', max_digits=10, decimal_places=2)
+    table_label = models.CharField('Mesa', max_length=50)
+    item_count = models.PositiveIntegerField('Quantidade de Itens')
+    items_summary = models.CharField('Itens', max_length=255)
+    # Só pedidos ativos (a reserva não é arquivada com o pedido)
+    reservation_date = models.DateField('Data da Reserva', null=True)
+    reservation_time = models.TimeField('Horário da Reserva', null=True)
+    archived = models.BooleanField('Arquivado')
+
+    def __str__(self):
+        return f'Pedido #{self.id}'
+
+    class Meta:
+        managed = False
+        db_table = 'myapp_orderhistory'
+        verbose_name = '9 - Histórico de Pedidos'
+        verbose_name_plural = '9 - Histórico de Pedidos'
+        ordering = ['-created_at']
+
+
+
+# Vendas diárias por restaurante (totais do dia)
+# Mantidas incrementalmente a partir dos pedidos entregues
+class SalesDaily(models.Model):
+    restaurant = models.ForeignKey(Restaurant, 
+                                   on_delete=models.CASCADE, verbose_name='Restaurante')
+    date = models.DateField('Data')
+    orders = models.IntegerField('Pedidos', default=0)
+    revenue = models.DecimalField('Faturamento', max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.restaurant.name} - {self.date}'
+
+    class Meta:
+        verbose_name = 'Venda Diária'
+        verbose_name_plural = 'Vendas Diárias'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date'], name='unique_sales_daily'),
+        ]
+
+
+# Vendas diárias por item do cardápio
+class SalesDailyItem(models.Model):
+    restaurant = models.ForeignKey(Restaurant, 
+                                   on_delete=models.CASCADE, verbose_name='Restaurante')
+    date = models.DateField('Data')
+    item = models.ForeignKey(MenuItem, 
+                             on_delete=models.SET_NULL, 
+                             null=True, blank=True, verbose_name='Item')
+    item_name = models.CharField('Nome do Item', max_length=100)
+    quantity = models.IntegerField('Quantidade', default=0)
+    revenue = models.DecimalField('Faturamento', max_digits=12, decimal_places=2, default=0)
+    orders = models.IntegerField('Pedidos', default=0)
+
+    def __str__(self):
+        return f'{self.item_name} - {self.date}'
+
+    class Meta:
+        verbose_name = 'Venda Diária por Item'
+        verbose_name_plural = 'Vendas Diárias por Item'
+        ordering = ['-date', 'item_name']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date', 'item'],
+                                    name='unique_sales_daily_item'),
+        ]
+
+
+# Marca d'água (high-water mark) dos processos incrementais
+class RollupState(models.Model):
+    name = models.CharField('Nome', max_length=50, unique=True)
+    high_water = models.DateTimeField('Processado até', null=True, blank=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+
+# Índice invertido da busca no cardápio (ver: myapp/search.py)
+# Um termo normalizado (minúsculo, sem acento) por linha, com o peso do campo de origem
+class SearchTerm(models.Model):
+    term = models.CharField('Termo', max_length=50)
+    item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, verbose_name='Item')
+    weight = models.SmallIntegerField('Peso', default=1)
+
+    def __str__(self):
+        return self.term
+
+    class Meta:
+        verbose_name = 'Termo de Busca'
+        verbose_name_plural = 'Termos de Busca'
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'item'], name='unique_search_term_item'),
+        ]
+
+
+# Fila de tarefas em segundo plano (ver: myapp/tasks.py e manage.py run_workers)
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluido', 'Concluído'),
+        ('falhou', 'Falhou'),
+    ]
+
+    name = models.CharField('Tarefa', max_length=100)
+    payload = models.JSONField('Dados', default=dict, blank=True)
+    status = models.CharField('Status', max_length=20, 
+                              choices=STATUS_CHOICES, default='pendente')
+    attempts = models.IntegerField('Tentativas', default=0)
+    max_attempts = models.IntegerField('Máximo de Tentativas', default=3)
+    run_at = models.DateTimeField('Executar em', default=timezone.now)
+    locked_by = models.CharField('Worker', max_length=64, blank=True)
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    started_at = models.DateTimeField('Iniciado em', null=True, blank=True)
+    finished_at = models.DateTimeField('Finalizado em', null=True, blank=True)
+    last_error = models.TextField('Último Erro', blank=True)
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-created_at']
+        indexes = [
+            # Busca dos próximos jobs a executar
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+
+class ViewProfile(models.Model):
+    """Perfil agregado de uma view: soma de todas as requisições medidas (ver: myapp/profiling.py)"""
+    KIND_CHOICES = [
+        ('cprofile', 'cProfile'),
+        ('amostragem', 'Amostragem de pilha'),
+    ]
+
+    view_name = models.CharField('View', max_length=100)
+    kind = models.CharField('Tipo', max_length=20, choices=KIND_CHOICES)
+    requests = models.PositiveIntegerField('Requisições', default=0)
+    total_ms = models.FloatField('Tempo total (ms)', default=0)
+    max_ms = models.FloatField('Mais lenta (ms)', default=0)
+    slowest_path = models.CharField('Caminho da mais lenta', max_length=255, blank=True)
+    hot_spot = models.CharField('Função mais cara', max_length=255, blank=True)
+    report = models.TextField('Relatório', blank=True)
+    # Estatísticas somadas (pstats ou contagem de pilhas), em marshal
+    data = models.BinaryField('Dados', default=b'')
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    @property
+    def average_ms(self):
+        return self.total_ms / self.requests if self.requests else 0
+
+    def __str__(self):
+        return f'{self.view_name} ({self.get_kind_display()})'
+
+    class Meta:
+        verbose_name = 'Perfil de View'
+        verbose_name_plural = 'Perfis de Views'
+        ordering = ['-total_ms']
+        constraints = [
+            models.UniqueConstraint(fields=['view_name', 'kind'], name='unique_view_profile'),
+        ]
+
+
+# Invalidação do cache (depois do commit, para ninguém recachear dados antigos)
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_restaurant_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: caching.invalidate('restaurants'))
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_menu_cache(sender, instance, **kwargs):
+    namespace = caching.menu_namespace(instance.restaurant_id)
+    transaction.on_commit(lambda: caching.invalidate(namespace))
+
+
+
+# Métricas de negócio (contadas só se a transação for confirmada)
+@receiver(post_save, sender=Order)
+def count_order_created(sender, instance, created, raw=False, using=None, **kwargs):
+    from .metrics import orders_created
+    if created and not raw:
+        transaction.on_commit(orders_created.inc, using=using)
+
+
+@receiver(post_save, sender=Reservation)
+def count_reservation_created(sender, instance, created, raw=False, using=None, **kwargs):
+    from .metrics import reservations_created
+    if created and not raw:
+        transaction.on_commit(reservations_created.inc, using=using)
+
+
+
+# Mantém o índice de busca atualizado
+@receiver(post_save, sender=MenuItem)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    from .search import index_item
+    if not raw:
+        index_item(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_search_index(sender, instance, created, raw=False, **kwargs):
+    from .search import index_restaurant
+    # Restaurante novo ainda não tem itens
+    if not created and not raw:
+        index_restaurant(instance)
+
+
+
+# Recalcula os intervalos de funcionamento quando os horários mudam
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_schedule(sender, instance, raw=False, **kwargs):
+    from .schedule import rebuild_intervals
+    if not raw:
+        rebuild_intervals(instance)
+
+
+@receiver([post_save, post_delete], sender=OpeningHours)
+def update_opening_hours_schedule(sender, instance, raw=False, **kwargs):
+    from .schedule import rebuild_intervals
+    if not raw and Restaurant.objects.filter(pk=instance.restaurant_id).exists():
+        rebuild_intervals(instance.restaurant)
+
+
+
+# Resumo desnormalizado dos pedidos (ver: myapp/order_summary.py)
+# Itens e mesas da reserva são atualizados por quem os grava (cart.place_order, admin)
+@receiver(pre_save, sender=Order)
+def fill_order_summary(sender, instance, raw=False, **kwargs):
+    from .order_summary import fill_customer_and_table
+    if instance._state.adding and not raw:
+        fill_customer_and_table(instance)
+
+
+@receiver(post_save, sender=Reservation)
+def update_order_table(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    from .order_summary import refresh_table
+    if not created and not raw and (update_fields is None or 'table' in update_fields):
+        refresh_table(instance)
+
+
+# Usuários, mesas e cardápio ficam no banco principal: os shards são
+# atualizados depois do commit
+@receiver(post_save, sender=User)
+def update_order_customer_name(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    from .order_summary import refresh_customer
+    name_fields = {'first_name', 'last_name', 'username'}
+    # Ex.: o login salva só last_login
+    if not created and not raw and (update_fields is None or name_fields & set(update_fields)):
+        transaction.on_commit(lambda: refresh_customer(instance))
+
+
+@receiver(post_save, sender=Table)
+def update_order_table_number(sender, instance, created, raw=False, **kwargs):
+    from .order_summary import refresh_table_number
+    if not created and not raw:
+        transaction.on_commit(lambda: refresh_table_number(instance))
+
+
+@receiver(post_save, sender=MenuItem)
+def update_order_item_names(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    from .order_summary import refresh_menu_item
+    if not created and not raw and (update_fields is None or 'name' in update_fields):
+        transaction.on_commit(lambda: refresh_menu_item(instance))
@@ -0,0 +1,146 @@
+"""
+Resumo desnormalizado do pedido: nome do cliente, mesa(s), quantidade de
+itens e a lista compacta de itens ("2x Pizza, 1x Suco").
+
+Os quadros (order_manage, my_orders) leem só colunas de Order, sem buscar
+o usuário, a reserva, as mesas e os itens (que ficam em outros bancos quando
+há shards). O resumo é preenchido na criação do pedido e refeito quando a
+origem muda:
+
+- itens do pedido: na mesma transação (mesmo shard);
+- mesas da reserva: na mesma transação (mesmo shard);
+- nome do cliente, número da mesa ou nome do prato: ficam no banco
+  principal, então a atualização dos shards roda depois do commit.
+
+Para reconstruir tudo (ex.: após loaddata; o fastloaddata já recalcula):
+manage.py rebuild_order_summaries
+"""
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from . import sharding
+from .models import MenuItem, Order, OrderItem, Reservation, ReservationTable, Table
+
+ACTIVE_STATUSES = ('pendente', 'preparando', 'pronto')
+SUMMARY_LENGTH = 255
+
+
+def customer_name(user):
+    return user.get_full_name() or user.username
+
+
+def table_label(reservation):
+    if reservation is None:
+        return ''
+    return reservation.table_label
+
+
+def items_summary(lines):
+    """[(quantidade, nome)] -> (total de unidades, "2x Pizza, 1x Suco")"""
+    count = sum(quantity for quantity, _ in lines)
+    summary = ', '.join(f'{quantity}x {name}' for quantity, name in lines)
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH - 1] + '…'
+    return count, summary
+
+
+def fill_customer_and_table(order):
+    """Preenche nome e mesa de um pedido novo (antes do INSERT)"""
+    order.customer_name = customer_name(order.user)
+    order.table_label = table_label(order.reservation)
+
+
+def refresh_items(order_ids, alias):
+    """Refaz quantidade e lista de itens dos pedidos (todos no shard `alias`)"""
+    orders = list(Order.objects.using(alias).filter(pk__in=order_ids)
+                  .only('id', 'item_count', 'items_summary'))
+    if not orders:
+        return
+    rows = list(OrderItem.objects.using(alias).filter(order_id__in=order_ids)
+                .order_by('pk').values_list('order_id', 'item_id', 'quantity'))
+    # Os itens do cardápio ficam no banco principal (sem JOIN com o shard dos pedidos)
+    names = dict(MenuItem.objects.filter(
+        pk__in={item_id for _, item_id, _ in rows}).values_list('id', 'name'))
+    lines = {}
+    for order_id, item_id, quantity in rows:
+        lines.setdefault(order_id, []).append((quantity, names.get(item_id, '?')))
+    for order in orders:
+        order.item_count, order.items_summary = items_summary(lines.get(order.pk, []))
+    Order.objects.using(alias).bulk_update(orders, ['item_count', 'items_summary'])
+
+
+def refresh_table(reservation):
+    """Atualiza a mesa nos pedidos da reserva (mesmo shard da reserva)"""
+    alias = reservation._state.db
+    orders = Order.objects.using(alias).filter(reservation_id=reservation.pk)
+    if not orders.exists():
+        return
+    label = table_label(reservation)
+    orders.exclude(table_label=label).update(table_label=label)
+
+
+def refresh_customer(user):
+    """Atualiza o nome do cliente nos pedidos de todos os shards"""
+    name = customer_name(user)
+    for alias in sharding.shards():
+        (Order.objects.using(alias).filter(user_id=user.pk)
+         .exclude(customer_name=name).update(customer_name=name))
+
+
+def refresh_table_number(table):
+    """Mesa renumerada: refaz o rótulo das reservas que a usam"""
+    alias = sharding.shard_for(table.restaurant_id)
+    reservations = Reservation.objects.using(alias).filter(
+        Q(table_id=table.pk) | Q(pk__in=ReservationTable.objects.using(alias)
+                                 .filter(table_id=table.pk).values('reservation_id'))
+    ).filter(order__isnull=False).distinct()
+    for reservation in reservations:
+        refresh_table(reservation)
+
+
+def refresh_menu_item(item):
+    """Prato renomeado: refaz a lista dos pedidos em aberto que o contêm"""
+    # Pedidos finalizados guardam o nome da época (como o histórico arquivado)
+    alias = sharding.shard_for(item.restaurant_id)
+    order_ids = list(OrderItem.objects.using(alias).filter(
+        item_id=item.pk, order__status__in=ACTIVE_STATUSES
+    ).values_list('order_id', flat=True).distinct())
+    if order_ids:
+        refresh_items(order_ids, alias)
+
+
+def table_labels(reservations, alias):
+    """{reservation_id: rótulo} com duas consultas (mesas juntadas e números)"""
+    tables = {reservation.pk: [reservation.table_id] for reservation in reservations}
+    assigned = {}
+    for reservation_id, table_id in ReservationTable.objects.using(alias).filter(
+            reservation_id__in=tables).values_list('reservation_id', 'table_id'):
+        assigned.setdefault(reservation_id, []).append(table_id)
+    tables.update(assigned)
+    numbers = dict(Table.objects.filter(
+        pk__in={t for ids in tables.values() for t in ids}).values_list('id', 'number'))
+    return {
+        reservation_id: ' + '.join(str(n) for n in sorted(numbers[t] for t in ids if t in numbers))
+        for reservation_id, ids in tables.items()
+    }
+
+
+def rebuild(alias, batch_size=500):
+    """Recalcula o resumo de todos os pedidos do shard; devolve quantos"""
+    total = 0
+    last_pk = 0
+    while True:
+        orders = list(Order.objects.using(alias).filter(pk__gt=last_pk)
+                      .select_related('reservation').order_by('pk')[:batch_size])
+        if not orders:
+            return total
+        users = User.objects.in_bulk({order.user_id for order in orders})
+        labels = table_labels([o.reservation for o in orders if o.reservation], alias)
+        for order in orders:
+            user = users.get(order.user_id)
+            order.customer_name = customer_name(user) if user else ''
+            order.table_label = labels.get(order.reservation_id, '')
+        Order.objects.using(alias).bulk_update(orders, ['customer_name', 'table_label'])
+        refresh_items([order.pk for order in orders], alias)
+        total += len(orders)
+        last_pk = orders[-1].pk
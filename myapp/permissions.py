@@ -0,0 +1,16 @@
+from . import caching
+from .models import Restaurant
+
+
+def restaurant_owner_id(restaurant_id):
+    """Id do dono do restaurante (em cache; invalidado quando o restaurante muda)"""
+    return caching.get_or_set(
+        'restaurants', f'owner:{restaurant_id}',
+        lambda: Restaurant.objects.filter(pk=restaurant_id).values_list(
+            'owner_id', flat=True).first())
+
+
+def can_manage_restaurant(user, restaurant_id, allow_superuser=True):
+    if allow_superuser and user.is_superuser:
+        return True
+    return user.is_authenticated and restaurant_owner_id(restaurant_id) == user.pk
@@ -0,0 +1,223 @@
+"""
+Perfil de requisições reais (opcional: settings.PROFILING['ENABLED']).
+
+`ProfilingMiddleware` escolhe o que medir:
+
+- cProfile: uma fração das requisições (SAMPLE_RATE) e todas as das views
+  listadas em VIEWS. Dá o custo exato por função, mas deixa a requisição
+  bem mais lenta; por isso só nessas.
+- Amostragem de pilha: com SLOW_MS, todas as outras requisições são
+  acompanhadas por uma thread que lê a pilha a cada SAMPLER_INTERVAL_MS
+  (sys._current_frames). O custo é baixo; o perfil só é guardado se a
+  requisição passar de SLOW_MS.
+
+Os perfis são somados por view em ViewProfile (um registro por view e
+tipo, visível no admin): as estatísticas do pstats ou as contagens de
+pilhas de cada requisição medida entram no total, e o relatório mostra as
+funções mais caras considerando todas elas.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+# Um cProfile por vez no processo (vários ativos juntos falham no Python 3.12+)
+_cprofile_lock = threading.Lock()
+
+
+def _frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Thread que conta as pilhas das threads registradas a cada `interval` segundos"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}  # thread id -> Counter de pilhas
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id, root):
+        """Passa a acompanhar a thread; só conta os frames abaixo de `root`"""
+        with self._lock:
+            self._active[thread_id] = (Counter(), root)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, (Counter(), None))[0]
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+            # Parada enquanto não há requisições sendo acompanhadas
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, (samples, root) in self._active.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None and frame is not root:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    if stack:
+                        samples[tuple(stack)] += 1
+
+
+def sampler_report(samples, interval, top):
+    """Funções por nº de amostras: total (na pilha) e próprio (no topo)"""
+    count = sum(samples.values())
+    own, total, depth = Counter(), Counter(), {}
+    for stack, hits in samples.items():
+        own[stack[0]] += hits
+        for level, label in enumerate(reversed(stack)):
+            depth[label] = max(depth.get(label, 0), level)
+        for label in set(stack):
+            total[label] += hits
+
+    lines = [f'{count} amostras a cada {interval * 1000:.0f} ms', '',
+             f'{"total":>7}{"próprio":>9}  função']
+    # Empates (ex.: middlewares, sempre na pilha) mostram primeiro os mais internos
+    ranked = sorted(total, key=lambda label: (-total[label], -own[label], -depth[label]))
+    for label in ranked[:top]:
+        lines.append(f'{total[label] / count:>7.1%}{own[label] / count:>9.1%}  {label}')
+    hot_spot = own.most_common(1)[0][0] if own else ''
+    return '\n'.join(lines), hot_spot
+
+
+def cprofile_report(stats, top):
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats('cumulative').print_stats(top)
+    # Função com mais tempo próprio (tottime)
+    hot = max(stats.stats.items(), key=lambda item: item[1][2], default=None)
+    hot_spot = ''
+    if hot:
+        filename, line, name = hot[0]
+        hot_spot = f'{name} ({os.path.basename(filename)}:{line})'
+    return stream.getvalue(), hot_spot
+
+
+class _SavedStats:
+    """Estatísticas já somadas, no formato que pstats.Stats aceita"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def merge_cprofile(data, profile):
+    """Soma o perfil às estatísticas guardadas; devolve (dados, pstats.Stats)"""
+    stats = pstats.Stats(profile)
+    if data:
+        stats.add(_SavedStats(marshal.loads(data)))
+    return marshal.dumps(stats.stats), stats
+
+
+def merge_samples(data, samples):
+    """Soma as contagens de pilhas às guardadas; devolve (dados, Counter)"""
+    total = Counter(marshal.loads(data)) if data else Counter()
+    total.update(samples)
+    return marshal.dumps(dict(total)), total
+
+
+def save_profile(request, view_name, kind, duration, merge):
+    """
+    Soma a requisição ao perfil agregado da view. `merge(dados)` junta as
+    estatísticas dela às guardadas e devolve (dados, relatório, função mais cara).
+    """
+    from .models import ViewProfile
+
+    with transaction.atomic():
+        profile, _ = ViewProfile.objects.select_for_update().get_or_create(
+            view_name=view_name, kind=kind)
+        profile.data, profile.report, profile.hot_spot = merge(bytes(profile.data))
+        profile.hot_spot = profile.hot_spot[:255]
+        profile.requests += 1
+        profile.total_ms += duration * 1000
+        if duration * 1000 >= profile.max_ms:
+            profile.max_ms = duration * 1000
+            profile.slowest_path = f'{request.method} {request.path}'[:255]
+        profile.save()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sampler = None
+
+    def __call__(self, request):
+        options = settings.PROFILING
+        if not options['ENABLED']:
+            return self.get_response(request)
+        try:
+            view_name = resolve(request.path_info).view_name
+        except Resolver404:
+            return self.get_response(request)
+
+        if view_name in options['VIEWS'] or random.random() < options['SAMPLE_RATE']:
+            return self.with_cprofile(request, view_name, options)
+        if options['SLOW_MS']:
+            return self.with_sampler(request, view_name, options)
+        return self.get_response(request)
+
+    def with_cprofile(self, request, view_name, options):
+        if not _cprofile_lock.acquire(blocking=False):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+            _cprofile_lock.release()
+        duration = time.perf_counter() - start
+
+        def merge(data):
+            data, stats = merge_cprofile(data, profile)
+            return (data, *cprofile_report(stats, options['TOP']))
+
+        save_profile(request, view_name, 'cprofile', duration, merge)
+        return response
+
+    def with_sampler(self, request, view_name, options):
+        interval = options['SAMPLER_INTERVAL_MS'] / 1000
+        if self.sampler is None:
+            self.sampler = StackSampler(interval)
+        thread_id = threading.get_ident()
+        start = time.perf_counter()
+        self.sampler.start(thread_id, sys._getframe())
+        try:
+            response = self.get_response(request)
+        finally:
+            samples = self.sampler.stop(thread_id)
+        duration = time.perf_counter() - start
+        if duration * 1000 >= options['SLOW_MS'] and samples:
+            def merge(data):
+                data, total = merge_samples(data, samples)
+                return (data, *sampler_report(total, interval, options['TOP']))
+
+            save_profile(request, view_name, 'amostragem', duration, merge)
+        return response
@@ -0,0 +1,93 @@
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .models import MenuItem, Order, OrderItem, SalesDaily, SalesDailyItem, RollupState
+from . import sharding
+
+ROLLUP_NAME = 'sales'
+
+
+def _add(model, lookup, defaults=None, **values):
+    """Soma os valores na linha (restaurante, dia[, item]); cria se não existir"""
+    # Cria a linha zerada ignorando a que outro worker tenha acabado de criar
+    # (restrição única), e só então soma: dois primeiros pedidos do dia ao
+    # mesmo tempo não disputam o INSERT
+    model.objects.bulk_create([model(**lookup, **(defaults or {}))], ignore_conflicts=True)
+    model.objects.filter(**lookup).update(
+        **{field: F(field) + value for field, value in values.items()})
+
+
+def _apply(order, sign):
+    day = timezone.localdate(order.delivered_at or order.created_at)
+    items = list(OrderItem.objects.using(order._state.db).filter(order=order).values_list(
+        'item_id', 'quantity', 'price'))
+    # Nomes vêm do banco principal (o pedido pode estar em outro shard)
+    names = dict(MenuItem.objects.filter(
+        pk__in=[item[0] for item in items]).values_list('id', 'name'))
+
+    _add(SalesDaily, {'restaurant_id': order.restaurant_id, 'date': day},
+         orders=sign, revenue=sign * order.total)
+
+    for item_id, quantity, price in items:
+        # Prato já excluído: a linha dele no resumo ficou com item NULL
+        # (SET_NULL), e NULL não entra na restrição única nem identifica a linha
+        if item_id not in names:
+            continue
+        _add(SalesDailyItem,
+             {'restaurant_id': order.restaurant_id, 'date': day, 'item_id': item_id},
+             defaults={'item_name': names[item_id]},
+             quantity=sign * quantity, revenue=sign * price, orders=sign)
+
+
+def _advance_high_water(moment):
+    """Avança a marca d'água até `moment` (nunca recua)"""
+    RollupState.objects.bulk_create([RollupState(name=ROLLUP_NAME)], ignore_conflicts=True)
+    RollupState.objects.filter(name=ROLLUP_NAME).filter(
+        Q(high_water__isnull=True) | Q(high_water__lt=moment)
+    ).update(high_water=moment, updated_at=timezone.now())
+
+
+def record_order(order):
+    """Contabiliza um pedido entregue nas vendas diárias (uma única vez)"""
+    with sharding.atomic(order._state.db):
+        # Trava o pedido e só marca se ainda não foi contabilizado
+        claimed = Order.objects.using(order._state.db).filter(
+            pk=order.pk, status='entregue', rolled_up=False).update(rolled_up=True)
+        if claimed:
+            _apply(order, 1)
+            _advance_high_water(order.delivered_at or order.created_at)
+        return bool(claimed)
+
+
+def unrecord_order(order):
+    """Desfaz a contabilização (ex.: pedido entregue que voltou a outro status)"""
+    with sharding.atomic(order._state.db):
+        claimed = Order.objects.using(order._state.db).filter(
+            pk=order.pk, rolled_up=True).exclude(status='entregue').update(rolled_up=False)
+        if claimed:
+            _apply(order, -1)
+        return bool(claimed)
+
+
+def update_rollups(batch_size=500):
+    """
+    Processa os pedidos entregues ainda não contabilizados (índice parcial);
+    cada um avança a marca d'água, como no worker. Retorna quantos pedidos
+    foram contabilizados.
+    """
+    processed = 0
+    for alias in sharding.shards():
+        while True:
+            orders = list(
+                Order.objects.using(alias).filter(status='entregue', rolled_up=False)
+                .order_by('delivered_at', 'id')[:batch_size])
+            if not orders:
+                break
+            for order in orders:
+                processed += record_order(order)
+    return processed
+
+
+def rollups_high_water():
+    return RollupState.objects.filter(
+        name=ROLLUP_NAME).aggregate(value=Max('high_water'))['value']
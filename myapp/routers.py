@@ -0,0 +1,93 @@
+"""
+Leitura em réplica (settings.DATABASES['replica'], opcional).
+
+Só as views marcadas com `@replica_reads` leem da réplica, e só em GET/HEAD.
+Escritas, transações (inclusive select_for_update) e tudo que roda fora
+dessas views continuam no banco principal.
+
+Ler-o-que-escreveu: depois de qualquer requisição que grava (POST etc.),
+`PinPrimaryMiddleware` grava um cookie e, enquanto ele valer
+(settings.REPLICA_PIN_SECONDS), as leituras daquele navegador vão ao principal.
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'orderup_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def replica_reads(view):
+    """Marca uma view somente-leitura: suas consultas podem ir para a réplica"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or is_pinned(request):
+            return view(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+def on_primary(func):
+    """Executa func() lendo do banco principal (ex.: valores que vão para o cache)"""
+    token = _use_replica.set(False)
+    try:
+        return func()
+    finally:
+        _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or not replica_enabled():
+            return DEFAULT_DB_ALIAS
+        # Dentro de uma transação a leitura precisa ver o que ela gravou
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e principal têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema por replicação (ou cópia), não por migrate
+        return db == DEFAULT_DB_ALIAS
+
+
+class PinPrimaryMiddleware:
+    """Depois de uma requisição que grava, fixa o navegador no banco principal"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and replica_enabled():
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds),
+                                max_age=seconds, httponly=True, samesite='Lax')
+        return response
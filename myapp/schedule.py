@@ -0,0 +1,104 @@
+"""
+Horários de funcionamento.
+
+Os turnos (OpeningHours) viram intervalos em minutos da semana
+(ScheduleInterval). Turnos que passam da meia-noite continuam no dia
+seguinte; os que passam de domingo para segunda são divididos em dois.
+Sem turnos cadastrados, vale opening_time/closing_time todos os dias.
+
+Depois de um loaddata (que não dispara os signals) rode
+manage.py rebuild_schedule; até lá os restaurantes sem intervalos são
+avaliados direto pelos turnos.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OpeningHours, Restaurant, ScheduleInterval
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def minute_of_week(dt):
+    """Minuto da semana no fuso local (0 = segunda-feira 00:00)"""
+    if timezone.is_aware(dt):
+        dt = timezone.localtime(dt)
+    return dt.weekday() * MINUTES_PER_DAY + dt.hour * 60 + dt.minute
+
+
+def build_intervals(spans):
+    """
+    spans: [(dia_da_semana, abre, fecha)] -> [(início, fim)] em minutos da
+    semana, já mesclados e sem sobreposição.
+    """
+    raw = []
+    for weekday, opens, closes in spans:
+        start = weekday * MINUTES_PER_DAY + _minutes(opens)
+        end = weekday * MINUTES_PER_DAY + _minutes(closes)
+        if end <= start:
+            end += MINUTES_PER_DAY  # atravessa a meia-noite
+        if end > MINUTES_PER_WEEK:
+            raw.append((start, MINUTES_PER_WEEK))
+            raw.append((0, end - MINUTES_PER_WEEK))
+        else:
+            raw.append((start, end))
+
+    merged = []
+    for start, end in sorted(raw):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def restaurant_spans(restaurant):
+    spans = [(h.weekday, h.opens, h.closes)
+             for h in OpeningHours.objects.filter(restaurant=restaurant)]
+    if not spans:
+        spans = [(weekday, restaurant.opening_time, restaurant.closing_time)
+                 for weekday in range(7)]
+    return spans
+
+
+def rebuild_intervals(restaurant):
+    with transaction.atomic():
+        ScheduleInterval.objects.filter(restaurant=restaurant).delete()
+        ScheduleInterval.objects.bulk_create([
+            ScheduleInterval(restaurant=restaurant, start_minute=start, end_minute=end)
+            for start, end in build_intervals(restaurant_spans(restaurant))
+        ])
+
+
+def _open_at(minute):
+    return ScheduleInterval.objects.filter(start_minute__lte=minute, end_minute__gt=minute)
+
+
+def _open_without_index(restaurant, minute):
+    # Restaurante sem intervalos (ex.: carregado com loaddata, que não dispara
+    # os signals): calcula pelos turnos ou por opening_time/closing_time
+    return any(start <= minute < end
+               for start, end in build_intervals(restaurant_spans(restaurant)))
+
+
+def open_restaurants(dt=None):
+    """Restaurantes abertos no instante `dt` (agora, se omitido)"""
+    minute = minute_of_week(dt or timezone.now())
+    unindexed = Restaurant.objects.exclude(
+        pk__in=ScheduleInterval.objects.values('restaurant_id'))
+    fallback = [r.pk for r in unindexed if _open_without_index(r, minute)]
+    return Restaurant.objects.filter(
+        Q(pk__in=_open_at(minute).values('restaurant_id')) | Q(pk__in=fallback))
+
+
+def is_open_at(restaurant_id, dt):
+    minute = minute_of_week(dt)
+    if ScheduleInterval.objects.filter(restaurant_id=restaurant_id).exists():
+        return _open_at(minute).filter(restaurant_id=restaurant_id).exists()
+    restaurant = Restaurant.objects.filter(pk=restaurant_id).first()
+    return restaurant is not None and _open_without_index(restaurant, minute)
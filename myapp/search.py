@@ -0,0 +1,131 @@
+"""
+Busca de pratos em todos os restaurantes.
+
+Cada item do cardápio é quebrado em termos normalizados (minúsculos e sem
+acento: "Feijão" -> "feijao") e gravados no índice invertido (SearchTerm).
+A busca vira uma consulta agrupada sobre o índice, sem varrer MenuItem.
+"""
+import re
+import unicodedata
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+from .models import MenuItem, SearchTerm
+
+# Peso de cada campo na relevância
+WEIGHTS = {
+    'name': 5,
+    'category': 3,
+    'restaurant': 2,
+    'description': 1,
+}
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na',
+    'nos', 'nas', 'com', 'sem', 'para', 'por', 'um', 'uma', 'ao', 'ou',
+}
+
+MAX_TERMS = 8
+TERM_LENGTH = 50
+
+
+def normalize(text):
+    """Minúsculas e sem acentos"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return [
+        token[:TERM_LENGTH] for token in re.findall(r'\w+', normalize(text))
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def build_terms(name, description, category_label, restaurant_name):
+    """Termos do item com o maior peso de cada um"""
+    terms = {}
+    fields = {
+        'name': name,
+        'description': description,
+        'category': category_label,
+        'restaurant': restaurant_name,
+    }
+    for field, text in fields.items():
+        for token in tokenize(text):
+            terms[token] = max(terms.get(token, 0), WEIGHTS[field])
+    return terms
+
+
+def _terms_for(item, restaurant_name):
+    return build_terms(item.name, item.description,
+                       item.get_category_display(), restaurant_name)
+
+
+def index_item(item):
+    """(Re)indexa um item do cardápio"""
+    terms = _terms_for(item, item.restaurant.name)
+    with transaction.atomic():
+        SearchTerm.objects.filter(item=item).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, item=item, weight=weight) for term, weight in terms.items()
+        ])
+
+
+def index_restaurant(restaurant):
+    """(Re)indexa todos os itens de um restaurante (ex.: mudou o nome ou importação em massa)"""
+    items = list(MenuItem.objects.filter(restaurant=restaurant))
+    with transaction.atomic():
+        SearchTerm.objects.filter(item__restaurant=restaurant).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, item=item, weight=weight)
+            for item in items
+            for term, weight in _terms_for(item, restaurant.name).items()
+        ], batch_size=1000)
+
+
+def _term_filter(token, prefix):
+    # Prefixo como faixa (term >= x AND term < x + \uffff) para usar o índice
+    if prefix:
+        return Q(term__gte=token, term__lt=token + '\uffff')
+    return Q(term=token)
+
+
+def search(query, page=1, per_page=20):
+    """
+    Busca ranqueada. Todos os termos precisam aparecer no item; o último
+    termo também casa como prefixo ("feij" encontra "feijoada").
+    Devolve (página, [(item, score), ...]).
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))[:MAX_TERMS]
+    if not tokens:
+        return None, []
+
+    conditions = [_term_filter(token, prefix=(i == len(tokens) - 1))
+                  for i, token in enumerate(tokens)]
+
+    any_term = Q()
+    for condition in conditions:
+        any_term |= condition
+
+    matches = {
+        f'match_{i}': Max(Case(When(condition, then=1), default=0,
+                               output_field=IntegerField()))
+        for i, condition in enumerate(conditions)
+    }
+
+    ranked = (
+        SearchTerm.objects.filter(any_term, item__available=True)
+        .values('item')
+        .annotate(score=Sum('weight'), **matches)
+        .filter(**{name: 1 for name in matches})
+        .order_by('-score', 'item')
+    )
+
+    page_obj = Paginator(ranked, per_page).get_page(page)
+    scores = {row['item']: row['score'] for row in page_obj.object_list}
+    items = MenuItem.objects.select_related('restaurant').in_bulk(list(scores))
+    results = [(items[pk], score) for pk, score in scores.items() if pk in items]
+    return page_obj, results
@@ -0,0 +1,126 @@
+"""
+Escolha de mesas para uma reserva.
+
+Se alguma mesa livre comporta o grupo, usa a menor delas. Senão, procura a
+combinação de mesas livres com o menor desperdício de lugares (e, no empate,
+com menos mesas) - um problema de soma de subconjuntos resolvido por
+programação dinâmica sobre as capacidades, com limite de tempo.
+"""
+from datetime import timedelta
+from time import perf_counter
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Reservation, ReservationTable, Table
+from .sharding import shard_for, using
+
+# Máximo de mesas juntadas para um mesmo grupo
+MAX_COMBINED_TABLES = 4
+
+# Limite de tempo (s) da busca; estourado, cai para uma solução gulosa
+TIME_BUDGET = 0.05
+
+ACTIVE_STATUSES = ['pendente', 'confirmada']
+
+
+def find_seating(tables, guests, max_tables=MAX_COMBINED_TABLES, time_budget=TIME_BUDGET):
+    """
+    tables: [(id, capacidade)] livres. Devolve a lista de ids escolhidos
+    (a maior mesa primeiro) ou None se não houver combinação possível.
+    """
+    if not tables:
+        return None
+
+    fitting = [t for t in tables if t[1] >= guests]
+    if fitting:
+        return [min(fitting, key=lambda t: (t[1], t[0]))[0]]
+
+    tables = sorted(tables, key=lambda t: -t[1])
+    if sum(capacity for _, capacity in tables[:max_tables]) < guests:
+        return None
+
+    # best[s] = (nº de mesas, máscara de bits das mesas) que somam exatamente s lugares
+    # Somas acima de guests + maior mesa nunca têm desperdício mínimo
+    limit = guests + tables[0][1]
+    best = {0: (0, 0)}
+    deadline = perf_counter() + time_budget
+
+    for index, (_, capacity) in enumerate(tables):
+        if perf_counter() > deadline:
+            break
+        for total in sorted(best, reverse=True):
+            count, mask = best[total]
+            new_total = total + capacity
+            if count >= max_tables or new_total > limit:
+                continue
+            current = best.get(new_total)
+            if current is None or count + 1 < current[0]:
+                best[new_total] = (count + 1, mask | (1 << index))
+
+    candidates = [(total - guests, count, mask)
+                  for total, (count, mask) in best.items() if total >= guests]
+    if candidates:
+        _, _, mask = min(candidates)
+        return [tables[i][0] for i in range(len(tables)) if mask >> i & 1]
+
+    return _greedy(tables, guests, max_tables)
+
+
+def _greedy(tables, guests, max_tables):
+    chosen, seats = [], 0
+    for table_id, capacity in tables:
+        chosen.append(table_id)
+        seats += capacity
+        if seats >= guests:
+            return chosen
+        if len(chosen) == max_tables:
+            break
+    return None
+
+
+def overlapping_reservations(restaurant, starts_at, ends_at):
+    """Reservas ativas cujo horário se sobrepõe a [starts_at, ends_at)"""
+    restaurant_id = getattr(restaurant, 'pk', restaurant)
+    # Reservas gravadas sem save() (ex.: loaddata) ficam sem starts_at/ends_at
+    # até o rebuild_reservation_slots; por segurança contam como ocupando o
+    # dia inteiro (e o anterior, que pode atravessar a meia-noite)
+    first_day = timezone.localdate(starts_at) - timedelta(days=1)
+    without_slot = Q(starts_at__isnull=True,
+                     date__range=(first_day, timezone.localdate(ends_at)))
+    return using(Reservation.objects, shard_for(restaurant_id)).filter(
+        Q(starts_at__lt=ends_at, ends_at__gt=starts_at) | without_slot,
+        restaurant_id=restaurant_id, status__in=ACTIVE_STATUSES)
+
+
+def occupied_tables(restaurant, starts_at, ends_at, exclude_reservation=None):
+    """Ids das mesas ocupadas por reservas ativas no intervalo"""
+    reservations = overlapping_reservations(restaurant, starts_at, ends_at)
+    if exclude_reservation is not None:
+        reservations = reservations.exclude(pk=exclude_reservation.pk)
+
+    assigned = ReservationTable.objects.using(reservations.db).filter(
+        reservation__in=reservations).values_list('table_id', flat=True)
+    primary = reservations.values_list('table_id', flat=True)
+    return set(assigned) | set(primary)
+
+
+def is_table_free(table, starts_at, ends_at, exclude_reservation=None):
+    return table.pk not in occupied_tables(
+        table.restaurant_id, starts_at, ends_at, exclude_reservation)
+
+
+def free_tables(restaurant, starts_at, ends_at):
+    occupied = occupied_tables(restaurant, starts_at, ends_at)
+    return list(
+        Table.objects.filter(restaurant=restaurant)
+        .exclude(pk__in=occupied).values_list('id', 'capacity'))
+
+
+def assign_tables(reservation, table_ids):
+    """Grava a mesa principal e todas as mesas da reserva (já salva)"""
+    assignments = ReservationTable.objects.using(reservation._state.db)
+    assignments.filter(reservation=reservation).delete()
+    assignments.bulk_create([
+        ReservationTable(reservation=reservation, table_id=table_id) for table_id in table_ids
+    ])
@@ -0,0 +1,171 @@
+"""
+Particionamento (sharding) de pedidos e reservas por restaurante.
+
+Order, OrderItem, Reservation e ReservationTable de um restaurante ficam no
+mesmo banco (shard), escolhido por `shard_for(restaurant_id)`. Usuários,
+restaurantes, cardápio, mesas e o resto continuam no banco principal
+('default'), que também é o shard 0.
+
+Os ids dos modelos particionados carregam o shard nos bits altos (a sequência
+do shard N começa em N << SHARD_ID_BITS), então `shard_for_pk(pk)` acha o
+banco de um pedido ou reserva só pelo id da URL.
+
+Consultas nos shards não podem fazer JOIN com tabelas do principal (usuários,
+restaurantes, itens do cardápio): use prefetch_related ou busque à parte.
+
+Sem settings.ORDER_SHARDS há um único shard ('default') e nada muda.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, models, router, transaction
+
+SHARD_ID_BITS = 40
+
+SHARDED_MODELS = {'myapp.order', 'myapp.orderitem', 'myapp.reservation', 'myapp.reservationtable'}
+
+
+def shards():
+    return getattr(settings, 'ORDER_SHARDS', None) or [DEFAULT_DB_ALIAS]
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def shard_for(restaurant_id):
+    """Banco dos pedidos/reservas do restaurante (mapa fixo: id módulo nº de shards)"""
+    # Restaurantes muito movimentados podem ganhar um shard próprio
+    overrides = getattr(settings, 'SHARD_OVERRIDES', {})
+    if restaurant_id in overrides:
+        return overrides[restaurant_id]
+    aliases = shards()
+    return aliases[int(restaurant_id) % len(aliases)]
+
+
+def shard_for_pk(pk):
+    """Banco de um pedido/reserva (ou item/mesa deles) pelo id"""
+    aliases = shards()
+    index = int(pk) >> SHARD_ID_BITS
+    return aliases[index] if index < len(aliases) else DEFAULT_DB_ALIAS
+
+
+def using(queryset, alias):
+    """
+    `queryset` (ou manager) no shard `alias`. Com um único shard não força o
+    banco, para os routers continuarem decidindo (ex.: leitura na réplica).
+    """
+    return queryset if len(shards()) == 1 else queryset.using(alias)
+
+
+@contextmanager
+def atomic(alias):
+    """Transação no banco principal e no shard (uma só se forem o mesmo)"""
+    with transaction.atomic():
+        if alias == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic(using=alias):
+                yield
+
+
+def fan_out(func):
+    """Executa func(alias) em todos os shards, em paralelo, e junta os resultados"""
+    aliases = shards()
+    if len(aliases) == 1:
+        return list(func(aliases[0]))
+    # Outros threads não veem uma transação aberta neste: consulta em sequência
+    if any(connections[alias].in_atomic_block for alias in aliases):
+        return [row for alias in aliases for row in func(alias)]
+
+    def run(alias):
+        try:
+            return list(func(alias))
+        finally:
+            # Conexões do Django são por thread: fecha as abertas aqui
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        return [row for rows in pool.map(run, aliases) for row in rows]
+
+
+class ShardedQuerySet(models.QuerySet):
+    """Manager dos modelos particionados: create() sem .using() vai para o shard certo"""
+
+    def create(self, **kwargs):
+        queryset = self
+        if self._db is None and len(shards()) > 1:
+            # Sem banco escolhido o router não recebe a instância; escolhe por ela aqui
+            queryset = self.using(router.db_for_write(self.model, instance=self.model(**kwargs)))
+        return super(ShardedQuerySet, queryset).create(**kwargs)
+
+
+class ShardRouter:
+    """Escolhe o shard pelos hints (instância relacionada); senão deixa para o próximo router"""
+
+    def _shard(self, model, hints):
+        if len(shards()) == 1 or not is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label_lower == 'myapp.restaurant':
+            return shard_for(instance.pk)
+        # O restaurante (ou o pedido/reserva pai) decide; _state.db de uma
+        # instância nova pode ter vindo de outra relação (ex.: o usuário)
+        if getattr(instance, 'restaurant_id', None) is not None:
+            return shard_for(instance.restaurant_id)
+        for field in ('order_id', 'reservation_id'):
+            pk = getattr(instance, field, None)
+            if pk is not None:
+                return shard_for_pk(pk)
+        if is_sharded(instance) and instance._state.db:
+            return instance._state.db
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Os shards recebem o schema completo (só as tabelas particionadas são usadas)
+        return True if db in shards() else None
+
+
+def seed_shard_sequences(using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate: faz os ids do shard N começarem em N << SHARD_ID_BITS"""
+    from django.apps import apps
+
+    aliases = shards()
+    if using not in aliases or not aliases.index(using):
+        return
+    base = aliases.index(using) << SHARD_ID_BITS
+    connection = connections[using]
+    tables = set(connection.introspection.table_names())
+
+    with connection.cursor() as cursor:
+        for model in apps.get_app_config('myapp').get_models():
+            table = model._meta.db_table
+            if not is_sharded(model) or table not in tables:
+                continue
+            if connection.vendor == 'sqlite':
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                                   [table, base])
+                elif row[0] < base:
+                    cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s',
+                                   [base, table])
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                    f'GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))',
+                    [table, 'id', base])
+            else:
+                raise ImproperlyConfigured(
+                    f'Sequências de shard não suportadas para {connection.vendor}.')
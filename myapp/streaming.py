@@ -0,0 +1,51 @@
+"""
+Renderização em streaming das tabelas longas (gestão de pedidos e reservas).
+
+A página é renderizada uma vez com um marcador no lugar das linhas
+(`{{ table_rows }}`): o começo sai logo, as linhas vêm do banco em lotes
+(queryset.iterator) e cada lote é renderizado e enviado, depois o fim da
+página. Nem a lista de objetos nem o HTML inteiro ficam na memória.
+Tabelas pequenas (menos de settings.STREAMING['MIN_ROWS'] linhas) seguem o
+render normal.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+ROWS_MARKER = '<!-- linhas da tabela -->'
+
+
+def render_table(request, template_name, rows_template, context, rows_name, total_rows):
+    """
+    Renderiza `template_name`, cujas linhas vêm de `rows_template` iterando
+    context[rows_name]; em streaming quando há muitas linhas.
+    """
+    options = settings.STREAMING
+    if not options['ENABLED'] or total_rows < options['MIN_ROWS']:
+        return render(request, template_name, context)
+
+    page = render_to_string(
+        template_name, dict(context, table_rows=mark_safe(ROWS_MARKER)), request)
+    head, tail = page.split(ROWS_MARKER, 1)
+    rows_template = get_template(rows_template)
+    # O cookie do CSRF precisa sair nos cabeçalhos, antes das linhas com {% csrf_token %}
+    get_token(request)
+
+    def generate():
+        yield head
+        batch, sent = [], 0
+        for row in context[rows_name].iterator(chunk_size=options['CHUNK_SIZE']):
+            batch.append(row)
+            if len(batch) == options['CHUNK_SIZE']:
+                yield rows_template.render(dict(context, **{rows_name: batch}), request)
+                sent += len(batch)
+                batch = []
+        # Último lote (ou a linha de "nenhum encontrado")
+        if batch or not sent:
+            yield rows_template.render(dict(context, **{rows_name: batch}), request)
+        yield tail
+
+    return StreamingHttpResponse(generate(), content_type='text/html; charset=utf-8')
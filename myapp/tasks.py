@@ -0,0 +1,260 @@
+"""
+Fila de tarefas simples, guardada no banco (modelo Job).
+
+As views chamam `enqueue(...)`: o job só é gravado depois do commit da
+transação, então nunca roda com dados que ainda podem ser desfeitos.
+O comando `manage.py run_workers` consome a fila em um pool de processos.
+"""
+import logging
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import IdempotencyKey, Job, Order, Reservation
+from .rollups import record_order, unrecord_order
+from .sharding import shard_for_pk, using
+
+logger = logging.getLogger(__name__)
+
+# nome -> (função, batch, max_attempts)
+TASKS = {}
+
+RETRY_BASE_SECONDS = 10
+
+
+def task(name, batch=False, max_attempts=3):
+    """
+    Registra uma tarefa. Com batch=True a função recebe a lista de payloads
+    de todos os jobs iguais pegos no mesmo lote (uma chamada só).
+    """
+    def decorator(func):
+        TASKS[name] = (func, batch, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=0):
+    """Agenda uma tarefa para depois do commit da transação atual"""
+    if name not in TASKS:
+        raise ValueError(f'Tarefa desconhecida: {name}')
+
+    def create():
+        Job.objects.create(
+            name=name,
+            payload=payload or {},
+            max_attempts=TASKS[name][2],
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+    transaction.on_commit(create)
+
+
+def claim_jobs(limit=50, worker=None):
+    """Reserva até `limit` jobs prontos para este worker (sem disputa com outros)"""
+    worker = worker or uuid.uuid4().hex
+    ids = list(
+        Job.objects.filter(status='pendente', run_at__lte=timezone.now())
+        .order_by('run_at', 'id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    Job.objects.filter(id__in=ids, status='pendente').update(
+        status='executando', locked_by=worker, started_at=timezone.now())
+    return list(Job.objects.filter(id__in=ids, locked_by=worker, status='executando'))
+
+
+def requeue_stale(minutes=10):
+    """Devolve para a fila jobs presos em 'executando' (worker que morreu)"""
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return Job.objects.filter(status='executando', started_at__lt=cutoff).update(
+        status='pendente', locked_by='')
+
+
+def run_job_ids(ids):
+    """Executa jobs já reservados (usado pelos processos do pool)"""
+    run_jobs(list(Job.objects.filter(id__in=ids, status='executando')))
+    return len(ids)
+
+
+def run_jobs(jobs):
+    """Executa os jobs agrupados por tarefa; tarefas em lote rodam uma vez por grupo"""
+    groups = defaultdict(list)
+    for job in jobs:
+        groups[job.name].append(job)
+
+    for name, group in groups.items():
+        if name not in TASKS:
+            for job in group:
+                _finish(job, f'Tarefa desconhecida: {name}', retry=False)
+            continue
+
+        func, batch, _ = TASKS[name]
+        if batch:
+            try:
+                func([job.payload for job in group])
+            except Exception:
+                error = traceback.format_exc()
+                for job in group:
+                    _finish(job, error)
+            else:
+                for job in group:
+                    _finish(job)
+            continue
+
+        for job in group:
+            try:
+                func(job.payload)
+            except Exception:
+                _finish(job, traceback.format_exc())
+            else:
+                _finish(job)
+
+
+def _finish(job, error=None, retry=True):
+    job.attempts += 1
+    job.finished_at = timezone.now()
+    if error is None:
+        job.status = 'concluido'
+        job.last_error = ''
+    elif retry and job.attempts < job.max_attempts:
+        # Nova tentativa com espera exponencial (10s, 20s, 40s...)
+        logger.warning('Job %s falhou (tentativa %s): %s', job.pk, job.attempts, error)
+        job.status = 'pendente'
+        job.run_at = timezone.now() + timedelta(
+            seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        job.last_error = error
+    else:
+        logger.error('Job %s falhou definitivamente: %s', job.pk, error)
+        job.status = 'falhou'
+        job.last_error = error
+    job.locked_by = ''
+    job.save(update_fields=['attempts', 'finished_at', 'status', 'run_at',
+                            'last_error', 'locked_by'])
+
+
+def enqueue_periodic(last_run):
+    """
+    Agenda as tarefas de settings.PERIODIC_TASKS cujo intervalo já passou.
+    `last_run` (nome -> instante) é mantido pelo worker entre as chamadas.
+    Não agenda se já houver um job igual esperando na fila.
+    """
+    now = timezone.now()
+    for name, interval in getattr(settings, 'PERIODIC_TASKS', {}).items():
+        last = last_run.get(name)
+        if last and (now - last).total_seconds() < interval:
+            continue
+        last_run[name] = now
+        if not Job.objects.filter(name=name, status__in=['pendente', 'executando']).exists():
+            enqueue(name)
+
+
+def queue_depth():
+    """Quantidade de jobs por tarefa e status"""
+    depth = defaultdict(dict)
+    rows = Job.objects.exclude(status='concluido').values(
+        'name', 'status').annotate(count=Count('id'))
+    for row in rows:
+        depth[row['name']][row['status']] = row['count']
+    return dict(depth)
+
+
+# Tarefas
+
+@task('notify_reservation_status')
+def notify_reservation_status(payload):
+    reservation = using(Reservation.objects, shard_for_pk(payload['reservation_id'])).get(
+        pk=payload['reservation_id'])
+    if not reservation.user.email:
+        return
+    status = 'confirmada' if reservation.status == 'confirmada' else 'rejeitada'
+    send_mail(
+        f'Sua reserva no {reservation.restaurant.name} foi {status}',
+        f'Olá {reservation.user.get_full_name() or reservation.user.username},\n\n'
+        f'Sua reserva para {reservation.date:%d/%m/%Y} às {reservation.time:%H:%M} '
+        f'({reservation.guests} pessoas) foi {status}.',
+        settings.DEFAULT_FROM_EMAIL,
+        [reservation.user.email],
+    )
+
+
+@task('notify_waitlist_promoted')
+def notify_waitlist_promoted(payload):
+    reservation = using(Reservation.objects, shard_for_pk(payload['reservation_id'])).get(
+        pk=payload['reservation_id'])
+    if not reservation.user.email:
+        return
+    send_mail(
+        f'Abriu uma mesa no {reservation.restaurant.name}',
+        f'Olá {reservation.user.get_full_name() or reservation.user.username},\n\n'
+        f'Você estava na lista de espera e conseguimos uma mesa para '
+        f'{reservation.date:%d/%m/%Y} às {reservation.time:%H:%M} '
+        f'({reservation.guests} pessoas). Sua reserva aguarda confirmação do restaurante.',
+        settings.DEFAULT_FROM_EMAIL,
+        [reservation.user.email],
+    )
+
+
+@task('notify_new_order')
+def notify_new_order(payload):
+    order = using(Order.objects, shard_for_pk(payload['order_id'])).get(pk=payload['order_id'])
+    owner = order.restaurant.owner
+    if not owner.email:
+        return
+    send_mail(
+        f'Novo pedido #{order.pk} - {order.restaurant.name}',
+        f'Um novo pedido de R$ {order.total} foi realizado.',
+        settings.DEFAULT_FROM_EMAIL,
+        [owner.email],
+    )
+
+
+@task('sync_order_rollup', batch=True)
+def sync_order_rollup(payloads):
+    """Atualiza as vendas diárias dos pedidos que mudaram de status"""
+    by_shard = defaultdict(set)
+    for payload in payloads:
+        by_shard[shard_for_pk(payload['order_id'])].add(payload['order_id'])
+    orders = [order for alias, ids in by_shard.items()
+              for order in using(Order.objects, alias).filter(pk__in=ids)]
+    for order in orders:
+        if order.status == 'entregue':
+            record_order(order)
+        elif order.rolled_up:
+            unrecord_order(order)
+
+
+
+@task('clear_expired_sessions')
+def clear_expired_sessions(payload):
+    """Remove sessões expiradas (o mesmo que manage.py clearsessions)"""
+    engine = import_module(settings.SESSION_ENGINE)
+    try:
+        engine.SessionStore.clear_expired()
+    except NotImplementedError:
+        # Backends sem armazenamento no servidor (ex.: signed_cookies)
+        pass
+
+
+def delete_expired_idempotency_keys(hours):
+    cutoff = timezone.now() - timedelta(hours=hours)
+    return IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()[0]
+
+
+@task('cleanup_idempotency_keys')
+def cleanup_idempotency_keys(payload):
+    """Remove chaves de idempotência mais antigas que IDEMPOTENCY_KEY_TTL_HOURS"""
+    delete_expired_idempotency_keys(settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+@task('clear_stale_carts')
+def clear_stale_carts(payload):
+    """Apaga carrinhos de pedido sem mudança há CART_TTL_HOURS horas"""
+    from .cart import clear_stale_carts as clear
+
+    clear(settings.CART_TTL_HOURS)
@@ -1,3 +1,1473 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import (
+    LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from myapp import caching, cart, kitchen, metrics, sharding
+from myapp.archive import copy_to_archive
+from myapp.caching import TwoTierCache
+from myapp.compression import CompressionMiddleware
+from myapp.kitchen import KitchenBoard, kitchen_load
+from myapp.models import (
+    ArchivedOrder, ArchivedOrderItem, DraftCart, IdempotencyKey, Job, MenuItem, OpeningHours, Order,
+    OrderHistory, OrderItem, Reservation, Restaurant, SalesDaily, SalesDailyItem,
+    ScheduleInterval, SearchTerm, Table, UserProfile, ViewProfile, WaitlistEntry,
+)
+from myapp.routers import PIN_COOKIE, PrimaryReplicaRouter, on_primary, replica_reads
+from myapp.rollups import record_order, rollups_high_water, update_rollups
+from myapp.schedule import build_intervals, is_open_at, open_restaurants
+from myapp.search import search
+from myapp.seating import find_seating, occupied_tables
+from myapp.tasks import (
+    TASKS, claim_jobs, cleanup_idempotency_keys, clear_stale_carts, enqueue, enqueue_periodic,
+    run_jobs,
+)
+from myapp.throttling import ConcurrencyLimitMiddleware, TokenBucket, parse_rate
+from myapp.warmup import hot_restaurants, warm_up
+
+# Os testes não usam nem limpam o cache em arquivo do projeto (BASE_DIR/cache)
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'orderup-tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class OrderUpTestCase(TestCase):
+    """Restaurante (11h às 23h) com 4 mesas, 2 pratos e uma reserva da cliente às 20h"""
+
+    databases = '__all__'
+
+    def setUp(self):
+        # O cache local é do processo: não passa de um teste para outro
+        caching.cache.shared.clear()
+        caching.cache.clear_local()
+        kitchen.board.clear()
+        self.owner = User.objects.create_user(
+            'dono', password='senha', first_name='Dono', is_staff=True, is_superuser=True)
+        self.customer = User.objects.create_user(
+            'cliente', password='senha', first_name='Ana', last_name='Silva')
+        self.restaurant = Restaurant.objects.create(
+            name='Cantina São João', description='Cozinha caseira', address='Rua A, 1',
+            phone='1111-1111', opening_time=datetime.time(11), closing_time=datetime.time(23),
+            owner=self.owner)
+        self.tables = [
+            Table.objects.create(restaurant=self.restaurant, number=number, capacity=capacity)
+            for number, capacity in enumerate([2, 4, 4, 6], 1)
+        ]
+        self.feijoada = MenuItem.objects.create(
+            restaurant=self.restaurant, name='Feijoada', description='Feijão preto',
+            price=Decimal('40.00'), category='prato_principal')
+        self.caipirinha = MenuItem.objects.create(
+            restaurant=self.restaurant, name='Caipirinha', description='Limão',
+            price=Decimal('15.00'), category='bebida')
+        self.reservation = Reservation.objects.create(
+            user=self.customer, restaurant=self.restaurant, table=self.tables[1],
+            date=timezone.localdate(), time=datetime.time(20), guests=3)
+        # Pedidos e reservas do restaurante (o banco principal sem shards)
+        self.shard = sharding.shard_for(self.restaurant.pk)
+
+    def orders(self):
+        return Order.objects.using(self.shard)
+
+    def place_order(self, **quantities):
+        """Faz o pedido pela view como a cliente (ex.: place_order(feijoada=2))"""
+        self.client.login(username='cliente', password='senha')
+        items = [getattr(self, name) for name in quantities]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/reservation/{self.reservation.pk}/order/', {
+                'menu_items': [item.pk for item in items],
+                'quantities': [str(quantity) for quantity in quantities.values()],
+            })
+        self.assertEqual(response.status_code, 302)
+        return self.orders().latest('pk')
+
+
+class ArchiveTests(OrderUpTestCase):
+    def archive_old_orders(self):
+        self.orders().update(status='cancelado', created_at=timezone.now() - timedelta(days=100))
+        call_command('archive_orders', '--days', '30', stdout=StringIO())
+
+    def test_archive_moves_orders_and_items(self):
+        order = self.place_order(feijoada=2, caipirinha=1)
+        self.archive_old_orders()
+
+        self.assertFalse(self.orders().exists())
+        self.assertFalse(OrderItem.objects.using(self.shard).exists())
+        archived = ArchivedOrder.objects.get(pk=order.pk)
+        self.assertEqual(archived.total, Decimal('95.00'))
+        self.assertEqual(archived.table_number, 2)
+        self.assertEqual(archived.item_count, 3)
+        self.assertEqual(
+            sorted(archived.items.values_list('item_name', 'quantity')),
+            [('Caipirinha', 1), ('Feijoada', 2)])
+
+    def test_idempotency_keys_go_with_the_order(self):
+        order = self.place_order(feijoada=1)
+        IdempotencyKey.objects.create(user=self.customer, key='pedido', order_id=order.pk)
+        self.archive_old_orders()
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_recent_orders_stay_active(self):
+        self.place_order(feijoada=1)
+        self.orders().update(status='cancelado')
+        call_command('archive_orders', '--days', '30', stdout=StringIO())
+        self.assertEqual(self.orders().count(), 1)
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+    def test_copy_to_archive_is_retry_safe(self):
+        order = self.place_order(feijoada=2, caipirinha=1)
+        orders = list(self.orders().select_related('reservation'))
+        items = list(OrderItem.objects.using(self.shard).values_list('order_id', 'item_id', 'quantity', 'price'))
+        # Uma tentativa que copiou mas não removeu dos ativos é refeita inteira
+        copy_to_archive(orders, items)
+        copy_to_archive(orders, items)
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=order.pk).count(), 2)
+
+    def test_history_joins_active_and_archived_orders(self):
+        old = self.place_order(feijoada=2)
+        self.archive_old_orders()
+        active = self.place_order(caipirinha=1)
+
+        history = {row.pk: row for row in sharding.fan_out(
+            lambda alias: OrderHistory.objects.using(alias).filter(user=self.customer))}
+        self.assertEqual(set(history), {old.pk, active.pk})
+        self.assertTrue(history[old.pk].archived)
+        self.assertFalse(history[active.pk].archived)
+        self.assertEqual(history[old.pk].items_summary, '2x Feijoada')
+
+        response = self.client.get('/orders/')
+        self.assertContains(response, '2x Feijoada')
+        self.assertContains(response, '1x Caipirinha')
+        self.assertContains(response, 'Cantina São João')
+
+
+class SalesRollupTests(OrderUpTestCase):
+    def deliver(self, order, status='entregue'):
+        self.client.login(username='dono', password='senha')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/order/{order.pk}/update-status/', {'status': status})
+        call_command('run_workers', '--once', '--processes', '0', stdout=StringIO())
+        order.refresh_from_db()
+
+    def test_delivered_order_is_counted_once(self):
+        order = self.place_order(feijoada=2, caipirinha=1)
+        self.deliver(order)
+        self.assertFalse(record_order(order))
+
+        daily = SalesDaily.objects.get(restaurant=self.restaurant)
+        self.assertEqual((daily.orders, daily.revenue), (1, Decimal('95.00')))
+        feijoada = SalesDailyItem.objects.get(item=self.feijoada)
+        self.assertEqual((feijoada.quantity, feijoada.orders, feijoada.item_name), (2, 1, 'Feijoada'))
+        self.assertEqual(rollups_high_water(), order.delivered_at)
+
+    def test_undelivered_order_is_subtracted(self):
+        first = self.place_order(feijoada=1)
+        second = self.place_order(caipirinha=2)
+        self.deliver(first)
+        self.deliver(second)
+        self.deliver(first, status='cancelado')
+
+        daily = SalesDaily.objects.get(restaurant=self.restaurant)
+        self.assertEqual((daily.orders, daily.revenue), (1, Decimal('30.00')))
+        self.assertEqual(SalesDailyItem.objects.get(item=self.feijoada).quantity, 0)
+
+    def test_deleted_dish_keeps_its_frozen_row(self):
+        order = self.place_order(feijoada=1, caipirinha=2)
+        self.deliver(order)
+        # Prato excluído depois da entrega: o resumo dele fica com item NULL
+        SalesDailyItem.objects.filter(item=self.caipirinha).update(item=None)
+        OrderItem.objects.using(self.shard).filter(item=self.caipirinha).update(item_id=999999)
+        self.deliver(order, status='cancelado')
+
+        self.assertEqual(SalesDaily.objects.get().orders, 0)
+        self.assertEqual(SalesDailyItem.objects.get(item=self.feijoada).quantity, 0)
+        self.assertEqual(
+            list(SalesDailyItem.objects.filter(item=None).values_list('item_name', 'quantity')),
+            [('Caipirinha', 2)])
+        self.assertEqual(SalesDailyItem.objects.count(), 2)
+
+    def test_update_rollups_catches_up(self):
+        order = self.place_order(feijoada=1)
+        # Entregue sem passar pela view (ex.: fila parada): o comando contabiliza
+        self.orders().update(status='entregue', delivered_at=timezone.now())
+        self.assertEqual(update_rollups(), 1)
+        self.assertEqual(update_rollups(), 0)
+        order.refresh_from_db()
+        self.assertEqual(SalesDaily.objects.get().revenue, Decimal('40.00'))
+        self.assertEqual(rollups_high_water(), order.delivered_at)
+
+    def test_dashboard_shows_totals(self):
+        self.deliver(self.place_order(feijoada=2))
+        self.client.login(username='dono', password='senha')
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/sales/?days=7')
+        self.assertContains(response, 'Feijoada')
+        self.assertEqual(response.context['total_revenue'], Decimal('80.00'))
+
+
+
+class ExportTests(OrderUpTestCase):
+    def export(self, kind, fmt):
+        self.client.login(username='dono', password='senha')
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/export/{kind}/?format={fmt}')
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_orders_csv_includes_archived_items(self):
+        old = self.place_order(feijoada=2, caipirinha=1)
+        self.orders().update(status='cancelado', created_at=timezone.now() - timedelta(days=100))
+        call_command('archive_orders', '--days', '30', stdout=StringIO())
+        new = self.place_order(feijoada=1)
+
+        response, content = self.export('orders', 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'],
+                         f'attachment; filename="orders-restaurante-{self.restaurant.pk}.csv"')
+        header, *rows = csv.reader(StringIO(content))
+        self.assertEqual(header[:7] + header[-1:], [
+            'order_id', 'created_at', 'status', 'customer', 'table', 'item', 'quantity',
+            'archived'])
+        # Primeiro os pedidos ativos, depois os arquivados
+        self.assertEqual(rows[0][:1] + rows[0][3:7] + rows[0][-1:],
+                         [str(new.pk), 'cliente', '2', 'Feijoada', '1', 'False'])
+        self.assertEqual(sorted(row[:1] + row[3:7] + row[-1:] for row in rows[1:]), [
+            [str(old.pk), 'cliente', '2', 'Caipirinha', '1', 'True'],
+            [str(old.pk), 'cliente', '2', 'Feijoada', '2', 'True'],
+        ])
+
+    def test_reservations_jsonl(self):
+        _, content = self.export('reservations', 'jsonl')
+        [line] = content.splitlines()
+        record = json.loads(line)
+        self.assertEqual(record['reservation_id'], self.reservation.pk)
+        self.assertEqual(record['customer'], 'cliente')
+        self.assertEqual((record['table'], record['guests'], record['time']), (2, 3, '20:00:00'))
+        self.assertEqual(record['date'], self.reservation.date.isoformat())
+
+    def test_only_managers_and_known_formats(self):
+        self.client.login(username='cliente', password='senha')
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/export/orders/')
+        self.assertRedirects(response, f'/restaurant/{self.restaurant.pk}/',
+                             fetch_redirect_response=False)
+        self.client.login(username='dono', password='senha')
+        self.assertEqual(self.client.get(
+            f'/restaurant/{self.restaurant.pk}/export/orders/?format=xml').status_code, 404)
+
+    def test_export_history_command(self):
+        self.place_order(caipirinha=3)
+        output = StringIO()
+        call_command('export_history', self.restaurant.pk, '--format', 'jsonl', stdout=output)
+        [record] = map(json.loads, output.getvalue().splitlines())
+        self.assertEqual((record['item'], record['quantity'], record['price']),
+                         ('Caipirinha', 3, '45.00'))
+
+@override_settings(CACHES=TEST_CACHES)
+class FastLoadDataTests(TransactionTestCase):
+    # A checagem de FKs é desligada fora de transação (PRAGMA no SQLite).
+    # Tudo vai para o banco do --database (o principal), mesmo com shards
+
+    def load(self, *args):
+        call_command('fastloaddata', 'fixture.data.json', *args, stdout=StringIO())
+
+    def test_loads_fixture_and_recomputes_derived_data(self):
+        self.load('--batch-size', '7')
+        orders = Order.objects.using(DEFAULT_DB_ALIAS)
+        items = OrderItem.objects.using(DEFAULT_DB_ALIAS)
+
+        self.assertEqual(MenuItem.objects.count(), 22)
+        self.assertEqual(items.count(), 18)
+        self.assertEqual(UserProfile.objects.count(), User.objects.count())
+        for order in orders:
+            lines = items.filter(order_id=order.pk)
+            self.assertEqual(order.total, sum(lines.values_list('price', flat=True)))
+            self.assertEqual(order.item_count, sum(lines.values_list('quantity', flat=True)))
+            self.assertTrue(order.customer_name)
+        self.assertFalse(Reservation.objects.using(DEFAULT_DB_ALIAS).filter(
+            starts_at__isnull=True).exists())
+        self.assertTrue(ScheduleInterval.objects.exists())
+        self.assertTrue(SearchTerm.objects.exists())
+
+    def test_keeps_fixture_timestamps(self):
+        self.load()
+        self.assertEqual(
+            Order.objects.using(DEFAULT_DB_ALIAS).get(pk=1).created_at,
+            datetime.datetime(2025, 2, 10, 16, 53, 7, 5000, tzinfo=datetime.timezone.utc))
+        self.assertEqual(Reservation.objects.using(DEFAULT_DB_ALIAS).get(pk=1).created_at.date(),
+                         datetime.date(2025, 2, 10))
+
+    def test_reload_replaces_existing_rows(self):
+        self.load()
+        self.load()
+        self.assertEqual(MenuItem.objects.count(), 22)
+        # As sequências seguem depois dos ids da fixture
+        Order.objects.using(DEFAULT_DB_ALIAS).create(
+            user=User.objects.first(), restaurant=Restaurant.objects.first())
+
+
+class MenuItemTests(OrderUpTestCase):
+    def post_item(self, name):
+        self.client.login(username='dono', password='senha')
+        return self.client.post(f'/restaurant/{self.restaurant.pk}/menu/add/', {
+            'name': name, 'description': 'Da casa', 'price': '12.00',
+            'category': 'bebida', 'available': 'on',
+        })
+
+    def test_create_item(self):
+        self.assertEqual(self.post_item('Suco').status_code, 302)
+        self.assertTrue(self.restaurant.menuitem_set.filter(name='Suco').exists())
+
+    def test_duplicate_name_is_a_form_error(self):
+        response = self.post_item('Caipirinha')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('name', response.context['form'].errors)
+        self.assertEqual(self.restaurant.menuitem_set.filter(name='Caipirinha').count(), 1)
+
+
+class CachingTests(OrderUpTestCase):
+    def test_invalidation_reaches_other_processes(self):
+        # Duas instâncias com a mesma camada compartilhada fazem o papel de dois workers
+        first = TwoTierCache(version_check_interval=0)
+        second = TwoTierCache(version_check_interval=0)
+        self.assertEqual(first.get_or_set('teste', 'chave', lambda: 1), 1)
+        self.assertEqual(second.get_or_set('teste', 'chave', lambda: 2), 1)
+        second.invalidate('teste')
+        self.assertEqual(first.get_or_set('teste', 'chave', lambda: 3), 3)
+        self.assertEqual(second.get('teste', 'chave'), 3)
+
+    def test_cached_none_is_not_a_miss(self):
+        computed = []
+        for _ in range(2):
+            caching.get_or_set('teste', 'vazio', lambda: computed.append(1))
+        self.assertEqual(computed, [1])
+
+    def test_concurrent_misses_compute_once(self):
+        computed = []
+
+        def compute():
+            computed.append(1)
+            time.sleep(0.2)
+            return 42
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            caching.get_or_set('teste', 'lento', compute))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(computed, [1])
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(caching.cache._key_locks, {})
+
+    def test_key_lock_stays_while_threads_wait(self):
+        cache = TwoTierCache()
+        inside, release = threading.Event(), threading.Event()
+
+        def compute():
+            inside.set()
+            release.wait(5)
+            return 42
+
+        threads = [threading.Thread(target=cache.get_or_set, args=('teste', 'lento', compute))
+                   for _ in range(2)]
+        threads[0].start()
+        inside.wait(5)
+        threads[1].start()
+        while cache._key_locks[('teste', 'lento')][1] < 2:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache._key_locks, {})
+
+    def test_menu_change_invalidates_restaurant_page(self):
+        url = f'/restaurant/{self.restaurant.pk}/'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(url), 'Feijoada')
+        self.assertFalse([q for q in queries if 'myapp_menuitem' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(restaurant=self.restaurant, name='Pastel', description='Queijo',
+                                    price=Decimal('8.00'), category='entrada')
+        self.assertContains(self.client.get(url), 'Pastel')
+
+    def test_restaurant_change_invalidates_list(self):
+        self.assertContains(self.client.get('/'), 'Cantina São João')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.name = 'Cantina do Porto'
+            self.restaurant.save()
+        self.assertContains(self.client.get('/'), 'Cantina do Porto')
+
+
+class IdempotentOrderTests(OrderUpTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='cliente', password='senha')
+
+    def post_order(self, key=None, **headers):
+        data = {'menu_items': [self.feijoada.pk], 'quantities': ['1']}
+        if key:
+            data['idempotency_key'] = key
+        return self.client.post(f'/reservation/{self.reservation.pk}/order/', data, **headers)
+
+    def test_form_resubmission_returns_the_first_order(self):
+        page = self.client.get(f'/reservation/{self.reservation.pk}/order/')
+        key = page.context['idempotency_key']
+        first = self.post_order(key)
+        second = self.post_order(key)
+
+        self.assertEqual(first['Location'], second['Location'])
+        self.assertEqual(self.orders().count(), 1)
+        self.assertEqual(OrderItem.objects.using(self.shard).count(), 1)
+
+    def test_header_key_for_api_clients(self):
+        first = self.post_order(HTTP_IDEMPOTENCY_KEY='pedido-1')
+        second = self.post_order(HTTP_IDEMPOTENCY_KEY='pedido-1')
+        self.assertEqual(first['Location'], second['Location'])
+        self.post_order(HTTP_IDEMPOTENCY_KEY='pedido-2')
+        self.assertEqual(self.orders().count(), 2)
+
+    def test_without_key_every_post_creates_an_order(self):
+        self.post_order()
+        self.post_order()
+        self.assertEqual(self.orders().count(), 2)
+
+    def test_concurrent_duplicate_loses_the_race(self):
+        self.post_order('corrida')
+        order = self.orders().get()
+        # As duas requisições passaram pela checagem antes de qualquer pedido existir
+        with mock.patch('myapp.views.existing_order_for_key', side_effect=[None, order.pk]):
+            response = self.post_order('corrida')
+        self.assertRedirects(response, f'/order/{order.pk}/', fetch_redirect_response=False)
+        self.assertEqual(self.orders().count(), 1)
+
+    def test_expired_keys_are_cleaned_up(self):
+        self.post_order('antiga')
+        self.post_order('nova')
+        IdempotencyKey.objects.filter(key='antiga').update(
+            created_at=timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS + 1))
+        cleanup_idempotency_keys({})
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['nova'])
+
+
+
+
+class JobQueueTests(OrderUpTestCase):
+    def test_job_is_created_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue('clear_stale_carts', {'origem': 'teste'})
+        self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload, job.status),
+                         ('clear_stale_carts', {'origem': 'teste'}, 'pendente'))
+
+    def test_claim_takes_only_ready_jobs_once(self):
+        ready = Job.objects.create(name='clear_stale_carts')
+        Job.objects.create(name='clear_stale_carts', run_at=timezone.now() + timedelta(minutes=5))
+        Job.objects.create(name='clear_stale_carts', status='executando', locked_by='outro')
+
+        self.assertEqual(claim_jobs(worker='w1'), [ready])
+        ready.refresh_from_db()
+        self.assertEqual((ready.status, ready.locked_by), ('executando', 'w1'))
+        self.assertEqual(claim_jobs(worker='w2'), [])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        broken = mock.Mock(side_effect=RuntimeError('sem conexão'))
+        with mock.patch.dict(TASKS, {'quebrada': (broken, False, 2)}):
+            job = Job.objects.create(name='quebrada', max_attempts=2)
+            with self.assertLogs('myapp.tasks', 'WARNING'):
+                run_jobs(claim_jobs())
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('pendente', 1))
+            self.assertIn('sem conexão', job.last_error)
+            self.assertAlmostEqual((job.run_at - job.finished_at).total_seconds(), 10, delta=1)
+            # Ainda esperando a nova tentativa
+            self.assertEqual(claim_jobs(), [])
+
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            with self.assertLogs('myapp.tasks', 'ERROR'):
+                run_jobs(claim_jobs())
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('falhou', 2))
+
+    def test_batch_task_runs_once_per_group(self):
+        batch = mock.Mock()
+        with mock.patch.dict(TASKS, {'lote': (batch, True, 3)}):
+            for number in (1, 2):
+                Job.objects.create(name='lote', payload={'n': number})
+            run_jobs(claim_jobs())
+        batch.assert_called_once()
+        [payloads] = batch.call_args.args
+        self.assertEqual(sorted(payload['n'] for payload in payloads), [1, 2])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'concluido'})
+
+    @override_settings(PERIODIC_TASKS={'clear_stale_carts': 60})
+    def test_periodic_tasks(self):
+        last_run = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_periodic(last_run)
+            enqueue_periodic(last_run)
+        self.assertEqual(Job.objects.count(), 1)
+
+        # Intervalo passou, mas o job anterior ainda está na fila
+        last_run['clear_stale_carts'] -= timedelta(seconds=61)
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_periodic(last_run)
+        self.assertEqual(Job.objects.count(), 1)
+
+        Job.objects.update(status='concluido')
+        last_run['clear_stale_carts'] -= timedelta(seconds=61)
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_periodic(last_run)
+        self.assertEqual(Job.objects.filter(status='pendente').count(), 1)
+
+    def test_worker_sends_the_reservation_email(self):
+        self.customer.email = 'ana@example.com'
+        self.customer.save()
+        self.client.login(username='dono', password='senha')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/reservation/{self.reservation.pk}/update-status/',
+                             {'status': 'confirmada'})
+
+        call_command('run_workers', '--once', '--processes', '0', stdout=StringIO())
+        self.assertEqual(Job.objects.get(name='notify_reservation_status').status, 'concluido')
+        [email] = mail.outbox
+        self.assertEqual(email.to, ['ana@example.com'])
+        self.assertIn('confirmada', email.subject)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class SessionTests(OrderUpTestCase):
+    def test_session_is_read_from_the_cache(self):
+        self.client.login(username='cliente', password='senha')
+        self.client.get('/orders/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/orders/').status_code, 200)
+        self.assertFalse([q for q in queries if 'django_session' in q['sql']])
+
+    def test_messages_stay_in_the_cookie(self):
+        self.client.login(username='cliente', password='senha')
+        # Sem permissão: a view redireciona com uma mensagem de erro
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/orders/')
+        self.assertIn('messages', response.cookies)
+        self.assertNotIn('_messages', self.client.session.keys())
+
+    def test_expired_sessions_are_cleared(self):
+        for key, days in [('expirada', -1), ('valida', 1)]:
+            Session.objects.create(session_key=key, session_data='',
+                                   expire_date=timezone.now() + timedelta(days=days))
+        TASKS['clear_expired_sessions'][0]({})
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['valida'])
+
+    def test_session_benchmark(self):
+        output = StringIO()
+        call_command('session_benchmark', '--rounds', '1', stdout=output)
+        _, *lines = output.getvalue().splitlines()
+        reads = {name: float(value) for name, _, value, _ in map(str.split, lines)}
+        self.assertLess(reads['cached_db'], reads['db'])
+        self.assertEqual(reads['signed_cookies'], 0)
+        self.assertFalse(User.objects.filter(username='session_benchmark').exists())
+
+class SearchTests(OrderUpTestCase):
+    def found(self, query):
+        return sorted(item.name for item, _ in search(query)[1])
+
+    def test_menu_item_changes_update_the_index(self):
+        self.assertEqual(self.found('feij'), ['Feijoada'])
+        self.feijoada.name = 'Tutu de Feijão'
+        self.feijoada.save()
+        self.assertEqual(self.found('feijoada'), [])
+        self.assertEqual(self.found('tutu feijao'), ['Tutu de Feijão'])
+
+        pastel = MenuItem.objects.create(restaurant=self.restaurant, name='Pastel',
+                                         description='Queijo', price=Decimal('8.00'),
+                                         category='entrada')
+        self.assertEqual(self.found('pastel queijo'), ['Pastel'])
+        pastel.delete()
+        self.assertEqual(self.found('pastel'), [])
+
+    def test_restaurant_changes_update_the_index(self):
+        self.assertEqual(self.found('cantina'), ['Caipirinha', 'Feijoada'])
+        self.restaurant.name = 'Bistrô do Porto'
+        self.restaurant.save()
+        self.assertEqual(self.found('cantina'), [])
+        self.assertEqual(self.found('bistro porto'), ['Caipirinha', 'Feijoada'])
+
+        self.restaurant.delete()
+        self.assertEqual(self.found('bistro'), [])
+        self.assertFalse(SearchTerm.objects.exists())
+
+
+class SearchIndexMigrationTests(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(target)
+        return executor.loader.project_state(target).apps
+
+    def test_backfills_existing_menu_items(self):
+        apps = self.migrate([('myapp', '0007_job_queue')])
+        try:
+            owner = apps.get_model('auth', 'User').objects.create(username='dono')
+            restaurant = apps.get_model('myapp', 'Restaurant').objects.create(
+                name='Cantina São João', description='Cozinha caseira', address='Rua A, 1',
+                phone='1111-1111', opening_time=datetime.time(11),
+                closing_time=datetime.time(23), owner=owner)
+            apps.get_model('myapp', 'MenuItem').objects.create(
+                restaurant=restaurant, name='Feijoada', description='Feijão preto',
+                price=Decimal('40.00'), category='prato_principal')
+        finally:
+            self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+        self.assertEqual(
+            dict(SearchTerm.objects.values_list('term', 'weight')),
+            {'feijoada': 5, 'feijao': 1, 'preto': 1, 'prato': 3, 'principal': 3,
+             'cantina': 2, 'sao': 2, 'joao': 2})
+        self.assertEqual([item.name for item, _ in search('feijao')[1]], ['Feijoada'])
+
+class ScheduleTests(OrderUpTestCase):
+    # 19/10/2026 é uma segunda-feira
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.datetime(2026, 10, day, hour, minute))
+
+    def test_build_intervals(self):
+        evening, late = datetime.time(18), datetime.time(2)
+        # Passa da meia-noite: continua no dia seguinte
+        self.assertEqual(build_intervals([(0, evening, late)]), [(1080, 1560)])
+        # Domingo para segunda: dividido no fim da semana
+        self.assertEqual(build_intervals([(6, datetime.time(22), datetime.time(3))]),
+                         [(0, 180), (9960, 10080)])
+        # Turnos sobrepostos ou encostados são mesclados
+        self.assertEqual(build_intervals([(0, datetime.time(11), datetime.time(15)),
+                                          (0, datetime.time(15), datetime.time(23))]),
+                         [(660, 1380)])
+        # Abre e fecha no mesmo horário: 24 horas
+        self.assertEqual(build_intervals([(2, datetime.time(8), datetime.time(8))]),
+                         [(3360, 4800)])
+
+    def test_open_restaurants_at_boundaries(self):
+        self.assertEqual(ScheduleInterval.objects.filter(restaurant=self.restaurant).count(), 7)
+        self.assertIn(self.restaurant, open_restaurants(self.at(19, 11)))
+        self.assertIn(self.restaurant, open_restaurants(self.at(19, 22, 59)))
+        self.assertNotIn(self.restaurant, open_restaurants(self.at(19, 23)))
+
+    def test_sunday_shift_open_on_monday_night(self):
+        bar = Restaurant.objects.create(
+            name='Bar da Esquina', description='Bar', address='Rua B, 2', phone='2222-2222',
+            opening_time=datetime.time(20), closing_time=datetime.time(2), owner=self.owner)
+        OpeningHours.objects.create(
+            restaurant=bar, weekday=6, opens=datetime.time(22), closes=datetime.time(3))
+        self.assertEqual(list(open_restaurants(self.at(19, 1))), [bar])
+        self.assertFalse(is_open_at(bar.pk, self.at(19, 21)))
+
+    def test_falls_back_to_opening_hours_without_intervals(self):
+        # Como depois de um loaddata, que não dispara os signals
+        ScheduleInterval.objects.all().delete()
+        self.assertIn(self.restaurant, open_restaurants(self.at(19, 12)))
+        self.assertNotIn(self.restaurant, open_restaurants(self.at(19, 3)))
+        self.assertTrue(is_open_at(self.restaurant.pk, self.at(19, 12)))
+
+        call_command('rebuild_schedule', stdout=StringIO())
+        self.assertEqual(ScheduleInterval.objects.filter(restaurant=self.restaurant).count(), 7)
+
+    def test_home_filter_and_closed_reservation(self):
+        response = self.client.get('/?open_at=2026-10-19T03:00')
+        self.assertNotContains(response, 'Cantina São João')
+        self.assertContains(self.client.get('/?open_at=2026-10-19T12:00'), 'Cantina São João')
+
+        self.client.login(username='cliente', password='senha')
+        response = self.client.post(f'/restaurant/{self.restaurant.pk}/reserve/',
+                                    {'date': '2030-01-01', 'time': '03:00', 'guests': 2})
+        self.assertContains(response, 'fechado')
+
+
+class SeatingTests(OrderUpTestCase):
+    FREE = [(1, 2), (2, 4), (3, 4), (4, 6)]
+
+    def reserve(self, guests, time='20:00'):
+        self.client.login(username='cliente', password='senha')
+        return self.client.post(f'/restaurant/{self.restaurant.pk}/reserve/', {
+            'date': self.reservation.date.isoformat(), 'time': time, 'guests': guests})
+
+    def seats(self, table_ids):
+        capacities = dict(self.FREE)
+        return sum(capacities[table_id] for table_id in table_ids)
+
+    def test_smallest_table_that_fits(self):
+        self.assertEqual(find_seating(self.FREE, 3), [2])
+        self.assertEqual(find_seating(self.FREE, 6), [4])
+
+    def test_combination_with_least_waste(self):
+        for guests in (8, 10, 12):
+            table_ids = find_seating(self.FREE, guests)
+            self.assertEqual(self.seats(table_ids), guests)
+            self.assertEqual(len(table_ids), 2 if guests < 12 else 3)
+
+    def test_impossible_party(self):
+        self.assertIsNone(find_seating([], 2))
+        self.assertIsNone(find_seating(self.FREE, 17))
+        # Cabe somando as cinco mesas, mas o limite é de quatro
+        self.assertIsNone(find_seating([(i, 2) for i in range(1, 6)], 10))
+
+    def test_greedy_fallback_when_out_of_time(self):
+        table_ids = find_seating(self.FREE, 9, time_budget=-1)
+        self.assertGreaterEqual(self.seats(table_ids), 9)
+
+    def test_large_party_joins_free_tables(self):
+        # A mesa 2 já está com a reserva das 20h
+        response = self.reserve(12)
+        reservation = Reservation.objects.using(self.shard).latest('pk')
+        self.assertRedirects(response, f'/reservation/{reservation.pk}/',
+                             fetch_redirect_response=False)
+        self.assertEqual(reservation.table_label, '1 + 3 + 4')
+        self.assertContains(self.client.get('/reservations/'), '1 + 3 + 4')
+
+        # Todas as mesas ocupadas: oferece a lista de espera
+        response = self.reserve(1)
+        self.assertContains(response, 'Não há mesas disponíveis')
+        self.assertTrue(response.context['offer_waitlist'])
+
+
+class ReservationSlotTests(OrderUpTestCase):
+    def test_duration_depends_on_party_size(self):
+        self.assertEqual(self.reservation.ends_at - self.reservation.starts_at, timedelta(hours=2))
+        party = Reservation.objects.create(
+            user=self.customer, restaurant=self.restaurant, table=self.tables[3],
+            date=self.reservation.date, time=datetime.time(12), guests=7)
+        self.assertEqual(party.ends_at - party.starts_at, timedelta(minutes=150))
+
+    def test_overlap_boundaries(self):
+        table = self.tables[1].pk
+        starts_at, hour = self.reservation.starts_at, timedelta(hours=1)
+        self.assertIn(table, occupied_tables(self.restaurant, starts_at + hour, starts_at + 3 * hour))
+        self.assertIn(table, occupied_tables(self.restaurant, starts_at - hour, starts_at + hour))
+        # Intervalos semiabertos: encostar no início ou no fim não conflita
+        self.assertNotIn(table, occupied_tables(
+            self.restaurant, starts_at + 2 * hour, starts_at + 3 * hour))
+        self.assertNotIn(table, occupied_tables(self.restaurant, starts_at - 2 * hour, starts_at))
+
+    def test_cancelled_reservation_frees_the_table(self):
+        starts_at = self.reservation.starts_at
+        self.reservation.status = 'cancelada'
+        self.reservation.save()
+        self.assertNotIn(self.tables[1].pk,
+                         occupied_tables(self.restaurant, starts_at, starts_at + timedelta(hours=1)))
+
+    def test_overlapping_reservation_gets_another_table(self):
+        self.client.login(username='cliente', password='senha')
+        self.client.post(f'/restaurant/{self.restaurant.pk}/reserve/', {
+            'date': self.reservation.date.isoformat(), 'time': '21:00', 'guests': 4})
+        reservation = Reservation.objects.using(self.shard).latest('pk')
+        self.assertEqual(reservation.table_id, self.tables[2].pk)
+
+    def test_reservation_without_slot_blocks_its_day(self):
+        # Como depois de um loaddata, que grava sem chamar save()
+        Reservation.objects.using(self.shard).filter(pk=self.reservation.pk).update(
+            starts_at=None, ends_at=None)
+        morning = timezone.make_aware(datetime.datetime.combine(
+            self.reservation.date, datetime.time(11)))
+        self.assertIn(self.tables[1].pk,
+                      occupied_tables(self.restaurant, morning, morning + timedelta(hours=1)))
+        next_week = morning + timedelta(days=7)
+        self.assertNotIn(self.tables[1].pk,
+                         occupied_tables(self.restaurant, next_week, next_week + timedelta(hours=1)))
+
+        call_command('rebuild_reservation_slots', stdout=StringIO())
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.ends_at - self.reservation.starts_at, timedelta(hours=2))
+        self.assertNotIn(self.tables[1].pk,
+                         occupied_tables(self.restaurant, morning, morning + timedelta(hours=1)))
+
+
+
+class WaitlistTests(OrderUpTestCase):
+    def setUp(self):
+        super().setUp()
+        # Amanhã às 20h todas as mesas estão reservadas
+        self.date = timezone.localdate() + timedelta(days=1)
+        self.booked = [
+            Reservation.objects.create(
+                user=self.owner, restaurant=self.restaurant, table=table,
+                date=self.date, time=datetime.time(20), guests=table.capacity)
+            for table in self.tables
+        ]
+
+    def wait(self, guests, minutes_ago):
+        return WaitlistEntry.objects.create(
+            user=self.customer, restaurant=self.restaurant, date=self.date,
+            time=datetime.time(20), guests=guests,
+            created_at=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def cancel(self, reservation):
+        self.client.login(username='dono', password='senha')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/reservation/{reservation.pk}/update-status/',
+                             {'status': 'cancelada'})
+
+    def test_cancellation_promotes_the_first_entry(self):
+        second = self.wait(2, minutes_ago=5)
+        first = self.wait(2, minutes_ago=10)
+        self.cancel(self.booked[0])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'promovida')
+        self.assertEqual(second.status, 'aguardando')
+        reservation = Reservation.objects.using(self.shard).get(pk=first.reservation_id)
+        self.assertEqual((reservation.user, reservation.table_id, reservation.guests),
+                         (self.customer, self.tables[0].pk, 2))
+
+    def test_entry_that_does_not_fit_is_skipped(self):
+        large = self.wait(6, minutes_ago=10)
+        small = self.wait(4, minutes_ago=5)
+        self.cancel(self.booked[1])
+
+        large.refresh_from_db()
+        small.refresh_from_db()
+        self.assertEqual(large.status, 'aguardando')
+        self.assertEqual(small.status, 'promovida')
+
+    def test_entry_is_promoted_only_once(self):
+        entry = self.wait(2, minutes_ago=10)
+        self.cancel(self.booked[0])
+        entry.refresh_from_db()
+        reservation_id = entry.reservation_id
+
+        self.cancel(self.booked[2])
+        entry.refresh_from_db()
+        self.assertEqual(entry.reservation_id, reservation_id)
+        self.assertEqual(Reservation.objects.using(self.shard).filter(
+            user=self.customer, date=self.date).count(), 1)
+
+
+class KitchenBoardTests(OrderUpTestCase):
+    def quantities(self, rows):
+        return [(row['name'], row['quantity'], row['orders']) for row in rows]
+
+    def set_status(self, order, status):
+        self.client.login(username='dono', password='senha')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/order/{order.pk}/update-status/', {'status': status})
+
+    def test_counter_follows_orders_without_queries(self):
+        self.assertEqual(kitchen_load(self.restaurant.pk), [])
+        first = self.place_order(feijoada=2, caipirinha=1)
+        self.place_order(feijoada=1)
+
+        with CaptureQueriesContext(connections[self.shard]) as queries:
+            rows = kitchen_load(self.restaurant.pk)
+        self.assertFalse([q for q in queries if 'myapp_orderitem' in q['sql']])
+        self.assertEqual(self.quantities(rows), [('Feijoada', 3, 2), ('Caipirinha', 1, 1)])
+
+        self.set_status(first, 'preparando')
+        self.assertEqual(self.quantities(kitchen_load(self.restaurant.pk)),
+                         [('Feijoada', 3, 2), ('Caipirinha', 1, 1)])
+        self.set_status(first, 'pronto')
+        self.assertEqual(self.quantities(kitchen_load(self.restaurant.pk)), [('Feijoada', 1, 1)])
+        # Sair de um status inativo para outro não muda nada
+        self.set_status(first, 'entregue')
+        self.assertEqual(self.quantities(kitchen_load(self.restaurant.pk)), [('Feijoada', 1, 1)])
+
+    def test_other_process_reloads_after_a_change(self):
+        other = KitchenBoard()
+        self.assertEqual(other.load(self.restaurant.pk), [])
+        self.place_order(caipirinha=2)
+        # A versão publicada pulou: o outro "processo" refaz a consulta
+        self.assertEqual(self.quantities(other.load(self.restaurant.pk)), [('Caipirinha', 2, 1)])
+
+    def test_board_page_json(self):
+        self.place_order(feijoada=1)
+        self.client.login(username='dono', password='senha')
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/kitchen/?format=json')
+        self.assertEqual(response.json(), {'restaurant': self.restaurant.pk, 'items': [
+            {'item_id': self.feijoada.pk, 'name': 'Feijoada', 'quantity': 1, 'orders': 1}]})
+
+@override_settings(ORDER_SHARDS=['default', 'shard1', 'shard2'], SHARD_OVERRIDES={42: 'shard2'})
+class ShardRoutingTests(SimpleTestCase):
+    def test_restaurant_maps_to_fixed_shard(self):
+        self.assertEqual(sharding.shard_for(3), 'default')
+        self.assertEqual(sharding.shard_for(4), 'shard1')
+        self.assertEqual(sharding.shard_for(5), 'shard2')
+        # Restaurante com shard próprio
+        self.assertEqual(sharding.shard_for(42), 'shard2')
+
+    def test_id_carries_the_shard(self):
+        self.assertEqual(sharding.shard_for_pk(7), 'default')
+        self.assertEqual(sharding.shard_for_pk((1 << sharding.SHARD_ID_BITS) + 7), 'shard1')
+        self.assertEqual(sharding.shard_for_pk((2 << sharding.SHARD_ID_BITS) + 7), 'shard2')
+        # Shard que não existe mais: cai no principal
+        self.assertEqual(sharding.shard_for_pk((5 << sharding.SHARD_ID_BITS) + 7), 'default')
+
+    def test_router_follows_restaurant_or_parent(self):
+        router = sharding.ShardRouter()
+        order = Order(restaurant_id=4)
+        self.assertEqual(router.db_for_write(Order, instance=order), 'shard1')
+        item = OrderItem(order_id=(2 << sharding.SHARD_ID_BITS) + 1)
+        self.assertEqual(router.db_for_read(OrderItem, instance=item), 'shard2')
+        # Modelos do banco principal ficam com os próximos routers
+        self.assertIsNone(router.db_for_read(MenuItem, instance=MenuItem(restaurant_id=4)))
+
+    @override_settings(ORDER_SHARDS=None)
+    def test_single_shard_is_a_no_op(self):
+        self.assertEqual(sharding.shards(), ['default'])
+        self.assertIsNone(sharding.ShardRouter().db_for_write(Order, instance=Order(restaurant_id=4)))
+
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('myapp.routers.replica_enabled', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, request, read=lambda: PrimaryReplicaRouter().db_for_read(Order)):
+        return replica_reads(lambda request: read())(request)
+
+    def test_marked_views_read_from_the_replica(self):
+        factory = RequestFactory()
+        self.assertEqual(self.route(factory.get('/')), 'replica')
+        self.assertEqual(self.route(factory.post('/')), 'default')
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Order), 'default')
+        self.assertEqual(
+            self.route(factory.get('/'), lambda: PrimaryReplicaRouter().db_for_write(Order)),
+            'default')
+        self.assertEqual(self.route(
+            factory.get('/'), lambda: on_primary(lambda: PrimaryReplicaRouter().db_for_read(Order))),
+            'default')
+
+    def test_pin_cookie_sends_reads_to_the_primary(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() + 10)
+        self.assertEqual(self.route(request), 'default')
+        for expired in (str(time.time() - 1), 'invalido'):
+            request.COOKIES[PIN_COOKIE] = expired
+            self.assertEqual(self.route(request), 'replica')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True):
+            self.assertEqual(self.route(RequestFactory().get('/')), 'default')
+
+
+class PinPrimaryTests(OrderUpTestCase):
+    @mock.patch('myapp.routers.replica_enabled', return_value=True)
+    def test_writes_pin_the_browser_to_the_primary(self, replica_enabled):
+        self.assertNotIn(PIN_COOKIE, self.client.get('/').cookies)
+        response = self.client.post('/login/', {'username': 'cliente', 'password': 'senha'})
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertAlmostEqual(float(cookie.value), time.time() + settings.REPLICA_PIN_SECONDS,
+                               delta=1)
+
+    def test_no_cookie_without_a_replica(self):
+        response = self.client.post('/login/', {'username': 'cliente', 'password': 'senha'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+class ShardedStorageTests(OrderUpTestCase):
+    def test_rows_live_on_the_restaurant_shard(self):
+        order = self.place_order(feijoada=2)
+        for instance in (self.reservation, order):
+            self.assertEqual(instance._state.db, self.shard)
+            self.assertEqual(sharding.shard_for_pk(instance.pk), self.shard)
+        for alias in sharding.shards():
+            if alias != self.shard:
+                self.assertFalse(Order.objects.using(alias).exists())
+
+        # Páginas acham o pedido e a reserva só pelo id da URL
+        self.assertContains(self.client.get(f'/order/{order.pk}/'), 'Feijoada')
+        self.assertContains(self.client.get(f'/reservation/{self.reservation.pk}/'),
+                            'Cantina São João')
+
+
+class RateLimitTests(OrderUpTestCase):
+    def post_order(self):
+        return self.client.post(f'/reservation/{self.reservation.pk}/order/', {
+            'menu_items': [self.feijoada.pk], 'quantities': ['1']})
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 10 / 60))
+        self.assertEqual(parse_rate('5/h:10'), (10, 5 / 3600))
+
+    def test_token_bucket_refills(self):
+        bucket = TokenBucket(2, 1.0)
+        self.assertEqual(bucket.consume('teste', now=100), 0)
+        self.assertEqual(bucket.consume('teste', now=100), 0)
+        self.assertAlmostEqual(bucket.consume('teste', now=100), 1.0)
+        self.assertAlmostEqual(bucket.consume('teste', now=100.5), 0.5)
+        self.assertEqual(bucket.consume('teste', now=101.5), 0)
+
+    @override_settings(RATE_LIMITS={'login': '2/m'})
+    def test_login_returns_429_with_retry_after(self):
+        # Relógio parado: requisições lentas não devolvem fichas no meio do teste
+        with mock.patch('myapp.throttling.time.time', return_value=1000.0):
+            for _ in range(2):
+                response = self.client.post('/login/', {'username': 'x', 'password': 'y'})
+                self.assertEqual(response.status_code, 200)
+            response = self.client.post('/login/', {'username': 'x', 'password': 'y'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        # Só o POST gasta fichas
+        self.assertEqual(self.client.get('/login/').status_code, 200)
+
+    @override_settings(RATE_LIMITS={'create_order': {'restaurant': '1/m'}})
+    def test_restaurant_bucket_is_shared_by_all_customers(self):
+        self.client.login(username='cliente', password='senha')
+        self.assertEqual(self.post_order().status_code, 302)
+        User.objects.create_user('outra', password='senha')
+        self.client.login(username='outra', password='senha')
+        self.assertEqual(self.post_order().status_code, 429)
+        self.assertEqual(self.orders().count(), 1)
+
+    @override_settings(RATE_LIMITS={'create_order': '1/m'}, RATE_LIMIT_ENABLED=False)
+    def test_can_be_disabled(self):
+        self.client.login(username='cliente', password='senha')
+        for _ in range(2):
+            self.assertEqual(self.post_order().status_code, 302)
+
+
+@override_settings(LOAD_SHEDDING={'MAX_CONCURRENT': 1, 'QUEUE_TIMEOUT': 0.01, 'RETRY_AFTER': 2,
+                                  'EXEMPT_PATHS': ['/metrics/']})
+class LoadSheddingTests(SimpleTestCase):
+    def test_sheds_requests_over_the_limit(self):
+        inside, release = threading.Event(), threading.Event()
+
+        def slow_view(request):
+            if request.path == '/lenta/':
+                inside.set()
+                release.wait(5)
+            return HttpResponse('ok')
+
+        middleware = ConcurrencyLimitMiddleware(slow_view)
+        factory = RequestFactory()
+        busy = threading.Thread(target=middleware, args=(factory.get('/lenta/'),))
+        busy.start()
+        inside.wait(5)
+        try:
+            response = middleware(factory.get('/'))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '2')
+            # Caminhos isentos não entram na conta
+            self.assertEqual(middleware(factory.get('/metrics/')).status_code, 200)
+        finally:
+            release.set()
+            busy.join()
+        self.assertEqual(middleware(factory.get('/')).status_code, 200)
+
+
+
+class WarmUpTests(OrderUpTestCase):
+    def setUp(self):
+        super().setUp()
+        # O aquecimento fecha as conexões no fim; aqui elas seguem na transação do teste
+        patcher = mock.patch.object(connections, 'close_all')
+        self.close_all = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_steps_run_and_prime_the_menu_cache(self):
+        results = warm_up(force=True)
+        self.assertEqual([name for name, _, _ in results],
+                         ['urls', 'templates', 'databases', 'caches'])
+        self.assertFalse([result for _, _, result in results if isinstance(result, Exception)])
+        self.close_all.assert_called_once()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(f'/restaurant/{self.restaurant.pk}/'), 'Feijoada')
+        self.assertFalse([q for q in queries if 'myapp_menuitem' in q['sql']])
+
+    def test_busiest_restaurants_come_first(self):
+        busy = Restaurant.objects.create(
+            name='Bistrô do Porto', description='-', address='Rua B, 2', phone='2222-2222',
+            opening_time=datetime.time(11), closing_time=datetime.time(23), owner=self.owner)
+        today = timezone.localdate()
+        SalesDaily.objects.create(restaurant=self.restaurant, date=today, orders=3)
+        SalesDaily.objects.create(restaurant=busy, date=today, orders=10)
+        # Vendas antigas não contam
+        SalesDaily.objects.create(restaurant=self.restaurant, date=today - timedelta(days=30),
+                                  orders=100)
+        self.assertEqual(hot_restaurants(1), [busy.pk])
+        self.assertEqual(hot_restaurants(2), [busy.pk, self.restaurant.pk])
+
+    def test_a_failing_step_does_not_stop_the_others(self):
+        broken = mock.Mock(side_effect=RuntimeError('banco fora do ar'))
+        steps = [('databases', broken), ('caches', mock.Mock(return_value=1))]
+        with mock.patch('myapp.warmup.STEPS', steps), \
+                self.assertLogs('myapp.warmup', 'WARNING') as logs:
+            results = warm_up(force=True)
+        self.assertIsInstance(results[0][2], RuntimeError)
+        self.assertEqual(results[1][2], 1)
+        self.assertIn('banco fora do ar', logs.output[0])
+        self.close_all.assert_called_once()
+
+    @override_settings(WARMUP={'ENABLED': False, 'MENUS': 20})
+    def test_can_be_disabled(self):
+        self.assertEqual(warm_up(), [])
+        self.close_all.assert_not_called()
+
+
+class LoadTestCommandTests(OrderUpTestCase):
+    def test_setup_and_cleanup(self):
+        self.place_order(feijoada=1)
+        with self.assertRaisesMessage(CommandError, 'Use --url ou --serve.'):
+            call_command('loadtest', '--setup', '--restaurants', '2', '--customers', '3',
+                         stdout=StringIO())
+        restaurants = Restaurant.objects.filter(name__startswith='Carga ')
+        self.assertEqual(restaurants.count(), 2)
+        self.assertEqual(Table.objects.filter(restaurant__in=restaurants).count(), 40)
+        self.assertEqual(MenuItem.objects.filter(restaurant__in=restaurants).count(), 24)
+        self.assertEqual(User.objects.filter(username__startswith='loadtest_cliente_').count(), 3)
+        self.assertTrue(all(restaurant.owner.profile.is_business
+                            for restaurant in restaurants.select_related('owner__profile')))
+
+        call_command('loadtest', '--cleanup', stdout=StringIO())
+        self.assertFalse(restaurants.exists())
+        self.assertFalse(User.objects.filter(username__startswith='loadtest_').exists())
+        # Os dados reais ficam
+        self.assertEqual(Restaurant.objects.get().name, 'Cantina São João')
+        self.assertEqual(self.orders().count(), 1)
+
+    def test_invalid_options(self):
+        for args, message in [
+            ([], 'Use --url ou --serve.'),
+            (['--mix', 'browse=1,voar=2'], 'Roteiros desconhecidos: voar'),
+            (['--mix', 'browse'], '--mix inválido'),
+            (['--mix', 'browse=1'], 'Sem dados de teste'),
+        ]:
+            url = ['--url', 'http://127.0.0.1:1'] if args else []
+            with self.subTest(args=args), self.assertRaisesMessage(CommandError, message):
+                call_command('loadtest', *url, *args, stdout=StringIO())
+
+
+@override_settings(CACHES=TEST_CACHES, RATE_LIMIT_ENABLED=False)
+class LoadTestRunTests(LiveServerTestCase):
+    databases = '__all__'
+
+    def test_reports_every_flow(self):
+        output = StringIO()
+        call_command('loadtest', '--setup', '--restaurants', '1', '--customers', '2',
+                     '--url', self.live_server_url, '--rate', '10', '--duration', '1',
+                     '--seed', '7', '--users', '4', stdout=output)
+        report = output.getvalue()
+        self.assertIn(f'Carga em {self.live_server_url}', report)
+        self.assertRegex(report, r'\d+ requisições em [\d.]+s')
+        table = report.split('máx ms\n', 1)[1].split('\nRoteiros', 1)[0]
+        steps = {line.split()[0]: [int(value) for value in line.split()[1:6]]
+                 for line in table.splitlines() if line.strip()}
+        self.assertIn('home', steps)
+        # Todas as requisições deram certo: sem 429, 503 nem erros
+        for step, (requests, ok, *_) in steps.items():
+            self.assertEqual(ok, requests, step)
+        self.assertRegex(report, r'browse +\d+ ok, 0 sem concluir')
+
+
+class DraftCartTests(OrderUpTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='cliente', password='senha')
+        self.cart_url = f'/reservation/{self.reservation.pk}/cart/'
+
+    def cart_post(self, action, **data):
+        return self.client.post(self.cart_url + action + '/', data)
+
+    def test_add_update_and_remove_lines(self):
+        response = self.cart_post('add', item=self.feijoada.pk, quantity=2).json()
+        self.assertEqual(response['quantity'], 2)
+        response = self.cart_post('add', item=self.feijoada.pk).json()
+        self.assertEqual(response['quantity'], 3)
+        # Limite de MAX_QUANTITY por item
+        response = self.cart_post('update', item=self.caipirinha.pk, quantity=99).json()
+        self.assertEqual(response['quantity'], cart.MAX_QUANTITY)
+        response = self.cart_post('remove', item=self.caipirinha.pk).json()
+        self.assertEqual((response['quantity'], response['total']), (0, '120.00'))
+
+        self.assertEqual(self.cart_post('add', item='x').status_code, 400)
+        self.assertEqual(self.client.get(self.cart_url + 'add/').status_code, 405)
+
+    def test_total_is_quantized_to_cents(self):
+        pastel = MenuItem.objects.create(restaurant=self.restaurant, name='Pastel',
+                                         description='Queijo', price=Decimal('25.90'),
+                                         category='entrada')
+        response = self.cart_post('update', item=pastel.pk, quantity=3).json()
+        self.assertEqual(response['total'], '77.70')
+        self.assertEqual(DraftCart.objects.get().total.as_tuple().exponent, -2)
+
+    def test_checkout_uses_the_cart_and_deletes_it(self):
+        self.cart_post('update', item=self.feijoada.pk, quantity=2)
+        self.cart_post('update', item=self.caipirinha.pk, quantity=1)
+        self.assertContains(self.client.get(f'/reservation/{self.reservation.pk}/order/'),
+                            'value="2"')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/reservation/{self.reservation.pk}/order/',
+                                        {'idempotency_key': 'carrinho'})
+        order = self.orders().get()
+        self.assertRedirects(response, f'/order/{order.pk}/', fetch_redirect_response=False)
+        self.assertEqual(order.total, Decimal('95.00'))
+        self.assertEqual(order.items_summary, '1x Caipirinha, 2x Feijoada')
+        self.assertFalse(DraftCart.objects.exists())
+
+    def test_form_items_take_precedence_over_the_cart(self):
+        self.cart_post('update', item=self.feijoada.pk, quantity=2)
+        order = self.place_order(caipirinha=3)
+        self.assertEqual(order.total, Decimal('45.00'))
+        self.assertFalse(DraftCart.objects.exists())
+
+    def test_stale_carts_are_cleared(self):
+        self.cart_post('update', item=self.feijoada.pk, quantity=1)
+        clear_stale_carts({})
+        self.assertTrue(DraftCart.objects.exists())
+        DraftCart.objects.update(
+            updated_at=timezone.now() - timedelta(hours=settings.CART_TTL_HOURS + 1))
+        clear_stale_carts({})
+        self.assertFalse(DraftCart.objects.exists())
+
+
+PROFILING = {'ENABLED': True, 'SAMPLE_RATE': 0, 'VIEWS': ['restaurant_detail'], 'SLOW_MS': 150,
+             'SAMPLER_INTERVAL_MS': 2, 'TOP': 10}
+
+
+@override_settings(PROFILING=PROFILING)
+class ProfilingTests(OrderUpTestCase):
+    def test_cprofile_runs_are_merged_per_view(self):
+        for _ in range(3):
+            self.client.get(f'/restaurant/{self.restaurant.pk}/')
+        profile = ViewProfile.objects.get()
+        self.assertEqual((profile.view_name, profile.kind, profile.requests),
+                         ('restaurant_detail', 'cprofile', 3))
+        self.assertGreaterEqual(profile.total_ms, profile.max_ms)
+        self.assertEqual(profile.slowest_path, f'GET /restaurant/{self.restaurant.pk}/')
+        self.assertIn('cumulative', profile.report)
+        self.assertTrue(profile.hot_spot)
+
+    def test_slow_requests_add_to_the_sample_counts(self):
+        def slow_restaurants():
+            start = time.perf_counter()
+            while time.perf_counter() - start < 0.2:
+                sum(range(1000))
+            return []
+
+        with mock.patch('myapp.views.all_restaurants', slow_restaurants):
+            self.client.get('/')
+            self.client.get('/')
+        # Requisição rápida: não entra no perfil
+        self.client.get('/')
+
+        profile = ViewProfile.objects.get(view_name='home')
+        self.assertEqual((profile.kind, profile.requests), ('amostragem', 2))
+        self.assertIn('slow_restaurants', profile.report)
+
+        self.client.login(username='dono', password='senha')
+        response = self.client.get(f'/admin/myapp/viewprofile/{profile.pk}/change/')
+        self.assertContains(response, '<pre')
+
+
+
+
+class MetricsTests(SimpleTestCase):
+    ORDERS = ('orderup_orders_created_total', '', ())
+    IN_PROGRESS = ('orderup_http_requests_in_progress', '', ())
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        override = override_settings(METRICS={**settings.METRICS, 'ENABLED': True, 'DIR': self.dir})
+        override.enable()
+        self.addCleanup(override.disable)
+        # Cada teste começa como um processo novo, com o arquivo no diretório temporário
+        patcher = mock.patch.multiple(metrics, _values=None, _values_path=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def values_file(self):
+        return self.dir / f'{os.getpid()}.db'
+
+    def test_values_file_format(self):
+        metrics.orders_created.inc()
+        metrics.orders_created.inc(2)
+        data = self.values_file().read_bytes()
+        used = metrics._HEADER.unpack_from(data, 0)[0]
+        [(key, value, value_at)] = metrics._entries(data, used)
+        self.assertEqual(json.loads(key), ['orderup_orders_created_total', '', []])
+        self.assertEqual(value, 3.0)
+        self.assertEqual(value_at % 8, 0)
+        self.assertEqual(used, value_at + 8)
+        # Outro mapeamento do mesmo arquivo acha a entrada e soma no mesmo lugar
+        metrics.ProcessValues(self.values_file()).add(key, 1)
+        self.assertEqual(metrics.collect()[self.ORDERS], 4.0)
+
+    def test_histogram_buckets_accumulate(self):
+        for value in (0.003, 0.2, 0.2, 20):
+            metrics.http_duration.observe(value, view='home')
+        lines = metrics.exposition().splitlines()
+        name = 'orderup_http_request_duration_seconds'
+        for le, count in [('0.005', 1), ('0.1', 1), ('0.25', 3), ('10', 3), ('+Inf', 4)]:
+            self.assertIn(f'{name}_bucket{{view="home",le="{le}"}} {count}', lines)
+        self.assertIn(f'{name}_count{{view="home"}} 4', lines)
+        self.assertIn(f'{name}_sum{{view="home"}} {0.003 + 0.2 + 0.2 + 20!r}', lines)
+
+    def test_gauges_of_dead_processes_are_ignored(self):
+        metrics.http_in_progress.inc()
+        metrics.orders_created.inc()
+        self.assertEqual(metrics.collect()[self.IN_PROGRESS], 1)
+        with mock.patch.object(metrics, '_alive', return_value=False):
+            totals = metrics.collect()
+        self.assertNotIn(self.IN_PROGRESS, totals)
+        self.assertEqual(totals[self.ORDERS], 1)
+
+    def test_stale_files_are_merged_when_a_process_starts(self):
+        orders_key = metrics._key('orderup_orders_created_total', '', {})
+        in_progress_key = metrics._key('orderup_http_requests_in_progress', '', {})
+        dead = metrics.ProcessValues(self.dir / '999999.db')
+        dead.add(orders_key, 5)
+        dead.set(in_progress_key, 2)
+        # Arquivo antigo com o pid deste processo (pid reaproveitado)
+        metrics.ProcessValues(self.values_file()).set(in_progress_key, 3)
+
+        with mock.patch.object(metrics, '_alive', side_effect=lambda pid: pid != 999999):
+            metrics.orders_created.inc()
+            totals = metrics.collect()
+        self.assertEqual([path.name for path in self.dir.iterdir()], [self.values_file().name])
+        self.assertEqual(totals[self.ORDERS], 6)
+        self.assertNotIn(self.IN_PROGRESS, totals)
+
+    def test_exposition_endpoint(self):
+        metrics.orders_created.inc()
+        self.client.get('/metrics/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# HELP orderup_orders_created_total Pedidos criados', lines)
+        self.assertIn('# TYPE orderup_orders_created_total counter', lines)
+        self.assertIn('orderup_orders_created_total 1', lines)
+        self.assertIn(
+            'orderup_http_requests_total{method="GET",status="200",view="metrics"} 1', lines)
+
+
+class CompressionTests(OrderUpTestCase):
+    def compress(self, response, accept='gzip, deflate'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_large_response_is_gzipped(self):
+        response = self.compress(HttpResponse('pedido ' * 500))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), b'pedido ' * 500)
+
+    def test_small_or_already_encoded_responses_are_left_alone(self):
+        response = self.compress(HttpResponse('pedido'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'pedido')
+
+        encoded = HttpResponse(b'\x00' * 5000, headers={'Content-Encoding': 'br'})
+        self.assertEqual(self.compress(encoded)['Content-Encoding'], 'br')
+        self.assertEqual(encoded.content, b'\x00' * 5000)
+
+    def test_client_without_gzip(self):
+        response = self.compress(HttpResponse('pedido ' * 500), accept='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, b'pedido ' * 500)
+
+    @override_settings(STREAMING={'ENABLED': True, 'MIN_ROWS': 2, 'CHUNK_SIZE': 2})
+    def test_streamed_table_is_gzipped(self):
+        orders = [self.place_order(feijoada=1) for _ in range(3)]
+        self.client.login(username='dono', password='senha')
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/orders/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertFalse(response.has_header('Content-Length'))
+
+        page = gzip.decompress(b''.join(response.streaming_content)).decode()
+        for order in orders:
+            self.assertIn(f'<td>{order.pk}</td>', page)
+        self.assertTrue(page.rstrip().endswith('</html>'))
+
+    @override_settings(STREAMING={'ENABLED': True, 'MIN_ROWS': 200, 'CHUNK_SIZE': 100})
+    def test_short_table_is_rendered_at_once(self):
+        order = self.place_order(feijoada=1)
+        self.client.login(username='dono', password='senha')
+        response = self.client.get(f'/restaurant/{self.restaurant.pk}/orders/')
+        self.assertFalse(response.streaming)
+        self.assertContains(response, f'<td>{order.pk}</td>')
+
+class OrderSummaryTests(OrderUpTestCase):
+    def test_summary_is_filled_on_create(self):
+        order = self.place_order(feijoada=2, caipirinha=1)
+        self.assertEqual(
+            (order.customer_name, order.table_label, order.item_count, order.items_summary),
+            ('Ana Silva', '2', 3, '1x Caipirinha, 2x Feijoada'))
+
+    def test_summary_follows_its_sources(self):
+        order = self.place_order(feijoada=2, caipirinha=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.first_name = 'Beatriz'
+            self.customer.save()
+            self.tables[1].number = 9
+            self.tables[1].save()
+            self.caipirinha.name = 'Caipiroska'
+            self.caipirinha.save()
+        order.refresh_from_db()
+        self.assertEqual((order.customer_name, order.table_label, order.items_summary),
+                         ('Beatriz Silva', '9', '1x Caipiroska, 2x Feijoada'))
+
+        self.reservation.table = self.tables[3]
+        self.reservation.save()
+        order.refresh_from_db()
+        self.assertEqual(order.table_label, '4')
+
+    def test_rebuild_command(self):
+        order = self.place_order(feijoada=2)
+        self.orders().update(customer_name='', table_label='', item_count=0, items_summary='')
+        call_command('rebuild_order_summaries', stdout=StringIO())
+        order.refresh_from_db()
+        self.assertEqual((order.customer_name, order.table_label, order.item_count),
+                         ('Ana Silva', '2', 2))
+
+    def test_board_queries_do_not_grow_with_orders(self):
+        self.place_order(feijoada=1)
+        self.client.login(username='dono', password='senha')
+        url = f'/restaurant/{self.restaurant.pk}/orders/'
+        self.client.get(url)
+        with CaptureQueriesContext(connections[self.shard]) as queries:
+            self.assertContains(self.client.get(url), 'Ana Silva')
+        count = len(queries)
+
+        for _ in range(3):
+            self.place_order(caipirinha=1)
+        self.client.login(username='dono', password='senha')
+        with CaptureQueriesContext(connections[self.shard]) as queries:
+            self.client.get(url)
+        self.assertEqual(len(queries), count)
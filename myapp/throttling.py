@@ -0,0 +1,154 @@
+"""
+Limite de requisições e descarte de carga.
+
+`rate_limit(nome, keys=...)` protege uma view com baldes de fichas (token
+bucket), um por chave: usuário, IP e/ou restaurante. Cada balde começa cheio
+com `burst` fichas e se reenche a `taxa` fichas por período
+(settings.RATE_LIMITS, ex.: '10/m'); cada requisição gasta uma ficha. Sem
+fichas a resposta é um 429 imediato com Retry-After, antes de qualquer
+consulta da view.
+
+Os baldes ficam no cache compartilhado (settings.RATE_LIMIT_CACHE), então o
+limite vale para todos os processos. A leitura e a gravação do balde não são
+atômicas entre processos: sob disputa o limite pode deixar passar algumas
+requisições a mais, nunca a menos.
+
+`ConcurrencyLimitMiddleware` limita quantas requisições cada processo atende
+ao mesmo tempo (settings.LOAD_SHEDDING). Passado o limite, a requisição
+espera no máximo QUEUE_TIMEOUT e recebe um 503 com Retry-After, em vez de
+ficar na fila aumentando a latência de todas.
+"""
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'10/m' -> (10 fichas, 10/60 fichas por segundo); '10/m:20' define burst 20"""
+    rate, _, burst = rate.partition(':')
+    count, period = rate.split('/')
+    count = int(count)
+    return int(burst or count), count / PERIODS[period[0]]
+
+
+def client_ip(request):
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _restaurant_key(request, kwargs):
+    if 'restaurant_pk' in kwargs:
+        return kwargs['restaurant_pk']
+    if 'reservation_pk' in kwargs:
+        from .models import Reservation
+        from .sharding import shard_for_pk, using
+
+        return (using(Reservation.objects, shard_for_pk(kwargs['reservation_pk']))
+                .filter(pk=kwargs['reservation_pk'])
+                .values_list('restaurant_id', flat=True).first())
+    return None
+
+
+# Chave do balde por tipo; None = a requisição não tem esse tipo de chave
+KEY_FUNCTIONS = {
+    'user': lambda request, kwargs: (
+        request.user.pk if request.user.is_authenticated else None),
+    'ip': lambda request, kwargs: client_ip(request) or None,
+    'restaurant': _restaurant_key,
+}
+
+
+class TokenBucket:
+    def __init__(self, capacity, refill_rate, cache_alias='default'):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache_alias = cache_alias
+
+    def consume(self, key, now=None):
+        """Gasta uma ficha; devolve 0 se passou ou os segundos até a próxima ficha"""
+        now = time.time() if now is None else now
+        cache = caches[self.cache_alias]
+        with _lock:
+            tokens, updated_at = cache.get(key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.refill_rate
+            # Expira quando o balde estaria cheio de novo (nada a lembrar)
+            ttl = math.ceil((self.capacity - tokens) / self.refill_rate) + 1
+            cache.set(key, (tokens, now), timeout=ttl)
+        return wait
+
+
+def too_many_requests(retry_after, status=429):
+    seconds = max(1, math.ceil(retry_after))
+    response = HttpResponse(
+        f'Muitas requisições. Tente novamente em {seconds} segundo(s).',
+        status=status, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def rate_limit(name, keys=('user', 'ip'), methods=('POST',)):
+    """
+    Aplica settings.RATE_LIMITS[name] à view, com um balde por chave em
+    `keys`; só as requisições em `methods` gastam fichas. O limite pode ser
+    uma taxa para todas as chaves ou um dict {tipo de chave: taxa}.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in methods
+                    or not getattr(settings, 'RATE_LIMIT_ENABLED', True)
+                    or name not in settings.RATE_LIMITS):
+                return view(request, *args, **kwargs)
+
+            rates = settings.RATE_LIMITS[name]
+            for key_type in keys:
+                rate = rates.get(key_type) if isinstance(rates, dict) else rates
+                value = KEY_FUNCTIONS[key_type](request, kwargs) if rate else None
+                if value is None:
+                    continue
+                bucket = TokenBucket(*parse_rate(rate), settings.RATE_LIMIT_CACHE)
+                wait = bucket.consume(f'rl:{name}:{key_type}:{value}')
+                if wait:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ConcurrencyLimitMiddleware:
+    """Descarta requisições (503) quando o processo já atende MAX_CONCURRENT"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = settings.LOAD_SHEDDING
+        self.queue_timeout = options['QUEUE_TIMEOUT']
+        self.retry_after = options['RETRY_AFTER']
+        self.exempt_paths = tuple(options.get('EXEMPT_PATHS', ()))
+        self.slots = threading.BoundedSemaphore(options['MAX_CONCURRENT'])
+
+    def __call__(self, request):
+        if request.path.startswith(self.exempt_paths):
+            return self.get_response(request)
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            return too_many_requests(self.retry_after, status=503)
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
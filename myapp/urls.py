@@ -6,23 +6,36 @@ from .views import (
     restaurant_create,
     restaurant_detail, 
     menu_item_create,
+    menu_import,
     my_restaurants,
     reservation_create,
     reservation_detail,
     my_reservations,
     reservation_manage,
     reservation_update_status, 
+    waitlist_cancel,
     create_order,
+    cart_add,
+    cart_update,
+    cart_remove,
     order_detail,
     order_manage,
     order_update_status,
+    kitchen_board,
     my_orders,
+    sales_dashboard,
+    restaurant_export,
+    search,
+    search_api,
+    metrics_view,
 )
+from .throttling import rate_limit
 
 urlpatterns = [
     path('', home, name='home'), 
 
-    path('login/', LoginView.as_view(template_name='auth/login.html'), name='login'),
+    path('login/', rate_limit('login', keys=('ip',))(
+        LoginView.as_view(template_name='auth/login.html')), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('register/', register, name='register'),
 
@@ -30,6 +43,7 @@ urlpatterns = [
     path('restaurant/create/', restaurant_create, name='restaurant_create'),
     path('restaurant/<int:pk>/', restaurant_detail, name='restaurant_detail'),
     path('restaurant/<int:restaurant_pk>/menu/add/', menu_item_create, name='menu_item_create'),
+    path('restaurant/<int:restaurant_pk>/menu/import/', menu_import, name='menu_import'),
     path('my-restaurants/', my_restaurants, name='my_restaurants'), 
 
     # URLs de reserva
@@ -39,13 +53,29 @@ urlpatterns = [
 
     path('restaurant/<int:restaurant_pk>/reservations/', reservation_manage, name='reservation_manage'), 
     path('reservation/<int:pk>/update-status/', reservation_update_status, name='reservation_update_status'),
+    path('waitlist/<int:pk>/cancel/', waitlist_cancel, name='waitlist_cancel'),
     
     # URLs de Order
     path('reservation/<int:reservation_pk>/order/', create_order, name='create_order'),
+    path('reservation/<int:reservation_pk>/cart/add/', cart_add, name='cart_add'),
+    path('reservation/<int:reservation_pk>/cart/update/', cart_update, name='cart_update'),
+    path('reservation/<int:reservation_pk>/cart/remove/', cart_remove, name='cart_remove'),
     path('order/<int:pk>/', order_detail, name='order_detail'),
 
     path('restaurant/<int:restaurant_pk>/orders/', order_manage, name='order_manage'),
     path('order/<int:pk>/update-status/', order_update_status, name='order_update_status'),
+    path('restaurant/<int:restaurant_pk>/kitchen/', kitchen_board, name='kitchen_board'),
 
     path('orders/', my_orders, name='my_orders'), 
+
+    # Busca
+    path('search/', search, name='search'),
+    path('api/search/', search_api, name='search_api'),
+
+    # Métricas (Prometheus)
+    path('metrics/', metrics_view, name='metrics'),
+
+    # Relatórios
+    path('restaurant/<int:restaurant_pk>/sales/', sales_dashboard, name='sales_dashboard'),
+    path('restaurant/<int:restaurant_pk>/export/<str:kind>/', restaurant_export, name='restaurant_export'),
 ]
\ No newline at end of file
@@ -1,20 +1,102 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required 
 from django.contrib.auth import login
 from django.contrib import messages 
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+import uuid
 from .forms import (
     UserRegistrationForm, 
     RestaurantForm, 
     MenuItemForm, 
-    ReservationForm
+    ReservationForm,
+    MenuImportForm,
 ) 
-from .models import Restaurant, Table, Reservation, MenuItem, Order, OrderItem
+from .tasks import enqueue
+from .exports import EXPORTS, FORMATS, export_lines
+from .menu_import import parse_rows, import_menu
+from . import caching
+from .search import search as search_menu
+from .schedule import open_restaurants
+from .seating import assign_tables, find_seating, free_tables
+from .permissions import can_manage_restaurant
+from .routers import replica_reads
+from .throttling import rate_limit
+from . import sharding
+from .sharding import shard_for, shard_for_pk
+from .waitlist import promote_waiting
+from .kitchen import kitchen_load, order_changed
+from . import cart
+from . import metrics
+from .streaming import render_table
+from .models import (
+    Restaurant, Table, Reservation, MenuItem, Order,
+    SalesDaily, SalesDailyItem, IdempotencyKey, WaitlistEntry, OrderHistory
+)
     
+def get_restaurant_or_404(pk):
+    """Busca o restaurante no cache (invalidado quando algum restaurante muda)"""
+    restaurant = caching.get_or_set(
+        'restaurants', f'restaurant:{pk}',
+        lambda: Restaurant.objects.filter(pk=pk).first())
+    if restaurant is None:
+        raise Http404('Restaurante não encontrado.')
+    return restaurant
+
+
+def all_restaurants():
+    return caching.get_or_set('restaurants', 'all', lambda: list(Restaurant.objects.all()))
+
+
+def restaurant_menu(restaurant):
+    """Cardápio por categoria, em cache (invalidado quando algum item do restaurante muda)"""
+    def build_menu():
+        menu_by_category = {}
+        for item in restaurant.menuitem_set.all():
+            if item.category not in menu_by_category:
+                menu_by_category[item.category] = []
+            menu_by_category[item.category].append(item)
+        return menu_by_category
+
+    return caching.get_or_set(caching.menu_namespace(restaurant.pk), 'by_category', build_menu)
+
+
+# Colunas de Order usadas pelos quadros de pedidos (ver: myapp/order_summary.py)
+BOARD_FIELDS = ['id', 'user_id', 'restaurant_id', 'reservation_id', 'status', 'total',
+                'created_at', 'customer_name', 'table_label', 'item_count', 'items_summary']
+
+
+def get_sharded_or_404(model, pk):
+    """Pedido ou reserva pelo id, no shard indicado pelo próprio id"""
+    return get_object_or_404(sharding.using(model.objects, shard_for_pk(pk)), pk=pk)
+
+
+@replica_reads
 def home(request):
-    restaurants = Restaurant.objects.all()
-    return render(request, 'home.html', {'restaurants': restaurants})
+    # Filtro "aberto agora" / "aberto em" (consulta de faixa nos intervalos pré-calculados)
+    open_filter = request.GET.get('open')
+    open_at = parse_datetime(request.GET.get('open_at', '') or '')
+    if open_at:
+        if timezone.is_naive(open_at):
+            open_at = timezone.make_aware(open_at)
+        restaurants = open_restaurants(open_at)
+    elif open_filter == 'now':
+        restaurants = open_restaurants()
+    else:
+        restaurants = all_restaurants()
+    return render(request, 'home.html', {
+        'restaurants': restaurants,
+        'open_filter': open_filter,
+        'open_at': open_at,
+    })
 
 
+@rate_limit('register', keys=('ip',))
 def register(request):
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
@@ -49,14 +131,10 @@ def restaurant_create(request):
     return render(request, 'restaurant_form.html', {'form': form})
 
 # Editar um restaurante 
+@replica_reads
 def restaurant_detail(request, pk):
-    restaurant = get_object_or_404(Restaurant, pk=pk)    
-
-    menu_by_category = {}
-    for item in restaurant.menuitem_set.all():
-        if item.category not in menu_by_category:
-            menu_by_category[item.category] = []
-        menu_by_category[item.category].append(item)
+    restaurant = get_restaurant_or_404(pk)
+    menu_by_category = restaurant_menu(restaurant)
 
     context = {
         'restaurant': restaurant,
@@ -73,18 +151,18 @@ def my_restaurants(request):
 
 @login_required
 def menu_item_create(request, restaurant_pk):
-    restaurant = get_object_or_404(Restaurant, pk=restaurant_pk)
+    restaurant = get_restaurant_or_404(restaurant_pk)
 
-    if request.user != restaurant.owner:
+    if not can_manage_restaurant(request.user, restaurant.pk, allow_superuser=False):
         messages.error(request, 'Você não tem permissão para adicionar itens ao cardápio.')
         return redirect('restaurant_detail', pk=restaurant_pk)
 
     if request.method == 'POST':
-        form = MenuItemForm(request.POST, request.FILES)
+        # Restaurante definido antes da validação para checar nome repetido
+        form = MenuItemForm(request.POST, request.FILES,
+                            instance=MenuItem(restaurant=restaurant))
         if form.is_valid():
-            menu_item = form.save(commit=False)
-            menu_item.restaurant = restaurant
-            menu_item.save()
+            form.save()
             messages.success(request, 'Item adicionado ao cardápio com sucesso!')
             return redirect('restaurant_detail', pk=restaurant_pk)
     else:
@@ -93,156 +171,243 @@ def menu_item_create(request, restaurant_pk):
 
 
 @login_required
+def menu_import(request, restaurant_pk):
+    """Importação em massa do cardápio (CSV ou JSON)"""
+    restaurant = get_restaurant_or_404(restaurant_pk)
+
+    if not can_manage_restaurant(request.user, restaurant.pk, allow_superuser=False):
+        messages.error(request, 'Você não tem permissão para adicionar itens ao cardápio.')
+        return redirect('restaurant_detail', pk=restaurant_pk)
+
+    errors = []
+    if request.method == 'POST':
+        form = MenuImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                rows = parse_rows(upload.read(), upload.name)
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f'Não foi possível ler o arquivo: {e}')
+            else:
+                result = import_menu(restaurant, rows)
+                if result.ok:
+                    messages.success(request, f'{result.imported} item(ns) importado(s) com sucesso!')
+                    return redirect('restaurant_detail', pk=restaurant_pk)
+                errors = result.errors
+                messages.error(request, 'O arquivo tem erros. Nenhum item foi importado.')
+    else:
+        form = MenuImportForm()
+    return render(request, 'menu_import.html', {
+        'form': form,
+        'restaurant': restaurant,
+        'errors': errors,
+    })
+
+
+@login_required
+@rate_limit('reservation_create', keys=('user', 'ip', 'restaurant'))
 def reservation_create(request, restaurant_pk):
-    restaurant = get_object_or_404(Restaurant, pk=restaurant_pk)
+    restaurant = get_restaurant_or_404(restaurant_pk)
+    offer_waitlist = False
     if request.method == 'POST':
-        form = ReservationForm(request.POST)
+        form = ReservationForm(request.POST, restaurant=restaurant)
         if form.is_valid():
             reservation = form.save(commit=False)
             reservation.user = request.user
             reservation.restaurant = restaurant
+            reservation.compute_slot()
             
-            # Lógica para encontrar uma mesa disponível
-            available_table = Table.objects.filter(
-                restaurant=restaurant,
-                capacity__gte=form.cleaned_data['guests']
-            ).first()
-            
-            if available_table:
-                reservation.table = available_table # Mesa 5 disponivel
-                reservation.save()
+            # Lógica para encontrar mesas livres no intervalo da reserva (juntando mesas se preciso)
+            with sharding.atomic(shard_for(restaurant.pk)):
+                # Serializa a escolha de mesas do restaurante
+                Restaurant.objects.select_for_update().filter(pk=restaurant.pk).first()
+                table_ids = find_seating(
+                    free_tables(restaurant, reservation.starts_at, reservation.ends_at),
+                    form.cleaned_data['guests'])
+
+                if table_ids:
+                    reservation.table_id = table_ids[0] # Mesa principal
+                    reservation.save()
+                    assign_tables(reservation, table_ids)
+
+            if table_ids:
                 messages.success(request, 'Reserva realizada com sucesso!')
                 return redirect('reservation_detail', pk=reservation.pk)
+            elif request.POST.get('waitlist'):
+                # Sem mesa: o cliente pediu para entrar na lista de espera
+                WaitlistEntry.objects.get_or_create(
+                    user=request.user, restaurant=restaurant, status='aguardando',
+                    date=reservation.date, time=reservation.time,
+                    defaults={'guests': reservation.guests, 'notes': reservation.notes})
+                messages.info(request, 'Você entrou na lista de espera. Avisaremos se uma mesa for liberada.')
+                return redirect('my_reservations')
             else:
                 messages.error(request, 'Não há mesas disponíveis para o número de pessoas solicitado.')
+                offer_waitlist = True
     else:
-        form = ReservationForm()
+        form = ReservationForm(restaurant=restaurant)
     return render(request, 'reservation_form.html', 
-                  {'form': form, 'restaurant': restaurant})
+                  {'form': form, 'restaurant': restaurant,
+                   'offer_waitlist': offer_waitlist})
 
 @login_required
 def reservation_detail(request, pk):
-    reservation = get_object_or_404(Reservation, pk=pk)
+    reservation = get_sharded_or_404(Reservation, pk)
     return render(request, 'reservation_detail.html', {'reservation': reservation})
 
 
 @login_required
+@replica_reads
 def my_reservations(request):
-    reservations = Reservation.objects.filter(
-        user=request.user).order_by('-date', '-time')
-    return render(request, 'my_reservations.html', {'reservations': reservations})
+    # Reservas do usuário em todos os shards (consultados em paralelo)
+    reservations = sharding.fan_out(
+        lambda alias: sharding.using(Reservation.objects, alias).filter(user=request.user)
+        .prefetch_related('restaurant', 'table', 'table_assignments__table'))
+    reservations.sort(key=lambda r: (r.date, r.time), reverse=True)
+    waitlist = WaitlistEntry.objects.filter(
+        user=request.user, status='aguardando').select_related('restaurant')
+    return render(request, 'my_reservations.html',
+                  {'reservations': reservations, 'waitlist': waitlist})
 
 
 
 @login_required
 def reservation_manage(request, restaurant_pk):
-    restaurant = get_object_or_404(Restaurant, pk=restaurant_pk)
+    restaurant = get_restaurant_or_404(restaurant_pk)
 
     # Verifica se o usuário é o dono do restaurante
-    if request.user != restaurant.owner:
+    if not can_manage_restaurant(request.user, restaurant.pk, allow_superuser=False):
         messages.error(request, 'Você não tem permissão para gerenciar \
                        as reservas deste restaurante.')
         return redirect('restaurant_detail', pk=restaurant_pk)
 
     # Filtro por status
     status_filter = request.GET.get('status')
-    reservations = Reservation.objects.filter(restaurant=restaurant)
+    # Todas as reservas do restaurante ficam no mesmo shard
+    all_reservations = sharding.using(Reservation.objects, shard_for(restaurant.pk)).filter(
+        restaurant=restaurant)
+    reservations = all_reservations
 
     if status_filter:
         reservations = reservations.filter(status=status_filter)
 
-    # Contadores para o menu
-    pending_count = Reservation.objects.filter(
-        restaurant=restaurant, status='pendente').count()
-    confirmed_count = Reservation.objects.filter(
-        restaurant=restaurant, status='confirmada').count()
-    cancelled_count = Reservation.objects.filter(
-        restaurant=restaurant, status='cancelada').count()
+    # Contadores para o menu (uma consulta agrupada)
+    counts = dict(all_reservations.values_list('status').annotate(count=Count('id')))
+    pending_count = counts.get('pendente', 0)
+    confirmed_count = counts.get('confirmada', 0)
+    cancelled_count = counts.get('cancelada', 0)
+    waitlist = WaitlistEntry.objects.filter(
+        restaurant=restaurant, status='aguardando',
+        starts_at__gte=timezone.now()).select_related('user')
 
     context = {
         'restaurant': restaurant,
-        'reservations': reservations.order_by('-date', '-time'),
+        'reservations': reservations.prefetch_related(
+            'user', 'table', 'table_assignments__table').order_by('-date', '-time'),
         'status_filter': status_filter,
         'pending_count': pending_count,
         'confirmed_count': confirmed_count,
         'cancelled_count': cancelled_count,
+        'waitlist': waitlist,
     }
 
-    return render(request, 'reservation_manage.html', context) 
+    total_rows = counts.get(status_filter, 0) if status_filter else sum(counts.values())
+    return render_table(request, 'reservation_manage.html', 'reservation_manage_rows.html',
+                        context, 'reservations', total_rows)
     
     
 @login_required
 def reservation_update_status(request, pk):
-    reservation = get_object_or_404(Reservation, pk=pk)
+    reservation = get_sharded_or_404(Reservation, pk)
 
     # Verifica se o usuário é o dono do restaurante ou superusuário
-    if not request.user.is_superuser and request.user != reservation.restaurant.owner:
+    if not can_manage_restaurant(request.user, reservation.restaurant_id):
         messages.error(request, 'Você não tem permissão para atualizar esta reserva.')
         return redirect('reservation_detail', pk=pk)
 
     if request.method == 'POST':
         new_status = request.POST.get('status') # pode ser 'confirmada' ou 'cancelada'
         if new_status in ['confirmada', 'cancelada']:
-            reservation.status = new_status
-            reservation.save()
-
-            # Enviar notificação ao cliente
+            with sharding.atomic(reservation._state.db):
+                old_status = reservation.status
+                was_active = old_status in ['pendente', 'confirmada']
+                reservation.status = new_status
+                reservation.save(update_fields=['status'])
+                transaction.on_commit(lambda: metrics.reservation_transitions.inc(
+                    from_status=old_status, to_status=new_status))
+
+                # Mesa liberada: tenta promover quem está na lista de espera
+                promoted = []
+                if new_status == 'cancelada' and was_active:
+                    promoted = promote_waiting(reservation)
+
+            # Enviar notificação ao cliente (em segundo plano, após o commit)
+            enqueue('notify_reservation_status', {'reservation_id': reservation.pk})
             status_display = 'confirmada' if new_status == 'confirmada' else 'rejeitada'
             messages.success(request, f'Reserva {status_display} com sucesso!')
+            if promoted:
+                messages.info(request, f'{len(promoted)} reserva(s) criada(s) a partir da lista de espera.')
         else:
             messages.error(request, 'Status inválido.')
 
     return redirect('reservation_detail', pk=pk)
 
-def add_items_in_order(order, menu_items, quantities):
-    """Adiciona itens ao pedido e retorna o total"""
-    total = 0
-    for item_id, quantity in zip(menu_items, quantities): # esse zip junta as listas
-        if quantity and int(quantity) > 0:
-            menu_item = MenuItem.objects.get(id=item_id)
-            quantity = int(quantity)
-            price = menu_item.price * quantity
-            
-            OrderItem.objects.create(
-                order=order,
-                item=menu_item,
-                quantity=quantity,
-                price=price
-            )
-            total += price
-    return total
+
+@login_required
+def waitlist_cancel(request, pk):
+    entry = get_object_or_404(WaitlistEntry, pk=pk, user=request.user)
+    if request.method == 'POST' and entry.status == 'aguardando':
+        entry.status = 'cancelada'
+        entry.save(update_fields=['status'])
+        messages.success(request, 'Você saiu da lista de espera.')
+    return redirect('my_reservations')
+
+def existing_order_for_key(user, key):
+    """Id do pedido já criado com esta chave de idempotência (ou None)"""
+    return IdempotencyKey.objects.filter(
+        user=user, key=key).values_list('order_id', flat=True).first()
 
 
 @login_required
+@rate_limit('create_order', keys=('user', 'ip', 'restaurant'))
 def create_order(request, reservation_pk):
     """ 
     1. Pega a reserva
     2. Se POST:
-       - Cria order
-       - Adiciona itens (função separada)
-       - Salva total
+       - Itens do formulário (ou, sem eles, os do carrinho)
+       - Cria order com todos os itens numa transação (cart.checkout)
        - Redireciona
     3. Se GET:
-       - Mostra formulário
+       - Mostra formulário, já com as quantidades do carrinho
     """
-    reservation = get_object_or_404(Reservation, pk=reservation_pk)
+    reservation = get_sharded_or_404(Reservation, reservation_pk)
+    idempotency_key = None
     
     if request.method == 'POST':
-        menu_items = request.POST.getlist('menu_items') # ids itens
-        quantities = request.POST.getlist('quantities') # quantidades
-
-        print(menu_items, quantities)  # Debugging line
-
-        if menu_items and quantities:
-            order = Order.objects.create(
-                user=request.user,
-                restaurant=reservation.restaurant,
-                reservation=reservation
-            )
-            
-            total = add_items_in_order(order, menu_items, quantities)
-            order.total = total
-            order.save()
+        # Chave enviada pelo formulário (campo oculto) ou por clientes da API (header)
+        idempotency_key = (request.POST.get('idempotency_key')
+                           or request.headers.get('Idempotency-Key') or '')[:64] or None
+
+        # Reenvio do mesmo formulário: devolve o pedido original sem recriar nada
+        if idempotency_key:
+            existing = existing_order_for_key(request.user, idempotency_key)
+            if existing:
+                return redirect('order_detail', pk=existing)
+
+        quantities = cart.parse_quantities(
+            request.POST.getlist('menu_items'), request.POST.getlist('quantities'))
+        if not quantities:
+            quantities = cart.cart_quantities(cart.find_cart(request.user, reservation))
+
+        if quantities:
+            try:
+                order = cart.checkout(request.user, reservation, quantities, idempotency_key)
+            except IntegrityError:
+                # Outra requisição com a mesma chave ganhou a corrida
+                existing = existing_order_for_key(request.user, idempotency_key)
+                if not existing:
+                    raise
+                return redirect('order_detail', pk=existing)
             
             messages.success(request, 'Pedido realizado com sucesso!')
             return redirect('order_detail', pk=order.pk)
@@ -250,33 +415,78 @@ def create_order(request, reservation_pk):
             messages.error(request, 'Selecione pelo menos um item para \
                            fazer o pedido.')
 
-    menu_items = MenuItem.objects.filter(
-        restaurant=reservation.restaurant, available=True)
+    menu_items = list(MenuItem.objects.filter(
+        restaurant=reservation.restaurant, available=True))
+    # Volta à tela com o que já estava no carrinho
+    in_cart = cart.cart_quantities(cart.find_cart(request.user, reservation))
+    for item in menu_items:
+        item.cart_quantity = in_cart.get(item.pk, 0)
     return render(request, 'order_create.html', {
         'reservation': reservation,
-        'menu_items': menu_items
+        'menu_items': menu_items,
+        # Mantém a mesma chave ao reexibir o formulário com erro
+        'idempotency_key': idempotency_key or uuid.uuid4().hex,
     })
 
 
+def cart_line_change(request, reservation_pk, change):
+    """
+    Aplica `change(carrinho, item, quantidade)` a uma linha do carrinho e
+    devolve só essa linha e o total (JSON), sem renderizar o cardápio
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Use POST.'}, status=405)
+    reservation = get_sharded_or_404(Reservation, reservation_pk)
+    try:
+        item_id = int(request.POST.get('item', ''))
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Item ou quantidade inválidos.'}, status=400)
+    item = MenuItem.objects.filter(
+        pk=item_id, restaurant_id=reservation.restaurant_id, available=True).first()
+    if item is None:
+        return JsonResponse({'error': 'Item indisponível.'}, status=400)
+
+    draft = cart.get_cart(request.user, reservation)
+    line = change(draft, item, quantity)
+    return JsonResponse(cart.line_payload(item, line, draft))
+
+
+@login_required
+def cart_add(request, reservation_pk):
+    return cart_line_change(request, reservation_pk, cart.add_quantity)
+
+
+@login_required
+def cart_update(request, reservation_pk):
+    return cart_line_change(request, reservation_pk, cart.set_quantity)
+
+
+@login_required
+def cart_remove(request, reservation_pk):
+    return cart_line_change(request, reservation_pk,
+                            lambda draft, item, quantity: cart.set_quantity(draft, item, 0))
+
 
 @login_required
 def order_detail(request, pk):
-    order = get_object_or_404(Order, pk=pk)
+    order = get_sharded_or_404(Order, pk)
     return render(request, 'order_detail.html', {'order': order})
 
 
 @login_required
 def order_manage(request, restaurant_pk):
     """Gerencia pedidos de um restaurante"""
-    restaurant = get_object_or_404(Restaurant, pk=restaurant_pk)
+    restaurant = get_restaurant_or_404(restaurant_pk)
 
     # Verifica permissão
-    if request.user != restaurant.owner and not request.user.is_superuser:
+    if not can_manage_restaurant(request.user, restaurant.pk):
         messages.error(request, 'Você não tem permissão.')
         return redirect('restaurant_detail', pk=restaurant_pk)
 
     # Pega todos os pedidos do restaurante
-    all_orders = Order.objects.filter(restaurant=restaurant)
+    all_orders = sharding.using(Order.objects, shard_for(restaurant.pk)).filter(
+        restaurant=restaurant)
     
     # Filtra por status se solicitado
     status_filter = request.GET.get('status')
@@ -286,13 +496,13 @@ def order_manage(request, restaurant_pk):
         orders = all_orders
 
     # Conta pedidos por status
-    from django.db.models import Count
     status_counts = all_orders.values('status').annotate(count=Count('id'))
     counts = {item['status']: item['count'] for item in status_counts}
 
     context = {
         'restaurant': restaurant,
-        'orders': orders.order_by('-created_at'),
+        # Uma consulta só na tabela de pedidos (nome e mesa já vêm no resumo)
+        'orders': orders.only(*BOARD_FIELDS).order_by('-created_at'),
         'status_filter': status_filter,
         'pending_count': counts.get('pendente', 0),
         'preparing_count': counts.get('preparando', 0),
@@ -301,36 +511,192 @@ def order_manage(request, restaurant_pk):
         'cancelled_count': counts.get('cancelado', 0),
     }
 
-    return render(request, 'order_manage.html', context)
+    total_rows = counts.get(status_filter, 0) if status_filter else sum(counts.values())
+    return render_table(request, 'order_manage.html', 'order_manage_rows.html',
+                        context, 'orders', total_rows)
+
+
+@login_required
+def kitchen_board(request, restaurant_pk):
+    """Quantidade de cada prato nos pedidos pendentes/em preparo"""
+    restaurant = get_restaurant_or_404(restaurant_pk)
+
+    if not can_manage_restaurant(request.user, restaurant.pk):
+        messages.error(request, 'Você não tem permissão.')
+        return redirect('restaurant_detail', pk=restaurant_pk)
+
+    rows = kitchen_load(restaurant.pk)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'restaurant': restaurant.pk, 'items': rows})
+    return render(request, 'kitchen_board.html', {
+        'restaurant': restaurant,
+        'rows': rows,
+        'total_quantity': sum(row['quantity'] for row in rows),
+    })
 
 
 @login_required
 def order_update_status(request, pk):
     """Atualiza o status de um pedido"""
-    order = get_object_or_404(Order, pk=pk)
+    order = get_sharded_or_404(Order, pk)
 
     # Verifica permissão
-    if request.user != order.restaurant.owner and not request.user.is_superuser:
+    if not can_manage_restaurant(request.user, order.restaurant_id):
         messages.error(request, 'Você não tem permissão.')
         return redirect('order_detail', pk=pk)
 
     if request.method == 'POST':
         new_status = request.POST.get('status') # cancelado, preparando, pronto, entregue
-        print(f'Novo status recebido: {new_status}')  # Linha de depuração
         
         # Lista de status válidos
         valid_statuses = ['pendente', 'preparando', 'pronto', 'entregue', 'cancelado']
         
         if new_status in valid_statuses:
-            order.status = new_status
-            order.save()
+            with sharding.atomic(order._state.db):
+                # Status atual com a linha travada (duas telas podem mudar o mesmo pedido)
+                old_status = Order.objects.using(order._state.db).select_for_update().values_list(
+                    'status', flat=True).get(pk=order.pk)
+                order.status = new_status
+                if new_status == 'entregue' and not order.delivered_at:
+                    order.delivered_at = timezone.now()
+                order.save(update_fields=['status', 'delivered_at'])
+
+                # Alimenta as vendas diárias (dashboard do restaurante) em segundo plano
+                if new_status == 'entregue' or order.rolled_up:
+                    enqueue('sync_order_rollup', {'order_id': order.pk})
+
+                # Atualiza o contador da tela da cozinha
+                order_changed(order, old_status, new_status)
+                transaction.on_commit(lambda: metrics.order_transitions.inc(
+                    from_status=old_status, to_status=new_status))
             messages.success(request, f'Pedido atualizado para: {order.get_status_display()}')
         else:
             messages.error(request, 'Status inválido.')
 
-    return redirect('order_manage', restaurant_pk=order.restaurant.pk)
+    return redirect('order_manage', restaurant_pk=order.restaurant_id)
 
 @login_required
+@replica_reads
 def my_orders(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'my_orders.html', {'orders': orders})
\ No newline at end of file
+    # Histórico unificado (ativos + arquivados, view OrderHistory) em todos os
+    # shards; os arquivados ficam no banco principal
+    history = sharding.fan_out(
+        lambda alias: sharding.using(OrderHistory.objects, alias).filter(user=request.user))
+    # Pedido arquivado cuja remoção do shard ainda não foi confirmada aparece
+    # nos dois: vale o ativo
+    by_id = {}
+    for order in sorted(history, key=lambda order: order.archived):
+        by_id.setdefault(order.pk, order)
+    history = sorted(by_id.values(), key=lambda order: order.created_at, reverse=True)
+
+    restaurants = {restaurant.pk: restaurant for restaurant in all_restaurants()}
+    for order in history:
+        order.restaurant_name = getattr(restaurants.get(order.restaurant_id), 'name', '')
+    return render(request, 'my_orders.html', {
+        'orders': [order for order in history if not order.archived],
+        # Pedidos antigos já arquivados (ver: manage.py archive_orders)
+        'archived_orders': [order for order in history if order.archived],
+    })
+
+
+@login_required
+def sales_dashboard(request, restaurant_pk):
+    """Relatório de vendas do restaurante (lê apenas as tabelas de vendas diárias)"""
+    restaurant = get_restaurant_or_404(restaurant_pk)
+
+    if not can_manage_restaurant(request.user, restaurant.pk):
+        messages.error(request, 'Você não tem permissão.')
+        return redirect('restaurant_detail', pk=restaurant_pk)
+
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 366)
+    except ValueError:
+        days = 30
+    start = timezone.localdate() - timedelta(days=days - 1)
+
+    daily = SalesDaily.objects.filter(
+        restaurant=restaurant, date__gte=start).order_by('-date')
+    totals = daily.aggregate(orders=Sum('orders'), revenue=Sum('revenue'))
+
+    top_items = (
+        SalesDailyItem.objects.filter(restaurant=restaurant, date__gte=start)
+        .values('item_name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'), orders=Sum('orders'))
+        .order_by('-revenue')[:20]
+    )
+
+    context = {
+        'restaurant': restaurant,
+        'days': days,
+        'daily': daily,
+        'top_items': top_items,
+        'total_orders': totals['orders'] or 0,
+        'total_revenue': totals['revenue'] or 0,
+    }
+    return render(request, 'sales_dashboard.html', context)
+
+
+
+@login_required
+def restaurant_export(request, restaurant_pk, kind):
+    """Exporta o histórico de pedidos/reservas em CSV ou JSONL (streaming)"""
+    restaurant = get_restaurant_or_404(restaurant_pk)
+
+    if not can_manage_restaurant(request.user, restaurant.pk):
+        messages.error(request, 'Você não tem permissão.')
+        return redirect('restaurant_detail', pk=restaurant_pk)
+
+    fmt = request.GET.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise Http404
+
+    content_type, _ = FORMATS[fmt]
+    response = StreamingHttpResponse(
+        export_lines(kind, restaurant.pk, fmt), content_type=content_type)
+    filename = f'{kind}-restaurante-{restaurant.pk}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+
+def search(request):
+    """Busca de pratos em todos os restaurantes"""
+    query = request.GET.get('q', '').strip()
+    page, results = search_menu(query, request.GET.get('page', 1))
+    return render(request, 'search.html', {
+        'query': query,
+        'page_obj': page,
+        'results': results,
+    })
+
+
+def search_api(request):
+    query = request.GET.get('q', '').strip()
+    page, results = search_menu(query, request.GET.get('page', 1))
+    return JsonResponse({
+        'query': query,
+        'page': page.number if page else 1,
+        'num_pages': page.paginator.num_pages if page else 0,
+        'count': page.paginator.count if page else 0,
+        'results': [
+            {
+                'id': item.pk,
+                'name': item.name,
+                'description': item.description,
+                'category': item.category,
+                'price': str(item.price),
+                'restaurant': {'id': item.restaurant_id, 'name': item.restaurant.name},
+                'score': score,
+            }
+            for item, score in results
+        ],
+    })
+
+
+def metrics_view(request):
+    """Métricas de todos os workers no formato texto do Prometheus"""
+    if (not request.user.is_superuser
+            and request.META.get('REMOTE_ADDR') not in settings.METRICS['ALLOWED_IPS']):
+        raise Http404
+    return HttpResponse(metrics.exposition(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,65 @@
+"""
+Lista de espera por restaurante.
+
+Quando não há mesa no horário pedido, o cliente pode entrar na fila
+(WaitlistEntry). Ao cancelar uma reserva, `promote_waiting` tenta
+transformar em reserva as entradas cujo horário cruza o intervalo liberado,
+na ordem de chegada. A busca usa o índice (restaurant, status, starts_at),
+então só as entradas daquela faixa de horário são lidas - nunca a fila toda.
+"""
+from django.utils import timezone
+
+from .models import Reservation, Restaurant, WaitlistEntry
+from .seating import assign_tables, find_seating, free_tables
+from .sharding import shard_for
+from .tasks import enqueue
+
+# Máximo de entradas avaliadas por cancelamento
+MAX_CANDIDATES = 20
+
+
+def waiting_candidates(restaurant, starts_at, ends_at, limit=MAX_CANDIDATES):
+    """Entradas aguardando cujo horário se sobrepõe a [starts_at, ends_at), por ordem de chegada"""
+    return list(
+        WaitlistEntry.objects.filter(
+            restaurant=restaurant, status='aguardando',
+            starts_at__lt=ends_at, ends_at__gt=starts_at,
+            starts_at__gte=timezone.now(),
+        ).order_by('created_at', 'id')[:limit])
+
+
+def promote_entry(entry):
+    """Cria a reserva da entrada se houver mesas livres; devolve a reserva ou None"""
+    table_ids = find_seating(
+        free_tables(entry.restaurant_id, entry.starts_at, entry.ends_at), entry.guests)
+    if not table_ids:
+        return None
+
+    reservation = Reservation.objects.using(shard_for(entry.restaurant_id)).create(
+        user_id=entry.user_id, restaurant_id=entry.restaurant_id, table_id=table_ids[0],
+        date=entry.date, time=entry.time, guests=entry.guests, notes=entry.notes)
+    assign_tables(reservation, table_ids)
+
+    entry.status = 'promovida'
+    entry.reservation = reservation
+    entry.save(update_fields=['status', 'reservation'])
+    enqueue('notify_waitlist_promoted', {'reservation_id': reservation.pk})
+    return reservation
+
+
+def promote_waiting(reservation):
+    """
+    Chamada na mesma transação do cancelamento de `reservation`: promove as
+    entradas da fila que agora cabem. Devolve as reservas criadas.
+    """
+    # Mesma trava usada em reservation_create (serializa a escolha de mesas)
+    Restaurant.objects.select_for_update().filter(pk=reservation.restaurant_id).first()
+
+    promoted = []
+    for entry in waiting_candidates(
+            reservation.restaurant_id, reservation.starts_at, reservation.ends_at):
+        entry.restaurant = reservation.restaurant
+        created = promote_entry(entry)
+        if created is not None:
+            promoted.append(created)
+    return promoted
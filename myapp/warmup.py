@@ -0,0 +1,117 @@
+"""
+Aquecimento do worker.
+
+Chamado por core/wsgi.py e core/asgi.py logo depois de carregar a aplicação,
+antes da primeira requisição: compila as rotas e os templates, testa as
+conexões com os bancos e preenche o cache com os restaurantes e cardápios mais
+acessados. Assim um worker novo não cobra esse custo do primeiro cliente.
+
+No fim as conexões abertas aqui são fechadas: com --preload (gunicorn) o
+aquecimento roda no processo mestre, e um socket herdado pelo fork seria
+usado por vários workers ao mesmo tempo. Cada worker abre as suas na
+primeira requisição.
+
+Cada etapa é independente: uma falha (ex.: banco ainda sem migrate) só gera
+um aviso no log, nunca impede o worker de subir.
+Desligue com ORDERUP_WARMUP=0 (settings.WARMUP['ENABLED']).
+"""
+import logging
+from datetime import timedelta
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Sum
+from django.template import engines
+from django.urls import get_resolver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def load_urls():
+    resolver = get_resolver()
+    # Força a importação das views e a compilação dos padrões de URL
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def compile_templates():
+    from .forms import UserRegistrationForm
+
+    count = 0
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for path in Path(directory).rglob('*.html'):
+                engine.get_template(path.relative_to(directory).as_posix())
+                count += 1
+    # Os templates do crispy (um por tipo de campo) só são carregados ao renderizar
+    engines['django'].from_string('{% load crispy_forms_tags %}{{ form|crispy }}').render(
+        {'form': UserRegistrationForm()})
+    return count
+
+
+def open_connections():
+    # Carrega os backends e confirma que os bancos respondem; as conexões são
+    # fechadas ao fim do warm_up (ver docstring do módulo)
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def hot_restaurants(limit):
+    """Restaurantes com mais pedidos nos últimos 7 dias (pelos resumos de vendas)"""
+    from .models import Restaurant, SalesDaily
+
+    since = timezone.localdate() - timedelta(days=7)
+    ids = list(
+        SalesDaily.objects.filter(date__gte=since).values('restaurant_id')
+        .annotate(total=Sum('orders')).order_by('-total')
+        .values_list('restaurant_id', flat=True)[:limit])
+    if len(ids) < limit:
+        ids += Restaurant.objects.exclude(pk__in=ids).values_list(
+            'pk', flat=True)[:limit - len(ids)]
+    return ids
+
+
+def prime_caches():
+    from .permissions import restaurant_owner_id
+    from .views import all_restaurants, get_restaurant_or_404, restaurant_menu
+
+    all_restaurants()
+    ids = hot_restaurants(settings.WARMUP['MENUS'])
+    for restaurant_id in ids:
+        restaurant_menu(get_restaurant_or_404(restaurant_id))
+        restaurant_owner_id(restaurant_id)
+    return len(ids)
+
+
+STEPS = [
+    ('urls', load_urls),
+    ('templates', compile_templates),
+    ('databases', open_connections),
+    ('caches', prime_caches),
+]
+
+
+def warm_up(force=False):
+    """Executa as etapas e devolve [(etapa, segundos, resultado ou erro)]"""
+    if not force and not settings.WARMUP['ENABLED']:
+        return []
+
+    results = []
+    for name, step in STEPS:
+        start = perf_counter()
+        try:
+            result = step()
+        except Exception as exc:
+            logger.warning('Aquecimento: etapa %s falhou: %s', name, exc)
+            result = exc
+        results.append((name, perf_counter() - start, result))
+    connections.close_all()
+
+    logger.info('Aquecimento concluído em %.0f ms (%s)',
+                sum(seconds for _, seconds, _ in results) * 1000,
+                ', '.join(f'{name}={seconds * 1000:.0f}ms' for name, seconds, _ in results))
+    return results